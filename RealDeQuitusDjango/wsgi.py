@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'RealDeQuitusDjango.settings')
 
 application = get_wsgi_application()
+
+# Solo al servir la aplicación (no en manage.py, migraciones ni tests) se
+# abren en segundo plano las conexiones a los servicios SOAP más usados.
+from webapp.servicios.wsAmenidades import wsAmenidades  # noqa: E402
+from webapp.servicios.wsEspXRes import wsEspXRes  # noqa: E402
+
+wsAmenidades.precalentarConexion()
+wsEspXRes.precalentarConexion()
@@ -0,0 +1,219 @@
+# _soap.py
+"""
+Piezas comunes de los clientes SOAP de webapp.servicios: sesión HTTP con pool
+de conexiones, lectura del valor de las respuestas simples, llamadas en
+paralelo acotadas y consultas de solo lectura compartidas entre hilos.
+"""
+
+import asyncio
+import atexit
+import copy
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SOAP_BODY = "{http://schemas.xmlsoap.org/soap/envelope/}Body"
+
+# Conexiones por sesión; acota también las llamadas en vuelo de reunir().
+POOL_MAXIMO = 20
+
+# Reintentos con espera exponencial también para POST (todas las operaciones
+# SOAP lo son; sin allowed_methods urllib3 nunca reintentaría un POST). Solo se
+# reintenta lo que el servidor no llegó a procesar: fallos de conexión y
+# 502/503 del balanceador. Un 504 o un corte de lectura no se reintentan,
+# porque una escritura pudo haberse aplicado ya.
+REINTENTOS = Retry(
+    total=3,
+    read=0,
+    backoff_factor=0.3,
+    status_forcelist=(502, 503),
+    allowed_methods=frozenset({"POST"}),
+)
+
+
+# ======================================================
+# SESIÓN HTTP
+# ======================================================
+def crearSesion(reintentos: Retry = REINTENTOS) -> requests.Session:
+    """
+    Crea la sesión HTTP de un módulo: reutiliza las conexiones TCP/TLS entre
+    llamadas SOAP. Cada módulo habla con un solo host, así que basta un pool;
+    con pool_block las llamadas concurrentes esperan una conexión libre en
+    lugar de abrir conexiones extra que se descartan al devolverlas.
+    Las respuestas XML son muy repetitivas: se pide explícitamente compresión
+    (requests la descomprime antes de exponer response.content/response.raw).
+    La sesión se cierra al terminar el proceso.
+    """
+    sesion = requests.Session()
+    sesion.headers.update({
+        "Content-Type": "text/xml; charset=utf-8",
+        "Accept-Encoding": "gzip, deflate",
+    })
+    sesion.mount("https://", HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=POOL_MAXIMO,
+        pool_block=True,
+        max_retries=reintentos,
+    ))
+    atexit.register(sesion.close)
+    return sesion
+
+
+def precalentar(sesion: requests.Session, url: str, nombre: str) -> None:
+    """
+    Abre en segundo plano la conexión TLS del pool de `sesion` para que la
+    primera llamada real la reutilice. El precalentamiento es opcional:
+    cualquier fallo se ignora.
+    """
+    def calentar():
+        try:
+            sesion.head(url, timeout=5).close()
+        except Exception:
+            pass
+
+    threading.Thread(target=calentar, name=f"{nombre}-warmup", daemon=True).start()
+
+
+# ======================================================
+# RESPUESTAS DE VALOR SIMPLE
+# ======================================================
+def nodoResultado(root, etiqueta: str):
+    """
+    Ubica el nodo <...Result> bajando por Envelope → Body → <...Response>,
+    sin recorrer el resto del árbol. Devuelve None si no existe.
+    """
+    for body in root.iterchildren(SOAP_BODY):
+        for respuesta in body:
+            for nodo in respuesta.iterchildren(etiqueta):
+                return nodo
+    return None
+
+
+def textoResultado(contenido: bytes, etiqueta: str, parser=None):
+    """
+    Devuelve el texto (sin espacios extremos) del nodo <...Result> de una
+    respuesta SOAP de valor simple, o None si el nodo no existe. `etiqueta` va
+    en notación Clark ("{http://tempuri.org/}xResult").
+
+    Camino rápido: si el nodo aparece literal y sin prefijo, atributos,
+    entidades ni hijos, el valor se recorta con bytes.partition sin construir
+    el árbol. En cualquier otro caso (Fault, nodo vacío, etc.) se parsea con lxml.
+    """
+    nombre = etiqueta.rpartition("}")[2].encode("ascii")
+    _, encontrado, resto = contenido.partition(b"<" + nombre + b">")
+    if encontrado:
+        valor, cerrado, _ = resto.partition(b"</" + nombre + b">")
+        if cerrado and b"<" not in valor and b"&" not in valor:
+            return valor.strip().decode("utf-8")
+
+    nodo = nodoResultado(etree.fromstring(contenido, parser), etiqueta)
+    if nodo is None:
+        return None
+    return (nodo.text or "").strip()
+
+
+# ======================================================
+# LLAMADAS EN PARALELO
+# ======================================================
+async def reunir(corrutinas) -> list:
+    """
+    Espera varias llamadas en paralelo; una excepción se devuelve como {"error": str} en su posición.
+    Como mucho POOL_MAXIMO llamadas están en vuelo a la vez: las demás esperan
+    sin ocupar un hilo del executor ni una conexión del pool.
+    """
+    limite = asyncio.Semaphore(POOL_MAXIMO)
+
+    async def limitada(corrutina):
+        async with limite:
+            return await corrutina
+
+    resultados = await asyncio.gather(*(limitada(c) for c in corrutinas), return_exceptions=True)
+    return [
+        {"error": str(r)} if isinstance(r, BaseException) else r
+        for r in resultados
+    ]
+
+
+def ejecutar(corrutina):
+    """
+    Ejecuta una corrutina desde código síncrono y devuelve su resultado.
+    asyncio.run() falla si el hilo ya tiene un bucle en marcha (vistas async de
+    Django, ASGI); en ese caso la corrutina corre en su propio bucle en un hilo
+    aparte y este hilo espera el resultado. Eso bloquea el bucle llamante:
+    desde código async conviene usar directamente la variante _async.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(corrutina)
+    with ThreadPoolExecutor(max_workers=1) as ejecutor:
+        return ejecutor.submit(asyncio.run, corrutina).result()
+
+
+# ======================================================
+# CONSULTAS CONCURRENTES COMPARTIDAS
+# ======================================================
+class ConsultasEnVuelo:
+    """
+    Consultas de solo lectura en curso de un módulo: clave -> Future con su
+    resultado. Las llamadas concurrentes con la misma clave esperan a la
+    primera en lugar de repetir la ida y vuelta SOAP.
+    """
+
+    def __init__(self):
+        self._futuros = {}
+        self._lock = threading.Lock()
+
+    def compartir(self, funcion):
+        """
+        Decorador: si ya hay una llamada en curso con los mismos argumentos, se
+        espera su resultado en lugar de lanzar otra. Quien espera recibe una
+        copia, igual que desde la caché.
+        """
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            clave = (funcion.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                with self._lock:
+                    futuro = self._futuros.get(clave)
+                    propio = futuro is None
+                    if propio:
+                        futuro = self._futuros[clave] = Future()
+            except TypeError:
+                # Argumentos no hashables: la propia función los rechazará
+                return funcion(*args, **kwargs)
+
+            if not propio:
+                return copy.deepcopy(futuro.result())
+
+            try:
+                resultado = funcion(*args, **kwargs)
+            except BaseException as ex:
+                futuro.set_exception(ex)
+                raise
+            else:
+                # Los que esperan copian una instantánea propia del Future, no el
+                # objeto que recibe (y puede modificar) quien hizo la llamada
+                futuro.set_result(copy.deepcopy(resultado))
+                return resultado
+            finally:
+                with self._lock:
+                    # Tras olvidar() la clave puede pertenecer ya a otra llamada
+                    if self._futuros.get(clave) is futuro:
+                        del self._futuros[clave]
+
+        return envoltura
+
+    def olvidar(self) -> None:
+        """
+        Deja de compartir las llamadas en curso (tras una escritura): quien
+        llegue después hace su propia llamada en vez de esperar un resultado
+        anterior a la escritura.
+        """
+        with self._lock:
+            self._futuros.clear()
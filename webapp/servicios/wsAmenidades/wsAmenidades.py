@@ -1,7 +1,14 @@
+import asyncio
+import copy
+import io
 import logging
 import requests
-import xml.etree.ElementTree as ET
+import string
+import threading
+import time
 from datetime import datetime
+from lxml import etree
+from webapp.servicios import _soap
 
 # ======================================================
 # CONFIGURACIÓN GLOBAL
@@ -9,7 +16,171 @@ from datetime import datetime
 SOAP_URL = "https://realdecuenca-btccaacvcpgyadhb.canadacentral-01.azurewebsites.net/WS_GestionAmenidades.asmx"
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Sesión HTTP compartida por todas las llamadas del módulo (ver _soap.crearSesion)
+_SESSION = _soap.crearSesion()
+
+# Caché en memoria del listado de amenidades (cambia muy poco).
+# Se invalida tras cualquier inserción, actualización o eliminación exitosa;
+# "g" es la generación, que la invalidación incrementa para que una consulta
+# iniciada antes de la escritura no guarde su resultado ya desactualizado.
+_AMENIDADES_CACHE_TTL = 60  # segundos
+_AMENIDADES_CACHE = {"t": 0.0, "v": None, "g": 0}
+_AMENIDADES_CACHE_LOCK = threading.Lock()
+
+# Parser libxml2 reutilizable; se alimenta con los bytes crudos de la respuesta
+_PARSER = etree.XMLParser(huge_tree=False, collect_ids=False)
+
+# Etiquetas del namespace tempuri ya resueltas (notación Clark)
+_TEM = "{http://tempuri.org/}"
+_TEM_ID = _TEM + "Id"
+_TEM_NOMBRE = _TEM + "Nombre"
+_TEM_FECHA_REGISTRO = _TEM + "FechaRegistro"
+_TEM_ULTIMA_FECHA_CAMBIO = _TEM + "UltimaFechaCambio"
+_TEM_ES_ACTIVO = _TEM + "EsActivo"
+_TEM_AMENIDADES = _TEM + "Amenidades"
+_TEM_SELECCIONAR_AMENIDADES_RESULT = _TEM + "seleccionarAmenidadesResult"
+
+# Rutas de búsqueda de los nodos *Result (notación Clark, sin resolver prefijos)
+_PATH_ACTUALIZAR_AMENIDAD = ".//" + _TEM + "actualizarAmenidadResult"
+_PATH_ELIMINAR_AMENIDAD = ".//" + _TEM + "eliminarAmenidadResult"
+_PATH_INSERTAR_AMENIDAD = ".//" + _TEM + "insertarAmenidadResult"
+_PATH_SELECCIONAR_AMENIDAD_POR_ID = ".//" + _TEM + "seleccionarAmenidadPorIdResult"
+
+
+# Tabla de escape XML precompilada: str.translate la aplica en una sola pasada
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+# Cadenas que se aceptan como verdaderas para EsActivo (tras strip/lower)
+_TEXTOS_VERDADEROS = frozenset({"true", "1"})
+
+# Envelopes SOAP precompilados como bytes: se envían tal cual o con un único
+# reemplazo %d, sin interpolar ni codificar en cada llamada
+_ENV_SELECCIONAR_AMENIDADES = b"""<?xml version="1.0" encoding="utf-8"?>
+        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                          xmlns:tem="http://tempuri.org/">
+           <soapenv:Header/>
+           <soapenv:Body>
+              <tem:seleccionarAmenidades/>
+           </soapenv:Body>
+        </soapenv:Envelope>"""
+
+_ENV_SELECCIONAR_AMENIDAD_POR_ID = b"""<?xml version="1.0" encoding="utf-8"?>
+        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                          xmlns:tem="http://tempuri.org/">
+           <soapenv:Header/>
+           <soapenv:Body>
+              <tem:seleccionarAmenidadPorId>
+                 <tem:id>%d</tem:id>
+              </tem:seleccionarAmenidadPorId>
+           </soapenv:Body>
+        </soapenv:Envelope>"""
+
+_ENV_ELIMINAR_AMENIDAD = b"""<?xml version="1.0" encoding="utf-8"?>
+        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                          xmlns:tem="http://tempuri.org/">
+           <soapenv:Header/>
+           <soapenv:Body>
+              <tem:eliminarAmenidad>
+                 <tem:id>%d</tem:id>
+              </tem:eliminarAmenidad>
+           </soapenv:Body>
+        </soapenv:Envelope>"""
+
+# Plantillas de los envelopes con datos de amenidad, compiladas una sola vez
+_TMPL_ACTUALIZAR_AMENIDAD = string.Template("""<?xml version="1.0" encoding="utf-8"?>
+        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                          xmlns:tem="http://tempuri.org/">
+          <soapenv:Header/>
+          <soapenv:Body>
+            <tem:actualizarAmenidad>
+              <tem:amenidadEditada>
+                <tem:Id>$Id</tem:Id>
+                <tem:Nombre>$Nombre</tem:Nombre>
+                <tem:FechaRegistro>$FechaRegistro</tem:FechaRegistro>
+                <tem:UltimaFechaCambio>$UltimaFechaCambio</tem:UltimaFechaCambio>
+                <tem:EsActivo>$EsActivo</tem:EsActivo>
+              </tem:amenidadEditada>
+            </tem:actualizarAmenidad>
+          </soapenv:Body>
+        </soapenv:Envelope>""")
+
+_TMPL_INSERTAR_AMENIDAD = string.Template("""<?xml version="1.0" encoding="utf-8"?>
+        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                          xmlns:tem="http://tempuri.org/">
+          <soapenv:Header/>
+          <soapenv:Body>
+            <tem:insertarAmenidad>
+              <tem:nuevaAmenidad>
+                <tem:Id>$Id</tem:Id>
+                <tem:Nombre>$Nombre</tem:Nombre>
+                <tem:FechaRegistro>$FechaRegistro</tem:FechaRegistro>
+                <tem:UltimaFechaCambio>$UltimaFechaCambio</tem:UltimaFechaCambio>
+                <tem:EsActivo>$EsActivo</tem:EsActivo>
+              </tem:nuevaAmenidad>
+            </tem:insertarAmenidad>
+          </soapenv:Body>
+        </soapenv:Envelope>""")
+
+# ======================================================
+# UTILIDADES DE PARSEO
+# ======================================================
+def _aEntero(texto: str) -> int:
+    """Convierte el texto de un campo numérico; vacío o ausente equivale a 0."""
+    return int(texto) if texto else 0
+
+
+def _textosHijos(nodo) -> dict:
+    """Recorre una sola vez los hijos directos de un nodo y devuelve {etiqueta Clark: texto}."""
+    return {hijo.tag: hijo.text or "" for hijo in nodo}
+
+
+def _boolXml(valor) -> str:
+    """
+    Normaliza un valor a xsd:boolean ("true"/"false"). Las cadenas solo son
+    verdaderas si son "true" o "1" (sin distinguir mayúsculas ni espacios);
+    cualquier otro valor se evalúa por su valor de verdad.
+    """
+    if isinstance(valor, str):
+        return "true" if valor.strip().lower() in _TEXTOS_VERDADEROS else "false"
+    return "true" if valor else "false"
+
+
+# ======================================================
+# CACHÉ DEL LISTADO DE AMENIDADES
+# ======================================================
+def _leerCache():
+    """
+    Devuelve (copia del resultado vigente o None, generación actual). La
+    generación se pasa a _guardarEnCache() tras consultar el servicio.
+    """
+    with _AMENIDADES_CACHE_LOCK:
+        cacheado = _AMENIDADES_CACHE["v"]
+        generacion = _AMENIDADES_CACHE["g"]
+        if cacheado is None or time.monotonic() - _AMENIDADES_CACHE["t"] >= _AMENIDADES_CACHE_TTL:
+            return None, generacion
+    return copy.deepcopy(cacheado), generacion
+
+
+def _guardarEnCache(resultado: dict, generacion: int) -> None:
+    """
+    Guarda un resultado exitoso de seleccionarAmenidades() con su marca de
+    tiempo, salvo que la caché se haya invalidado después de `generacion`.
+    """
+    copia = copy.deepcopy(resultado)
+    with _AMENIDADES_CACHE_LOCK:
+        if generacion != _AMENIDADES_CACHE["g"]:
+            return
+        _AMENIDADES_CACHE["v"] = copia
+        _AMENIDADES_CACHE["t"] = time.monotonic()
+
+
+def _invalidarCache() -> None:
+    """Fuerza que la próxima llamada a seleccionarAmenidades() consulte el servicio."""
+    with _AMENIDADES_CACHE_LOCK:
+        _AMENIDADES_CACHE["g"] += 1
+        _AMENIDADES_CACHE["t"] = 0.0
+        _AMENIDADES_CACHE["v"] = None
 
 
 # ======================================================
@@ -38,80 +209,73 @@ def actualizarAmenidad(amenidad: dict) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Actualizando amenidad ID={amenidad.get('Id')} en WS_GestionAmenidades")
+    if not isinstance(amenidad, dict):
+        return {"error": "El parámetro 'amenidad' debe ser un diccionario."}
 
-        # ======================================================
-        # Validar entrada
-        # ======================================================
-        if "Id" not in amenidad or "Nombre" not in amenidad:
-            return {"error": "Faltan campos obligatorios: 'Id' y 'Nombre'."}
+    logger.info("Actualizando amenidad ID=%s en WS_GestionAmenidades", amenidad.get('Id'))
+
+    # ======================================================
+    # Validar entrada
+    # ======================================================
+    if "Id" not in amenidad or "Nombre" not in amenidad:
+        return {"error": "Faltan campos obligatorios: 'Id' y 'Nombre'."}
 
-        # Asegurar formato ISO de fechas
-        fecha_registro = amenidad.get("FechaRegistro") or datetime.now().isoformat()
-        ultima_fecha = amenidad.get("UltimaFechaCambio") or datetime.now().isoformat()
-        es_activo = str(amenidad.get("EsActivo", True)).lower()
+    try:
+        # Asegurar formato ISO de fechas (la fecha actual se calcula una sola vez)
+        fecha_registro = amenidad.get("FechaRegistro")
+        ultima_fecha = amenidad.get("UltimaFechaCambio")
+        if not (fecha_registro and ultima_fecha):
+            fecha_actual = datetime.now().isoformat()
+            fecha_registro = fecha_registro or fecha_actual
+            ultima_fecha = ultima_fecha or fecha_actual
+        es_activo = _boolXml(amenidad.get("EsActivo", True))
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-          <soapenv:Header/>
-          <soapenv:Body>
-            <tem:actualizarAmenidad>
-              <tem:amenidadEditada>
-                <tem:Id>{amenidad["Id"]}</tem:Id>
-                <tem:Nombre>{amenidad["Nombre"]}</tem:Nombre>
-                <tem:FechaRegistro>{fecha_registro}</tem:FechaRegistro>
-                <tem:UltimaFechaCambio>{ultima_fecha}</tem:UltimaFechaCambio>
-                <tem:EsActivo>{es_activo}</tem:EsActivo>
-              </tem:amenidadEditada>
-            </tem:actualizarAmenidad>
-          </soapenv:Body>
-        </soapenv:Envelope>"""
+        soap_body = _TMPL_ACTUALIZAR_AMENIDAD.substitute(
+            Id=amenidad["Id"],
+            Nombre=str(amenidad["Nombre"]).translate(_XML_ESCAPE),
+            FechaRegistro=fecha_registro,
+            UltimaFechaCambio=ultima_fecha,
+            EsActivo=es_activo,
+        )
 
         headers = {
-            "Content-Type": "text/xml; charset=utf-8",
             "SOAPAction": "http://tempuri.org/actualizarAmenidad",
         }
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parseo de la respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:actualizarAmenidadResult", ns)
+        root = etree.fromstring(response.content, _PARSER)
+        result_node = root.find(_PATH_ACTUALIZAR_AMENIDAD)
 
         if result_node is None:
             logger.warning("No se encontró el nodo 'actualizarAmenidadResult' en la respuesta SOAP.")
             return {"exito": False, "mensaje": "No se pudo determinar el resultado de la actualización."}
 
-        exito = result_node.text.strip().lower() == "true"
+        exito = (result_node.text or "").strip().lower() == "true"
 
         if exito:
-            logger.info(f"Amenidad ID={amenidad['Id']} actualizada correctamente.")
+            logger.info("Amenidad ID=%s actualizada correctamente.", amenidad['Id'])
+            _invalidarCache()
             return {"exito": True, "mensaje": f"Amenidad ID={amenidad['Id']} actualizada correctamente."}
         else:
-            logger.warning(f"No se pudo actualizar la amenidad ID={amenidad['Id']}.")
+            logger.warning("No se pudo actualizar la amenidad ID=%s.", amenidad['Id'])
             return {"exito": False, "mensaje": "No se realizó la actualización (posiblemente no existe la amenidad)."}
 
-    except Exception as ex:
-        logger.error(f"Error en actualizarAmenidad(): {ex}")
+    except (requests.RequestException, etree.ParseError, KeyError, ValueError) as ex:
+        logger.error("Error en actualizarAmenidad(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -135,69 +299,55 @@ def eliminarAmenidad(amenidad_id: int) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Eliminando (soft delete) amenidad con ID={amenidad_id} en WS_GestionAmenidades")
+    logger.info("Eliminando (soft delete) amenidad con ID=%s en WS_GestionAmenidades", amenidad_id)
 
-        # ======================================================
-        # Validación de entrada
-        # ======================================================
-        if not amenidad_id or amenidad_id <= 0:
-            return {"error": "El parámetro 'amenidad_id' debe ser un entero válido mayor que 0."}
+    # ======================================================
+    # Validación de entrada
+    # ======================================================
+    if not isinstance(amenidad_id, int) or amenidad_id <= 0:
+        return {"error": "El parámetro 'amenidad_id' debe ser un entero válido mayor que 0."}
 
+    try:
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:eliminarAmenidad>
-                 <tem:id>{amenidad_id}</tem:id>
-              </tem:eliminarAmenidad>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
+        soap_body = _ENV_ELIMINAR_AMENIDAD % amenidad_id
 
         headers = {
-            "Content-Type": "text/xml; charset=utf-8",
             "SOAPAction": "http://tempuri.org/eliminarAmenidad",
         }
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parseo del XML de respuesta
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:eliminarAmenidadResult", ns)
+        root = etree.fromstring(response.content, _PARSER)
+        result_node = root.find(_PATH_ELIMINAR_AMENIDAD)
 
         if result_node is None:
             logger.warning("No se encontró el nodo 'eliminarAmenidadResult' en la respuesta SOAP.")
             return {"exito": False, "mensaje": "No se pudo determinar el resultado de la eliminación."}
 
-        exito = result_node.text.strip().lower() == "true"
+        exito = (result_node.text or "").strip().lower() == "true"
 
         if exito:
-            logger.info(f"Amenidad ID={amenidad_id} eliminada (desactivada) correctamente.")
+            logger.info("Amenidad ID=%s eliminada (desactivada) correctamente.", amenidad_id)
+            _invalidarCache()
             return {"exito": True, "mensaje": f"Amenidad ID={amenidad_id} eliminada correctamente."}
         else:
-            logger.warning(f"No se pudo eliminar la amenidad ID={amenidad_id}.")
+            logger.warning("No se pudo eliminar la amenidad ID=%s.", amenidad_id)
             return {"exito": False, "mensaje": f"No se pudo eliminar la amenidad ID={amenidad_id} (posiblemente no existe o ya está inactiva)."}
 
-    except Exception as ex:
-        logger.error(f"Error en eliminarAmenidad(): {ex}")
+    except (requests.RequestException, etree.ParseError, KeyError, ValueError) as ex:
+        logger.error("Error en eliminarAmenidad(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -228,85 +378,77 @@ def insertarAmenidad(amenidad: dict) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Insertando nueva amenidad '{amenidad.get('Nombre')}' en WS_GestionAmenidades")
+    if not isinstance(amenidad, dict):
+        return {"error": "El parámetro 'amenidad' debe ser un diccionario."}
 
-        # ======================================================
-        # Validación de campos obligatorios
-        # ======================================================
-        if "Nombre" not in amenidad or not amenidad["Nombre"]:
-            return {"error": "El campo 'Nombre' es obligatorio para insertar una amenidad."}
+    logger.info("Insertando nueva amenidad '%s' en WS_GestionAmenidades", amenidad.get('Nombre'))
 
-        # Fechas por defecto si no se proporcionan
-        fecha_actual = datetime.now().isoformat()
+    # ======================================================
+    # Validación de campos obligatorios
+    # ======================================================
+    if "Nombre" not in amenidad or not amenidad["Nombre"]:
+        return {"error": "El campo 'Nombre' es obligatorio para insertar una amenidad."}
+
+    try:
+        # Fechas por defecto si no se proporcionan (solo se consulta el reloj si hace falta)
+        fecha_actual = None
+        if "FechaRegistro" not in amenidad or "UltimaFechaCambio" not in amenidad:
+            fecha_actual = datetime.now().isoformat()
         fecha_registro = amenidad.get("FechaRegistro", fecha_actual)
         ultima_fecha_cambio = amenidad.get("UltimaFechaCambio", fecha_actual)
-        es_activo = str(amenidad.get("EsActivo", True)).lower()
+        es_activo = _boolXml(amenidad.get("EsActivo", True))
         amenidad_id = amenidad.get("Id", 0)
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-          <soapenv:Header/>
-          <soapenv:Body>
-            <tem:insertarAmenidad>
-              <tem:nuevaAmenidad>
-                <tem:Id>{amenidad_id}</tem:Id>
-                <tem:Nombre>{amenidad["Nombre"]}</tem:Nombre>
-                <tem:FechaRegistro>{fecha_registro}</tem:FechaRegistro>
-                <tem:UltimaFechaCambio>{ultima_fecha_cambio}</tem:UltimaFechaCambio>
-                <tem:EsActivo>{es_activo}</tem:EsActivo>
-              </tem:nuevaAmenidad>
-            </tem:insertarAmenidad>
-          </soapenv:Body>
-        </soapenv:Envelope>"""
+        soap_body = _TMPL_INSERTAR_AMENIDAD.substitute(
+            Id=amenidad_id,
+            Nombre=str(amenidad["Nombre"]).translate(_XML_ESCAPE),
+            FechaRegistro=fecha_registro,
+            UltimaFechaCambio=ultima_fecha_cambio,
+            EsActivo=es_activo,
+        )
 
         headers = {
-            "Content-Type": "text/xml; charset=utf-8",
             "SOAPAction": "http://tempuri.org/insertarAmenidad",
         }
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parseo de la respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:insertarAmenidadResult", ns)
+        root = etree.fromstring(response.content, _PARSER)
+        result_node = root.find(_PATH_INSERTAR_AMENIDAD)
 
-        if result_node is None or not result_node.text.strip():
+        texto_id = (result_node.text or "").strip() if result_node is not None else ""
+        if not texto_id:
             logger.warning("No se encontró el nodo 'insertarAmenidadResult' en la respuesta SOAP.")
             return {"exito": False, "id_generado": None, "mensaje": "No se obtuvo un ID válido en la respuesta."}
 
         try:
-            id_generado = int(result_node.text.strip())
+            id_generado = int(texto_id)
         except ValueError:
             id_generado = None
 
         if id_generado and id_generado > 0:
-            logger.info(f"Amenidad '{amenidad['Nombre']}' insertada correctamente con ID={id_generado}.")
+            logger.info("Amenidad '%s' insertada correctamente con ID=%s.", amenidad['Nombre'], id_generado)
+            _invalidarCache()
             return {"exito": True, "id_generado": id_generado, "mensaje": f"Amenidad creada con ID={id_generado}."}
         else:
-            logger.warning(f"La respuesta SOAP no devolvió un ID válido: {result_node.text.strip()}")
+            logger.warning("La respuesta SOAP no devolvió un ID válido: %s", texto_id)
             return {"exito": False, "id_generado": None, "mensaje": "No se pudo crear la amenidad."}
 
-    except Exception as ex:
-        logger.error(f"Error en insertarAmenidad(): {ex}")
+    except (requests.RequestException, etree.ParseError, KeyError, ValueError) as ex:
+        logger.error("Error en insertarAmenidad(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -334,53 +476,38 @@ def seleccionarAmenidadPorId(amenidad_id: int) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Consultando amenidad con ID={amenidad_id} en WS_GestionAmenidades")
+    logger.info("Consultando amenidad con ID=%s en WS_GestionAmenidades", amenidad_id)
 
-        # ======================================================
-        # Validar parámetro
-        # ======================================================
-        if not amenidad_id or amenidad_id <= 0:
-            return {"error": "El parámetro 'amenidad_id' debe ser un entero válido mayor que 0."}
+    # ======================================================
+    # Validar parámetro
+    # ======================================================
+    if not isinstance(amenidad_id, int) or amenidad_id <= 0:
+        return {"error": "El parámetro 'amenidad_id' debe ser un entero válido mayor que 0."}
 
+    try:
         # ======================================================
         # Construir envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:seleccionarAmenidadPorId>
-                 <tem:id>{amenidad_id}</tem:id>
-              </tem:seleccionarAmenidadPorId>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
+        soap_body = _ENV_SELECCIONAR_AMENIDAD_POR_ID % amenidad_id
 
         headers = {
-            "Content-Type": "text/xml; charset=utf-8",
             "SOAPAction": "http://tempuri.org/seleccionarAmenidadPorId",
         }
 
         # ======================================================
         # Enviar solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parsear respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:seleccionarAmenidadPorIdResult", ns)
+        root = etree.fromstring(response.content, _PARSER)
+        result_node = root.find(_PATH_SELECCIONAR_AMENIDAD_POR_ID)
 
         if result_node is None:
             logger.warning("No se encontró el nodo 'seleccionarAmenidadPorIdResult' en la respuesta SOAP.")
@@ -388,22 +515,22 @@ def seleccionarAmenidadPorId(amenidad_id: int) -> dict:
 
         # Extraer los campos esperados
         amenidad = {
-            "Id": int(result_node.findtext("tem:Id", default="0", namespaces=ns)),
-            "Nombre": result_node.findtext("tem:Nombre", default="", namespaces=ns),
-            "FechaRegistro": result_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-            "UltimaFechaCambio": result_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-            "EsActivo": result_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
+            "Id": int(result_node.findtext(_TEM_ID, default="0")),
+            "Nombre": result_node.findtext(_TEM_NOMBRE, default=""),
+            "FechaRegistro": result_node.findtext(_TEM_FECHA_REGISTRO, default=""),
+            "UltimaFechaCambio": result_node.findtext(_TEM_ULTIMA_FECHA_CAMBIO, default=""),
+            "EsActivo": result_node.findtext(_TEM_ES_ACTIVO, default="false").lower() == "true",
         }
 
         if not amenidad["Id"]:
-            logger.warning(f"No se encontró una amenidad válida para el ID={amenidad_id}.")
+            logger.warning("No se encontró una amenidad válida para el ID=%s.", amenidad_id)
             return {"exito": False, "mensaje": "No se encontró la amenidad."}
 
-        logger.info(f"Amenidad ID={amenidad_id} obtenida correctamente.")
+        logger.info("Amenidad ID=%s obtenida correctamente.", amenidad_id)
         return {"exito": True, "amenidad": amenidad}
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarAmenidadPorId(): {ex}")
+    except (requests.RequestException, etree.ParseError, KeyError, ValueError) as ex:
+        logger.error("Error en seleccionarAmenidadPorId(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -432,72 +559,157 @@ def seleccionarAmenidades() -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
+    cacheado, generacion = _leerCache()
+    if cacheado is not None:
+        return cacheado
+
     try:
         logger.info("Consultando todas las amenidades activas en WS_GestionAmenidades")
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = """<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:seleccionarAmenidades/>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
+        soap_body = _ENV_SELECCIONAR_AMENIDADES
 
         headers = {
-            "Content-Type": "text/xml; charset=utf-8",
             "SOAPAction": "http://tempuri.org/seleccionarAmenidades",
         }
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
-        # Parseo de la respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:seleccionarAmenidadesResult", ns)
-
-        if result_node is None:
-            logger.warning("No se encontró el nodo 'seleccionarAmenidadesResult' en la respuesta SOAP.")
-            return {"exito": False, "amenidades": [], "mensaje": "No se encontraron amenidades activas."}
-
-        # ======================================================
-        # Recorrer las etiquetas <Amenidades> y construir la lista
+        # Parseo incremental de la respuesta XML (iterparse)
         # ======================================================
+        # Cada <Amenidades> se convierte en dict al cerrarse y se libera de
+        # inmediato, sin construir el árbol completo en memoria.
         amenidades = []
-        for amenidad_node in result_node.findall("tem:Amenidades", ns):
+        resultado_encontrado = False
+        for _, amenidad_node in etree.iterparse(
+            io.BytesIO(response.content),
+            events=("end",),
+            tag=(_TEM_AMENIDADES, _TEM_SELECCIONAR_AMENIDADES_RESULT),
+            huge_tree=False,
+            collect_ids=False,
+        ):
+            if amenidad_node.tag == _TEM_SELECCIONAR_AMENIDADES_RESULT:
+                resultado_encontrado = True
+                continue
+
+            result_node = amenidad_node.getparent()
+            if result_node is None or result_node.tag != _TEM_SELECCIONAR_AMENIDADES_RESULT:
+                continue
+
+            campos = _textosHijos(amenidad_node)
             amenidad = {
-                "Id": int(amenidad_node.findtext("tem:Id", default="0", namespaces=ns)),
-                "Nombre": amenidad_node.findtext("tem:Nombre", default="", namespaces=ns),
-                "FechaRegistro": amenidad_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                "UltimaFechaCambio": amenidad_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-                "EsActivo": amenidad_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
+                "Id": _aEntero(campos.get(_TEM_ID)),
+                "Nombre": campos.get(_TEM_NOMBRE, ""),
+                "FechaRegistro": campos.get(_TEM_FECHA_REGISTRO, ""),
+                "UltimaFechaCambio": campos.get(_TEM_ULTIMA_FECHA_CAMBIO, ""),
+                "EsActivo": campos.get(_TEM_ES_ACTIVO, "false").lower() == "true",
             }
             if amenidad["Id"] > 0:
                 amenidades.append(amenidad)
 
+            # Liberar el nodo procesado y los hermanos ya consumidos
+            amenidad_node.clear()
+            while amenidad_node.getprevious() is not None:
+                del result_node[0]
+
+        if not resultado_encontrado:
+            logger.warning("No se encontró el nodo 'seleccionarAmenidadesResult' en la respuesta SOAP.")
+            return {"exito": False, "amenidades": [], "mensaje": "No se encontraron amenidades activas."}
+
         if not amenidades:
             logger.info("No se encontraron amenidades activas en el sistema.")
-            return {"exito": True, "amenidades": [], "mensaje": "No existen amenidades activas."}
+            resultado = {"exito": True, "amenidades": [], "mensaje": "No existen amenidades activas."}
+            _guardarEnCache(resultado, generacion)
+            return copy.deepcopy(resultado)
+
+        logger.info("Se obtuvieron %s amenidades activas correctamente.", len(amenidades))
+        resultado = {"exito": True, "amenidades": amenidades, "mensaje": "Amenidades obtenidas correctamente."}
+        _guardarEnCache(resultado, generacion)
+        return copy.deepcopy(resultado)
+
+    except (requests.RequestException, etree.ParseError, KeyError, ValueError) as ex:
+        logger.error("Error en seleccionarAmenidades(): %s", ex)
+        return {"error": str(ex)}
+
 
-        logger.info(f"Se obtuvieron {len(amenidades)} amenidades activas correctamente.")
-        return {"exito": True, "amenidades": amenidades, "mensaje": "Amenidades obtenidas correctamente."}
+# ======================================================
+# FUNCIÓN: seleccionarAmenidadesPorIds
+# ======================================================
+def seleccionarAmenidadesPorIds(ids: list) -> list:
+    """
+    Obtiene varias amenidades por ID en una sola operación.
+
+    WS_GestionAmenidades solo expone la consulta individual, por lo que las
+    llamadas se lanzan en paralelo (ver seleccionarAmenidadesPorIds_async)
+    y el tiempo total es el de la más lenta, no la suma de todas.
+
+    Parámetros:
+        ids (list[int]): IDs de las amenidades a consultar.
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarAmenidades(): {ex}")
-        return {"error": str(ex)}
\ No newline at end of file
+    Retorna:
+        list[dict]: un resultado de seleccionarAmenidadPorId() por cada ID,
+        en el mismo orden de entrada. Un fallo en un ID no afecta a los
+        demás; su posición contiene {"error": str}.
+    """
+    if not ids:
+        return []
+    return _soap.ejecutar(seleccionarAmenidadesPorIds_async(ids))
+
+
+# ======================================================
+# VARIANTES ASÍNCRONAS
+# ======================================================
+# Cada variante ejecuta la función síncrona en un hilo del executor por defecto,
+# de modo que varias llamadas lanzadas con asyncio.gather se solapan en la red
+# reutilizando las conexiones del pool de _SESSION.
+async def actualizarAmenidad_async(amenidad: dict) -> dict:
+    """Versión asíncrona de actualizarAmenidad()."""
+    return await asyncio.to_thread(actualizarAmenidad, amenidad)
+
+
+async def eliminarAmenidad_async(amenidad_id: int) -> dict:
+    """Versión asíncrona de eliminarAmenidad()."""
+    return await asyncio.to_thread(eliminarAmenidad, amenidad_id)
+
+
+async def insertarAmenidad_async(amenidad: dict) -> dict:
+    """Versión asíncrona de insertarAmenidad()."""
+    return await asyncio.to_thread(insertarAmenidad, amenidad)
+
+
+async def seleccionarAmenidadPorId_async(amenidad_id: int) -> dict:
+    """Versión asíncrona de seleccionarAmenidadPorId()."""
+    return await asyncio.to_thread(seleccionarAmenidadPorId, amenidad_id)
+
+
+async def seleccionarAmenidades_async() -> dict:
+    """Versión asíncrona de seleccionarAmenidades()."""
+    return await asyncio.to_thread(seleccionarAmenidades)
+
+
+async def seleccionarAmenidadesPorIds_async(ids: list) -> list:
+    """Versión asíncrona de seleccionarAmenidadesPorIds()."""
+    return await _soap.reunir(seleccionarAmenidadPorId_async(amenidad_id) for amenidad_id in ids)
+
+
+# ======================================================
+# PRECALENTAMIENTO DE LA CONEXIÓN
+# ======================================================
+def precalentarConexion() -> None:
+    """
+    Abre en segundo plano la conexión TLS del pool para que la primera llamada
+    real la reutilice. No se ejecuta al importar el módulo: lo invoca el punto
+    de entrada del servidor (wsgi.py/asgi.py), así manage.py, las migraciones
+    y los tests no dependen de la red.
+    """
+    _soap.precalentar(_SESSION, SOAP_URL, "wsAmenidades")
@@ -1,7 +1,19 @@
+import asyncio
+import copy
+import hashlib
+import io
+import json
 import logging
 import requests
-import xml.etree.ElementTree as ET
+import string
+import threading
+import time
+import weakref
+from collections import namedtuple
+from concurrent.futures import Future
 from datetime import datetime
+from lxml import etree
+from webapp.servicios import _soap
 
 # ======================================================
 # CONFIGURACIÓN GLOBAL
@@ -9,16 +21,707 @@ from datetime import datetime
 SOAP_URL = "https://realdecuenca-btccaacvcpgyadhb.canadacentral-01.azurewebsites.net/WS_GestionResXEsp.asmx"
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Sesión HTTP compartida por todas las llamadas del módulo (ver _soap.crearSesion)
+_SESSION = _soap.crearSesion()
+
+# Caché TTL de las consultas de solo lectura por ID (seleccionarPorId y
+# seleccionarPorEspacio). Clave: (SOAPAction, hash del envelope). Se vacía
+# por completo tras cualquier escritura exitosa del módulo.
+# Durante la gracia posterior al TTL se sirve el valor vencido y se
+# revalida en segundo plano.
+_CONSULTAS_CACHE_TTL = 30  # segundos
+_CONSULTAS_CACHE_GRACIA = 30  # segundos
+_CONSULTAS_CACHE_MAX = 1024
+# espacioDisponible y calcularCosto comparten la misma caché (y su invalidación
+# tras escrituras) con TTL propio: la disponibilidad cambia antes que el precio.
+_DISPONIBILIDAD_CACHE_TTL = 15  # segundos
+_COSTO_CACHE_TTL = 60  # segundos
+_CONSULTAS_CACHE = {}
+_CONSULTAS_CACHE_LOCK = threading.Lock()
+_REVALIDANDO = set()
+# Consultas en vuelo por clave (single-flight): los fallos simultáneos de
+# caché para la misma clave esperan la única llamada SOAP en curso.
+_EN_CURSO = {}
+# Generación de la caché: _invalidarCache() la incrementa. Una consulta que
+# empezó antes de una escritura no guarda su resultado (ya desactualizado).
+_CACHE_GENERACION = 0
+
+# Parser libxml2 reutilizable para las respuestas con muchos nodos. Descarta
+# los espacios entre etiquetas y no resuelve entidades: aquí solo se leen los
+# textos de los campos, que se conservan tal cual.
+_PARSER = etree.XMLParser(
+    huge_tree=False,
+    collect_ids=False,
+    remove_blank_text=True,
+    resolve_entities=False,
+)
+
+# Etiquetas del namespace tempuri ya resueltas (notación Clark)
+_TEM = "{http://tempuri.org/}"
+_TEM_ID = _TEM + "Id"
+_TEM_COSTO_CALCULADO = _TEM + "CostoCalculado"
+_TEM_PUNTUACION_USUARIO = _TEM + "PuntuacionUsuario"
+_TEM_FECHA_INICIO = _TEM + "FechaInicio"
+_TEM_FECHA_FIN = _TEM + "FechaFin"
+_TEM_RESERVA_ID = _TEM + "ReservaId"
+_TEM_ESPACIO_ID = _TEM + "EspacioId"
+_TEM_MINUTOS_RETENCION = _TEM + "MinutosRetencion"
+_TEM_EXPIRA_EN = _TEM + "ExpiraEn"
+_TEM_ES_BLOQUEADA = _TEM + "EsBloqueada"
+_TEM_TOKEN_SESION = _TEM + "TokenSesion"
+_TEM_FECHA_REGISTRO = _TEM + "FechaRegistro"
+_TEM_ULTIMA_FECHA_CAMBIO = _TEM + "UltimaFechaCambio"
+_TEM_ES_ACTIVO = _TEM + "EsActivo"
+_TEM_ESPACIOS = _TEM + "Espacios"
+_TEM_RESERVAS = _TEM + "Reservas"
+_TEM_NOMBRE = _TEM + "Nombre"
+_TEM_MONEDA = _TEM + "Moneda"
+_TEM_COSTO_DIARIO = _TEM + "CostoDiario"
+_TEM_CAPACIDAD_ADULTOS = _TEM + "CapacidadAdultos"
+_TEM_CAPACIDAD_NINIOS = _TEM + "CapacidadNinios"
+_TEM_UBICACION = _TEM + "Ubicacion"
+_TEM_USUARIO_ID = _TEM + "UsuarioId"
+_TEM_ESTADO = _TEM + "Estado"
+_TEM_COSTO_FINAL = _TEM + "CostoFinal"
+_TEM_COMENTARIOS = _TEM + "Comentarios"
+_TEM_RESXESP = _TEM + "RESXESP"
+_TEM_SELECCIONAR_RELACIONES_RESULT = _TEM + "seleccionarRelacionesResult"
+_TEM_SELECCIONAR_POR_ESPACIO_RESULT = _TEM + "seleccionarPorEspacioResult"
+_TEM_OBTENER_RELACIONES_EXPIRADAS_RESULT = _TEM + "obtenerRelacionesExpiradasResult"
+_TEM_DESCRIPCION_DEL_LUGAR = _TEM + "DescripcionDelLugar"
+_TEM_PUNTUACION = _TEM + "Puntuacion"
+_TEM_USUARIO_EXTERNO_ID = _TEM + "UsuarioExternoId"
+_TEM_EMAIL = _TEM + "Email"
+_TEM_ROL = _TEM + "Rol"
+
+# Nodos anidados, nodos de resultado y Body SOAP (notación Clark)
+_TEM_HOTEL = _TEM + "Hotel"
+_TEM_TIPO_SERVICIO = _TEM + "TipoServicio"
+_TEM_TIPO_ALIMENTACION = _TEM + "TipoAlimentacion"
+_TEM_USUARIOS = _TEM + "Usuarios"
+_TEM_USUARIO_EXTERNO = _TEM + "UsuarioExterno"
+_TEM_SELECCIONAR_POR_ID_RESULT = _TEM + "seleccionarPorIdResult"
+_TEM_SELECCIONAR_POR_RESERVA_RESULT = _TEM + "seleccionarPorReservaResult"
+_TEM_INSERTAR_RELACION_RESULT = _TEM + "insertarRelacionResult"
+_TEM_ESPACIO_DISPONIBLE_RESULT = _TEM + "espacioDisponibleResult"
+_TEM_ELIMINAR_RELACION_RESULT = _TEM + "eliminarRelacionResult"
+_TEM_DESBLOQUEAR_RELACION_RESULT = _TEM + "desbloquearRelacionResult"
+_TEM_CALCULAR_COSTO_RESULT = _TEM + "calcularCostoResult"
+_TEM_ACTUALIZAR_RELACION_RESULT = _TEM + "actualizarRelacionResult"
+_TEM_ACTUALIZAR_PUNTUACION_RESULT = _TEM + "actualizarPuntuacionResult"
+
+
+# Filas de seleccionarRelaciones(como_tuplas=True): tuplas sin __dict__,
+# más ligeras que un dict por fila y con acceso a campos por atributo
+EspacioResumen = namedtuple("EspacioResumen", [
+    "Id", "Nombre", "Moneda", "CostoDiario", "CapacidadAdultos", "CapacidadNinios", "Ubicacion",
+])
+ReservaResumen = namedtuple("ReservaResumen", ["Id", "UsuarioId", "Estado", "CostoFinal", "Comentarios"])
+Relacion = namedtuple("Relacion", [
+    "Id", "CostoCalculado", "PuntuacionUsuario", "FechaInicio", "FechaFin", "ReservaId", "EspacioId",
+    "MinutosRetencion", "ExpiraEn", "EsBloqueada", "TokenSesion", "FechaRegistro", "UltimaFechaCambio",
+    "EsActivo", "Espacio", "Reserva",
+])
+
+# Envelopes SOAP precompilados como bytes compactos (sin sangría ni saltos
+# de línea). Los que reciben un ID tienen un único hueco %d; el resto se
+# envía tal cual en cada llamada.
+_ENV_TEM_INICIO = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"'
+    b' xmlns:tem="http://tempuri.org/"><soapenv:Body>'
+)
+_ENV_TEM_FIN = b"</soapenv:Body></soapenv:Envelope>"
+
+_ENV_SELECCIONAR_RELACIONES = _ENV_TEM_INICIO + b"<tem:seleccionarRelaciones/>" + _ENV_TEM_FIN
+_ENV_SELECCIONAR_POR_ID = (
+    _ENV_TEM_INICIO + b"<tem:seleccionarPorId><tem:id>%d</tem:id></tem:seleccionarPorId>" + _ENV_TEM_FIN
+)
+_ENV_SELECCIONAR_POR_ESPACIO = (
+    _ENV_TEM_INICIO
+    + b"<tem:seleccionarPorEspacio><tem:espacioId>%d</tem:espacioId></tem:seleccionarPorEspacio>"
+    + _ENV_TEM_FIN
+)
+_ENV_OBTENER_RELACIONES_EXPIRADAS = _ENV_TEM_INICIO + b"<tem:obtenerRelacionesExpiradas/>" + _ENV_TEM_FIN
+_ENV_SOAP_INICIO = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+)
+_ENV_SOAP_FIN = b"</soap:Body></soap:Envelope>"
+
+_ENV_SELECCIONAR_POR_RESERVA = (
+    _ENV_SOAP_INICIO
+    + b'<seleccionarPorReserva xmlns="http://tempuri.org/"><reservaId>%d</reservaId></seleccionarPorReserva>'
+    + _ENV_SOAP_FIN
+)
+
+# Escrituras con solo parámetros enteros o fechas: los valores enteros se
+# formatean con %d y las fechas se insertan ya codificadas con %b, así que
+# no hay paso intermedio por str ni .encode() del envelope completo.
+_ENV_ELIMINAR_RELACION = (
+    _ENV_SOAP_INICIO + b'<eliminarRelacion xmlns="http://tempuri.org/"><id>%d</id></eliminarRelacion>' + _ENV_SOAP_FIN
+)
+_ENV_DESBLOQUEAR_RELACION = (
+    _ENV_SOAP_INICIO
+    + b'<desbloquearRelacion xmlns="http://tempuri.org/"><id>%d</id></desbloquearRelacion>'
+    + _ENV_SOAP_FIN
+)
+_ENV_ACTUALIZAR_PUNTUACION = (
+    _ENV_SOAP_INICIO
+    + b'<actualizarPuntuacion xmlns="http://tempuri.org/">'
+    b"<idRelacion>%d</idRelacion><puntuacion>%d</puntuacion>"
+    b"</actualizarPuntuacion>"
+    + _ENV_SOAP_FIN
+)
+_ENV_ESPACIO_DISPONIBLE = (
+    _ENV_SOAP_INICIO
+    + b'<espacioDisponible xmlns="http://tempuri.org/">'
+    b"<espacioId>%d</espacioId><fechaInicio>%b</fechaInicio><fechaFin>%b</fechaFin>"
+    b"</espacioDisponible>"
+    + _ENV_SOAP_FIN
+)
+_ENV_CALCULAR_COSTO = (
+    _ENV_SOAP_INICIO
+    + b'<calcularCosto xmlns="http://tempuri.org/">'
+    b"<espacioId>%d</espacioId><fechaInicio>%b</fechaInicio><fechaFin>%b</fechaFin>"
+    b"</calcularCosto>"
+    + _ENV_SOAP_FIN
+)
+
+# Serialización xsd:boolean según el valor de verdad del campo
+_BOOL_XML = {True: "true", False: "false"}
+
+# Centinela para distinguir un campo ausente de uno enviado como None
+_FALTA = object()
+
+# Respuestas de validación fallida, construidas una sola vez. Cada llamada
+# devuelve una copia (dict(_ERR_...)): el original nunca sale del módulo.
+_ERR_ID_RELACION = {"error": "Debe proporcionar un 'id_relacion' válido (entero mayor que 0)."}
+_ERR_ESPACIO_ID = {"error": "Debe proporcionar un 'espacioId' válido (entero mayor que 0)."}
+_ERR_FECHAS = {"error": "Debe proporcionar 'fechaInicio' y 'fechaFin' válidas."}
+_ERR_ID_RELACION_PUNTUACION = {"error": "Debe proporcionar un 'idRelacion' válido (entero mayor que 0)."}
+_ERR_PUNTUACION = {"error": "La 'puntuacion' debe ser un número entero entre 0 y 5."}
+
+# Plantilla de insertarRelacion/actualizarRelacion: solo se sustituyen los
+# valores variables en cada llamada.
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+_TMPL_RELACION = string.Template("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+  <soap:Body>
+    <$operacion xmlns="http://tempuri.org/">
+      <$parametro>
+        <Id>$Id</Id>
+        <CostoCalculado>$CostoCalculado</CostoCalculado>
+        <PuntuacionUsuario>$PuntuacionUsuario</PuntuacionUsuario>
+        <FechaInicio>$FechaInicio</FechaInicio>
+        <FechaFin>$FechaFin</FechaFin>
+        <ReservaId>$ReservaId</ReservaId>
+        <EspacioId>$EspacioId</EspacioId>
+        <MinutosRetencion>$MinutosRetencion</MinutosRetencion>
+        <ExpiraEn>$ExpiraEn</ExpiraEn>
+        <EsBloqueada>$EsBloqueada</EsBloqueada>
+        <TokenSesion>$TokenSesion</TokenSesion>
+        <FechaRegistro>$FechaRegistro</FechaRegistro>
+        <UltimaFechaCambio>$UltimaFechaCambio</UltimaFechaCambio>
+        <EsActivo>$EsActivo</EsActivo>
+      </$parametro>
+    </$operacion>
+  </soap:Body>
+</soap:Envelope>""")
+
+# Cabeceras SOAPAction por operación, construidas una sola vez (el
+# Content-Type ya va en las cabeceras de _SESSION). requests solo las lee.
+_H_SELECCIONAR_RELACIONES = {"SOAPAction": "http://tempuri.org/seleccionarRelaciones"}
+_H_INSERTAR_RELACION = {"SOAPAction": "http://tempuri.org/insertarRelacion"}
+_H_ESPACIO_DISPONIBLE = {"SOAPAction": "http://tempuri.org/espacioDisponible"}
+_H_ELIMINAR_RELACION = {"SOAPAction": "http://tempuri.org/eliminarRelacion"}
+_H_DESBLOQUEAR_RELACION = {"SOAPAction": "http://tempuri.org/desbloquearRelacion"}
+_H_CALCULAR_COSTO = {"SOAPAction": "http://tempuri.org/calcularCosto"}
+_H_ACTUALIZAR_RELACION = {"SOAPAction": "http://tempuri.org/actualizarRelacion"}
+_H_ACTUALIZAR_PUNTUACION = {"SOAPAction": "http://tempuri.org/actualizarPuntuacion"}
+_H_CONSULTAS = {
+    accion: {"SOAPAction": "http://tempuri.org/" + accion}
+    for accion in ("seleccionarPorReserva", "seleccionarPorId", "seleccionarPorEspacio", "obtenerRelacionesExpiradas")
+}
+
+
+# ======================================================
+# CACHÉ DE RESPUESTAS SOAP
+# ======================================================
+def _claveCache(accion: str, cuerpo: bytes) -> tuple:
+    """Clave de caché de una consulta: (SOAPAction, hash del envelope enviado)."""
+    return (accion, hashlib.blake2b(cuerpo, digest_size=16).digest())
+
+
+def _leerCache(clave: tuple):
+    """Devuelve la entrada (expira_en, resultado, huella, json) de la clave, o None si no existe."""
+    with _CONSULTAS_CACHE_LOCK:
+        return _CONSULTAS_CACHE.get(clave)
+
+
+def _leerVigente(clave: tuple):
+    """Devuelve una copia del resultado cacheado si aún no expiró, o None."""
+    entrada = _leerCache(clave)
+    if entrada is None or time.monotonic() >= entrada[0]:
+        return None
+    return copy.deepcopy(entrada[1])
+
+
+def _generacionCache() -> int:
+    """Generación actual de la caché; se lee antes de enviar la consulta."""
+    with _CONSULTAS_CACHE_LOCK:
+        return _CACHE_GENERACION
+
+
+def _guardarEnCache(clave: tuple, resultado: dict, generacion: int, ttl: float = _CONSULTAS_CACHE_TTL, huella: bytes = b"") -> None:
+    """
+    Guarda un resultado exitoso; al llegar al máximo descarta la entrada más
+    antigua. No guarda nada si la caché se invalidó después de `generacion`.
+    """
+    with _CONSULTAS_CACHE_LOCK:
+        if generacion != _CACHE_GENERACION:
+            return
+        if clave not in _CONSULTAS_CACHE and len(_CONSULTAS_CACHE) >= _CONSULTAS_CACHE_MAX:
+            _CONSULTAS_CACHE.pop(next(iter(_CONSULTAS_CACHE)))
+        _CONSULTAS_CACHE[clave] = (time.monotonic() + ttl, copy.deepcopy(resultado), huella, None)
+
+
+def _jsonDeCache(clave: tuple):
+    """
+    Devuelve el resultado cacheado en `clave` serializado como JSON (bytes UTF-8),
+    o None si no hay entrada. Se serializa una sola vez por entrada; las
+    consultas siguientes reutilizan los mismos bytes.
+    """
+    entrada = _leerCache(clave)
+    if entrada is None:
+        return None
+    if entrada[3] is not None:
+        return entrada[3]
+
+    datos = _aJson(entrada[1])
+    with _CONSULTAS_CACHE_LOCK:
+        if _CONSULTAS_CACHE.get(clave) is entrada:
+            _CONSULTAS_CACHE[clave] = entrada[:3] + (datos,)
+    return datos
+
+
+def _aJson(resultado: dict) -> bytes:
+    """Serializa un resultado como JSON compacto en UTF-8."""
+    return json.dumps(resultado, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _invalidarCache() -> None:
+    """
+    Descarta todas las consultas cacheadas (tras insertar, actualizar o
+    eliminar). Las consultas en vuelo dejan de compartirse: quien llegue después
+    hace su propia llamada en vez de esperar un resultado anterior a la escritura.
+    """
+    global _CACHE_GENERACION
+    with _CONSULTAS_CACHE_LOCK:
+        _CACHE_GENERACION += 1
+        _CONSULTAS_CACHE.clear()
+        _EN_CURSO.clear()
+
+
+# ======================================================
+# REGISTRO LOCAL DE RELACIONES INSERTADAS
+# ======================================================
+# Relaciones que este proceso insertó hace poco, por espacio:
+# {espacioId: [(relacionId, inicio, fin, expira_en)]}. espacioDisponible()
+# responde "no disponible" sin llamar al servicio si el rango pedido se
+# solapa con alguna. Solo se usa para negar disponibilidad: si no hay
+# conflicto local, la consulta sigue yendo al servicio.
+# Cada entrada vive lo que dura la retención de la relación (MinutosRetencion
+# o ExpiraEn, en minutos); _RESERVAS_LOCALES_TTL solo se usa si no trae
+# ninguno de los dos.
+_RESERVAS_LOCALES_TTL = 300  # segundos
+_RESERVAS_LOCALES = {}
+_RESERVAS_LOCALES_LOCK = threading.Lock()
+
+
+def _aFecha(valor):
+    """Convierte una fecha ISO 8601 (str o datetime) a datetime, o None si no se puede."""
+    if isinstance(valor, datetime):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor))
+    except ValueError:
+        return None
+
+
+def _vigenciaRetencion(relacion: dict) -> float:
+    """
+    Segundos que el servicio retiene el espacio de una relación recién insertada:
+    el menor de MinutosRetencion y ExpiraEn que sea > 0. El servicio maneja
+    ambos como enteros en minutos (ver _CAMPOS_RELACION). Sin ninguno de los
+    dos, _RESERVAS_LOCALES_TTL.
+    """
+    plazos = []
+    for campo in ("MinutosRetencion", "ExpiraEn"):
+        try:
+            minutos = int(relacion.get(campo) or 0)
+        except (TypeError, ValueError):
+            continue
+        if minutos > 0:
+            plazos.append(minutos * 60)
+
+    return min(plazos) if plazos else _RESERVAS_LOCALES_TTL
+
+
+def _registrarReservaLocal(relacionId: int, espacioId, fechaInicio, fechaFin, vigencia: float) -> None:
+    """
+    Anota una relación recién insertada durante `vigencia` segundos. Se ignora
+    si las fechas no son ISO 8601, si el espacio no es un ID entero o si la
+    retención ya venció.
+    """
+    inicio, fin = _aFecha(fechaInicio), _aFecha(fechaFin)
+    if inicio is None or fin is None or vigencia <= 0:
+        return
+    # espacioDisponible() solo acepta IDs int: la clave se normaliza igual
+    try:
+        espacioId = int(str(espacioId).strip())
+    except ValueError:
+        return
+    with _RESERVAS_LOCALES_LOCK:
+        _RESERVAS_LOCALES.setdefault(espacioId, []).append(
+            (relacionId, inicio, fin, time.monotonic() + vigencia)
+        )
+
+
+def _olvidarReservaLocal(relacionId: int) -> None:
+    """Quita una relación del registro local (tras eliminarla, desbloquearla o editarla)."""
+    with _RESERVAS_LOCALES_LOCK:
+        for espacioId, reservas in list(_RESERVAS_LOCALES.items()):
+            reservas[:] = [r for r in reservas if r[0] != relacionId]
+            if not reservas:
+                del _RESERVAS_LOCALES[espacioId]
+
+
+def _hayConflictoLocal(espacioId: int, fechaInicio, fechaFin) -> bool:
+    """True si el rango se solapa con una relación insertada localmente y aún vigente."""
+    inicio, fin = _aFecha(fechaInicio), _aFecha(fechaFin)
+    if inicio is None or fin is None:
+        return False
+    ahora = time.monotonic()
+    with _RESERVAS_LOCALES_LOCK:
+        reservas = _RESERVAS_LOCALES.get(espacioId)
+        if not reservas:
+            return False
+        reservas[:] = [r for r in reservas if r[3] > ahora]
+        if not reservas:
+            del _RESERVAS_LOCALES[espacioId]
+            return False
+        try:
+            return any(inicio < r_fin and r_inicio < fin for _, r_inicio, r_fin, _ in reservas)
+        except TypeError:
+            # Mezcla de fechas con y sin zona horaria: se deja decidir al servicio
+            return False
+
+
+# ======================================================
+# LLAMADA SOAP COMPARTIDA
+# ======================================================
+def _llamarSoap(accion: str, cuerpo: bytes, parsear, cache_ttl: float = 0) -> dict:
+    """
+    Envía el envelope de una operación de consulta y convierte la respuesta con `parsear`.
+
+    Con cache_ttl > 0 el resultado ya convertido se guarda bajo (acción, hash del
+    cuerpo): una consulta repetida no vuelve a la red ni al parser XML. Vencido el
+    TTL, durante la gracia se devuelve el valor anterior y se revalida en segundo plano.
+    Solo se cachean los resultados exitosos; las excepciones se propagan al llamador.
+    """
+    if cache_ttl <= 0:
+        return _consultarSoap(accion, cuerpo, parsear)
+
+    clave = _claveCache(accion, cuerpo)
+    entrada = _leerCache(clave)
+    if entrada is not None:
+        expira_en, resultado = entrada[0], entrada[1]
+        ahora = time.monotonic()
+        if ahora < expira_en:
+            return copy.deepcopy(resultado)
+        if ahora < expira_en + _CONSULTAS_CACHE_GRACIA:
+            _revalidarEnSegundoPlano(accion, cuerpo, parsear, cache_ttl, clave)
+            return copy.deepcopy(resultado)
+
+    return _consultarUnaVez(accion, cuerpo, parsear, cache_ttl, clave)
+
+
+def _consultarUnaVez(accion: str, cuerpo: bytes, parsear, cache_ttl: float, clave: tuple) -> dict:
+    """
+    Ejecuta _consultarSoap() una sola vez por clave aunque varios hilos fallen
+    la caché a la vez: el primero hace la llamada y los demás esperan su
+    resultado (o su excepción) en el Future compartido.
+    """
+    with _CONSULTAS_CACHE_LOCK:
+        futuro = _EN_CURSO.get(clave)
+        propietario = futuro is None
+        if propietario:
+            futuro = _EN_CURSO[clave] = Future()
+            generacion = _CACHE_GENERACION
+
+    if not propietario:
+        return copy.deepcopy(futuro.result())
+
+    try:
+        resultado = _consultarSoap(accion, cuerpo, parsear, cache_ttl, clave, generacion)
+    except BaseException as ex:
+        futuro.set_exception(ex)
+        raise
+    else:
+        futuro.set_result(resultado)
+        # El resultado compartido no se entrega tal cual: los que esperan lo copian
+        return copy.deepcopy(resultado)
+    finally:
+        with _CONSULTAS_CACHE_LOCK:
+            # Tras una invalidación la clave puede pertenecer ya a otra consulta
+            if _EN_CURSO.get(clave) is futuro:
+                del _EN_CURSO[clave]
+
+
+def _consultarSoap(accion: str, cuerpo: bytes, parsear, cache_ttl: float = 0, clave: tuple = None, generacion: int = None) -> dict:
+    """
+    Realiza el POST y convierte la respuesta. Si la clave ya tiene en caché una
+    respuesta con el mismo contenido (misma huella), reutiliza el resultado
+    convertido sin volver a parsear el XML. `generacion` es la de la caché
+    antes del POST; si cambió mientras tanto, el resultado no se guarda.
+    """
+    response = _SESSION.post(
+        SOAP_URL,
+        data=cuerpo,
+        headers=_H_CONSULTAS[accion],
+        timeout=30,
+    )
+
+    if response.status_code != 200:
+        return _errorHttp(response)
+
+    if clave is None:
+        return parsear(response.content)
+
+    huella = hashlib.blake2b(response.content, digest_size=16).digest()
+    entrada = _leerCache(clave)
+    if entrada is not None and entrada[2] == huella:
+        # Contenido idéntico al cacheado: solo se renueva la vigencia
+        with _CONSULTAS_CACHE_LOCK:
+            if generacion == _CACHE_GENERACION and _CONSULTAS_CACHE.get(clave) is entrada:
+                _CONSULTAS_CACHE[clave] = (time.monotonic() + cache_ttl,) + entrada[1:]
+        return copy.deepcopy(entrada[1])
+
+    resultado = parsear(response.content)
+    if resultado.get("exito"):
+        _guardarEnCache(clave, resultado, generacion, cache_ttl, huella)
+    return resultado
+
+
+def _errorHttp(response) -> dict:
+    """
+    Registra y devuelve el error de una respuesta HTTP no exitosa.
+    response.text decodifica el cuerpo (y puede detectar la codificación) en
+    cada acceso, así que se lee una sola vez.
+    """
+    detalle = response.text
+    logger.error("HTTP %s: %s", response.status_code, detalle)
+    return {"error": f"HTTP {response.status_code}", "detalle": detalle}
+
+
+def _revalidarEnSegundoPlano(accion: str, cuerpo: bytes, parsear, cache_ttl: float, clave: tuple) -> None:
+    """Lanza (una sola vez por clave) la consulta que refresca una entrada vencida."""
+    with _CONSULTAS_CACHE_LOCK:
+        if clave in _REVALIDANDO:
+            return
+        _REVALIDANDO.add(clave)
+
+    def _revalidar():
+        try:
+            _consultarUnaVez(accion, cuerpo, parsear, cache_ttl, clave)
+        except Exception as ex:
+            logger.warning("No se pudo revalidar %s en segundo plano: %s", accion, ex)
+        finally:
+            with _CONSULTAS_CACHE_LOCK:
+                _REVALIDANDO.discard(clave)
+
+    threading.Thread(target=_revalidar, name="wsEspXRes-revalidar", daemon=True).start()
+
+
+# ======================================================
+# UTILIDADES DE PARSEO
+# ======================================================
+def _aEntero(texto: str) -> int:
+    """Convierte el texto de un campo numérico; vacío o ausente equivale a 0."""
+    return int(texto) if texto else 0
+
+
+def _aDecimal(texto: str) -> float:
+    """Convierte el texto de un campo decimal; vacío o ausente equivale a 0.0."""
+    return float(texto) if texto else 0.0
+
+
+def _aTexto(texto: str) -> str:
+    """Normaliza un campo de texto; ausente equivale a cadena vacía."""
+    return texto or ""
+
+
+def _aBooleano(texto: str) -> bool:
+    """
+    Convierte un campo xs:boolean ("true"/"false"/"1"/"0"); ausente o vacío equivale a False.
+    Basta el primer carácter: no crea la copia en minúsculas que haría str.lower().
+    """
+    return bool(texto) and texto[0] in "tT1"
+
+
+def _textosHijos(nodo) -> dict:
+    """Recorre una sola vez los hijos directos de un nodo y devuelve {etiqueta Clark: texto}."""
+    return {hijo.tag: hijo.text or "" for hijo in nodo}
+
+
+# Esquemas de campos: (clave de salida, etiqueta Clark, conversor).
+# Se aplican con _camposSegunEsquema() tras una sola pasada por los hijos del nodo.
+_CAMPOS_RELACION = (
+    ("Id", _TEM_ID, _aEntero),
+    ("CostoCalculado", _TEM_COSTO_CALCULADO, _aDecimal),
+    ("PuntuacionUsuario", _TEM_PUNTUACION_USUARIO, _aEntero),
+    ("FechaInicio", _TEM_FECHA_INICIO, _aTexto),
+    ("FechaFin", _TEM_FECHA_FIN, _aTexto),
+    ("ReservaId", _TEM_RESERVA_ID, _aEntero),
+    ("EspacioId", _TEM_ESPACIO_ID, _aEntero),
+    ("MinutosRetencion", _TEM_MINUTOS_RETENCION, _aEntero),
+    ("ExpiraEn", _TEM_EXPIRA_EN, _aEntero),
+    ("EsBloqueada", _TEM_ES_BLOQUEADA, _aBooleano),
+    ("TokenSesion", _TEM_TOKEN_SESION, _aTexto),
+    ("FechaRegistro", _TEM_FECHA_REGISTRO, _aTexto),
+    ("UltimaFechaCambio", _TEM_ULTIMA_FECHA_CAMBIO, _aTexto),
+    ("EsActivo", _TEM_ES_ACTIVO, _aBooleano),
+)
+
+_CAMPOS_ESPACIO = (
+    ("Id", _TEM_ID, _aEntero),
+    ("Nombre", _TEM_NOMBRE, _aTexto),
+    ("Moneda", _TEM_MONEDA, _aTexto),
+    ("CostoDiario", _TEM_COSTO_DIARIO, _aDecimal),
+    ("CapacidadAdultos", _TEM_CAPACIDAD_ADULTOS, _aEntero),
+    ("CapacidadNinios", _TEM_CAPACIDAD_NINIOS, _aEntero),
+    ("DescripcionDelLugar", _TEM_DESCRIPCION_DEL_LUGAR, _aTexto),
+    ("Ubicacion", _TEM_UBICACION, _aTexto),
+    ("Puntuacion", _TEM_PUNTUACION, _aEntero),
+    ("EsActivo", _TEM_ES_ACTIVO, _aBooleano),
+)
+
+_CAMPOS_RESERVA = (
+    ("Id", _TEM_ID, _aEntero),
+    ("UsuarioId", _TEM_USUARIO_ID, _aEntero),
+    ("Estado", _TEM_ESTADO, _aTexto),
+    ("CostoFinal", _TEM_COSTO_FINAL, _aDecimal),
+    ("Comentarios", _TEM_COMENTARIOS, _aTexto),
+    ("FechaRegistro", _TEM_FECHA_REGISTRO, _aTexto),
+    ("EsActivo", _TEM_ES_ACTIVO, _aBooleano),
+)
+
+# seleccionarPorId devuelve el Espacio y la Reserva con otra forma:
+# sin EsActivo y con los catálogos y usuarios anidados.
+_CAMPOS_ESPACIO_POR_ID = (
+    ("Id", _TEM_ID, _aEntero),
+    ("Nombre", _TEM_NOMBRE, _aTexto),
+    ("Moneda", _TEM_MONEDA, _aTexto),
+    ("CostoDiario", _TEM_COSTO_DIARIO, _aDecimal),
+    ("CapacidadAdultos", _TEM_CAPACIDAD_ADULTOS, _aEntero),
+    ("CapacidadNinios", _TEM_CAPACIDAD_NINIOS, _aEntero),
+    ("Ubicacion", _TEM_UBICACION, _aTexto),
+    ("DescripcionDelLugar", _TEM_DESCRIPCION_DEL_LUGAR, _aTexto),
+    ("Puntuacion", _TEM_PUNTUACION, _aEntero),
+)
+
+_CAMPOS_RESERVA_POR_ID = (
+    ("Id", _TEM_ID, _aEntero),
+    ("UsuarioId", _TEM_USUARIO_ID, _aEntero),
+    ("UsuarioExternoId", _TEM_USUARIO_EXTERNO_ID, _aEntero),
+    ("Estado", _TEM_ESTADO, _aTexto),
+    ("CostoFinal", _TEM_COSTO_FINAL, _aDecimal),
+    ("Comentarios", _TEM_COMENTARIOS, _aTexto),
+    ("FechaRegistro", _TEM_FECHA_REGISTRO, _aTexto),
+)
+
+_CAMPOS_CATALOGO = (
+    ("Id", _TEM_ID, _aEntero),
+    ("Nombre", _TEM_NOMBRE, _aTexto),
+)
+
+_CAMPOS_USUARIO = (
+    ("Id", _TEM_ID, _aEntero),
+    ("Nombre", _TEM_NOMBRE, _aTexto),
+    ("Email", _TEM_EMAIL, _aTexto),
+    ("Rol", _TEM_ROL, _aTexto),
+)
+
+
+def _camposSegunEsquema(nodo, esquema: tuple) -> dict:
+    """
+    Lee los hijos directos de `nodo` en una sola pasada y convierte cada campo del esquema.
+    Un nodo ausente (None) produce los valores por defecto de cada conversor.
+    """
+    if nodo is None:
+        return {clave: convertir(None) for clave, _, convertir in esquema}
+    # get ligado a una local: evita resolver el atributo en cada campo del esquema
+    texto_de = {hijo.tag: hijo.text for hijo in nodo}.get
+    return {clave: convertir(texto_de(etiqueta)) for clave, etiqueta, convertir in esquema}
+
+
+def _relacionComoDict(relacion: Relacion) -> dict:
+    """Convierte una Relacion al dict histórico (Espacio/Reserva solo si existen)."""
+    datos = relacion._asdict()
+    espacio = datos.pop("Espacio")
+    reserva = datos.pop("Reserva")
+    if espacio is not None:
+        datos["Espacio"] = espacio._asdict()
+    if reserva is not None:
+        datos["Reserva"] = reserva._asdict()
+    return datos
+
+
+def _relacionDetalladaDesdeNodo(node) -> dict:
+    """
+    Construye el dict de una fila RESXESP con su Espacio y Reserva (si existen).
+    Una sola pasada por los hijos de la fila separa los campos de texto de los
+    nodos anidados, sin búsquedas find() adicionales.
+    Usado por seleccionarPorEspacio() y obtenerRelacionesExpiradas().
+    """
+    textos = {}
+    espacio_node = reserva_node = None
+    for hijo in node:
+        etiqueta = hijo.tag
+        if etiqueta == _TEM_ESPACIOS:
+            espacio_node = hijo
+        elif etiqueta == _TEM_RESERVAS:
+            reserva_node = hijo
+        else:
+            textos[etiqueta] = hijo.text
+
+    texto_de = textos.get
+    relacion = {clave: convertir(texto_de(etiqueta)) for clave, etiqueta, convertir in _CAMPOS_RELACION}
+
+    if espacio_node is not None:
+        relacion["Espacio"] = _camposSegunEsquema(espacio_node, _CAMPOS_ESPACIO)
+
+    if reserva_node is not None:
+        relacion["Reserva"] = _camposSegunEsquema(reserva_node, _CAMPOS_RESERVA)
+
+    return relacion
 
 
 # ======================================================
 # FUNCIÓN: seleccionarRelaciones
 # ======================================================
-def seleccionarRelaciones() -> dict:
+def seleccionarRelaciones(como_tuplas: bool = False) -> dict:
     """
     Obtiene todas las relaciones activas entre reservas y espacios desde WS_GestionResXEsp.asmx.
 
+    Parámetros:
+        como_tuplas (bool): si es True, cada relación se devuelve como namedtuple
+            Relacion (con Espacio/Reserva como EspacioResumen/ReservaResumen o None)
+            en lugar de dict. Por defecto se mantienen los dicts serializables a JSON.
+
     Retorna:
         dict:
             {
@@ -35,185 +738,184 @@ def seleccionarRelaciones() -> dict:
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = """<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:seleccionarRelaciones/>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/seleccionarRelaciones",
-        }
+        soap_body = _ENV_SELECCIONAR_RELACIONES
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_SELECCIONAR_RELACIONES, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
-        # Parseo de la respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:seleccionarRelacionesResult", ns)
-
-        if result_node is None:
-            logger.warning("No se encontró el nodo 'seleccionarRelacionesResult' en la respuesta SOAP.")
-            return {"exito": False, "relaciones": [], "mensaje": "No se encontraron relaciones activas."}
-
-        # ======================================================
-        # Procesar nodos RESXESP
+        # Parseo incremental de la respuesta XML (iterparse)
         # ======================================================
+        # Cada RESXESP se convierte en dict al cerrarse y se libera de
+        # inmediato, evitando mantener el árbol completo en memoria.
         relaciones = []
-        for rel_node in result_node.findall("tem:RESXESP", ns):
-            try:
-                relacion = {
-                    "Id": int(rel_node.findtext("tem:Id", default="0", namespaces=ns)),
-                    "CostoCalculado": float(rel_node.findtext("tem:CostoCalculado", default="0", namespaces=ns)),
-                    "PuntuacionUsuario": int(rel_node.findtext("tem:PuntuacionUsuario", default="0", namespaces=ns)),
-                    "FechaInicio": rel_node.findtext("tem:FechaInicio", default="", namespaces=ns),
-                    "FechaFin": rel_node.findtext("tem:FechaFin", default="", namespaces=ns),
-                    "ReservaId": int(rel_node.findtext("tem:ReservaId", default="0", namespaces=ns)),
-                    "EspacioId": int(rel_node.findtext("tem:EspacioId", default="0", namespaces=ns)),
-                    "MinutosRetencion": int(rel_node.findtext("tem:MinutosRetencion", default="0", namespaces=ns)),
-                    "ExpiraEn": int(rel_node.findtext("tem:ExpiraEn", default="0", namespaces=ns)),
-                    "EsBloqueada": rel_node.findtext("tem:EsBloqueada", default="false", namespaces=ns).lower() == "true",
-                    "TokenSesion": rel_node.findtext("tem:TokenSesion", default="", namespaces=ns),
-                    "FechaRegistro": rel_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                    "UltimaFechaCambio": rel_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-                    "EsActivo": rel_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-                }
+        resultado_encontrado = False
+        for _, rel_node in etree.iterparse(
+            io.BytesIO(response.content),
+            events=("end",),
+            tag=(_TEM_RESXESP, _TEM_SELECCIONAR_RELACIONES_RESULT),
+            huge_tree=False,
+            collect_ids=False,
+            remove_blank_text=True,
+            resolve_entities=False,
+        ):
+            if rel_node.tag == _TEM_SELECCIONAR_RELACIONES_RESULT:
+                resultado_encontrado = True
+                continue
+
+            result_node = rel_node.getparent()
+            if result_node is None or result_node.tag != _TEM_SELECCIONAR_RELACIONES_RESULT:
+                continue
 
+            try:
                 # Extraer datos básicos de la reserva y espacio (si existen)
-                espacio_node = rel_node.find("tem:Espacios", ns)
-                reserva_node = rel_node.find("tem:Reservas", ns)
+                espacio_node = rel_node.find(_TEM_ESPACIOS)
+                reserva_node = rel_node.find(_TEM_RESERVAS)
 
+                espacio = None
                 if espacio_node is not None:
-                    relacion["Espacio"] = {
-                        "Id": int(espacio_node.findtext("tem:Id", default="0", namespaces=ns)),
-                        "Nombre": espacio_node.findtext("tem:Nombre", default="", namespaces=ns),
-                        "Moneda": espacio_node.findtext("tem:Moneda", default="", namespaces=ns),
-                        "CostoDiario": float(espacio_node.findtext("tem:CostoDiario", default="0", namespaces=ns)),
-                        "CapacidadAdultos": int(espacio_node.findtext("tem:CapacidadAdultos", default="0", namespaces=ns)),
-                        "CapacidadNinios": int(espacio_node.findtext("tem:CapacidadNinios", default="0", namespaces=ns)),
-                        "Ubicacion": espacio_node.findtext("tem:Ubicacion", default="", namespaces=ns),
-                    }
-
+                    campos_espacio = _textosHijos(espacio_node)
+                    espacio = EspacioResumen(
+                        _aEntero(campos_espacio.get(_TEM_ID)),
+                        campos_espacio.get(_TEM_NOMBRE, ""),
+                        campos_espacio.get(_TEM_MONEDA, ""),
+                        _aDecimal(campos_espacio.get(_TEM_COSTO_DIARIO)),
+                        _aEntero(campos_espacio.get(_TEM_CAPACIDAD_ADULTOS)),
+                        _aEntero(campos_espacio.get(_TEM_CAPACIDAD_NINIOS)),
+                        campos_espacio.get(_TEM_UBICACION, ""),
+                    )
+
+                reserva = None
                 if reserva_node is not None:
-                    relacion["Reserva"] = {
-                        "Id": int(reserva_node.findtext("tem:Id", default="0", namespaces=ns)),
-                        "UsuarioId": int(reserva_node.findtext("tem:UsuarioId", default="0", namespaces=ns)),
-                        "Estado": reserva_node.findtext("tem:Estado", default="", namespaces=ns),
-                        "CostoFinal": float(reserva_node.findtext("tem:CostoFinal", default="0", namespaces=ns)),
-                        "Comentarios": reserva_node.findtext("tem:Comentarios", default="", namespaces=ns),
-                    }
-
-                relaciones.append(relacion)
-
-            except Exception as e:
-                logger.warning(f"Error al procesar una relación: {e}")
+                    campos_reserva = _textosHijos(reserva_node)
+                    reserva = ReservaResumen(
+                        _aEntero(campos_reserva.get(_TEM_ID)),
+                        _aEntero(campos_reserva.get(_TEM_USUARIO_ID)),
+                        campos_reserva.get(_TEM_ESTADO, ""),
+                        _aDecimal(campos_reserva.get(_TEM_COSTO_FINAL)),
+                        campos_reserva.get(_TEM_COMENTARIOS, ""),
+                    )
+
+                campos = _textosHijos(rel_node)
+                relacion = Relacion(
+                    _aEntero(campos.get(_TEM_ID)),
+                    _aDecimal(campos.get(_TEM_COSTO_CALCULADO)),
+                    _aEntero(campos.get(_TEM_PUNTUACION_USUARIO)),
+                    campos.get(_TEM_FECHA_INICIO, ""),
+                    campos.get(_TEM_FECHA_FIN, ""),
+                    _aEntero(campos.get(_TEM_RESERVA_ID)),
+                    _aEntero(campos.get(_TEM_ESPACIO_ID)),
+                    _aEntero(campos.get(_TEM_MINUTOS_RETENCION)),
+                    _aEntero(campos.get(_TEM_EXPIRA_EN)),
+                    _aBooleano(campos.get(_TEM_ES_BLOQUEADA)),
+                    campos.get(_TEM_TOKEN_SESION, ""),
+                    campos.get(_TEM_FECHA_REGISTRO, ""),
+                    campos.get(_TEM_ULTIMA_FECHA_CAMBIO, ""),
+                    _aBooleano(campos.get(_TEM_ES_ACTIVO)),
+                    espacio,
+                    reserva,
+                )
+
+                relaciones.append(relacion if como_tuplas else _relacionComoDict(relacion))
+
+            except ValueError as e:
+                logger.warning("Error al procesar una relación: %s", e)
+
+            # Liberar el nodo procesado y los hermanos ya consumidos
+            rel_node.clear()
+            while rel_node.getprevious() is not None:
+                del result_node[0]
+
+        if not resultado_encontrado:
+            logger.warning("No se encontró el nodo 'seleccionarRelacionesResult' en la respuesta SOAP.")
+            return {"exito": False, "relaciones": [], "mensaje": "No se encontraron relaciones activas."}
 
         if not relaciones:
             logger.info("No se encontraron relaciones activas.")
             return {"exito": True, "relaciones": [], "mensaje": "No hay relaciones activas registradas."}
 
-        logger.info(f"Se encontraron {len(relaciones)} relaciones activas.")
+        logger.info("Se encontraron %s relaciones activas.", len(relaciones))
         return {"exito": True, "relaciones": relaciones, "mensaje": "Relaciones obtenidas correctamente."}
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarRelaciones(): {ex}")
+    except (requests.RequestException, etree.ParseError, ValueError) as ex:
+        logger.error("Error en seleccionarRelaciones(): %s", ex)
         return {"error": str(ex)}
 
 
 # ======================================================
 # FUNCIÓN: seleccionarPorReserva
 # ======================================================
-def seleccionarPorReserva(reservaId: int) -> dict:
-    """
-    Obtiene todas las relaciones asociadas a una reserva específica desde WS_GestionResXEsp.asmx.
-    """
+def _parsearPorReserva(contenido: bytes) -> dict:
+    """Convierte la respuesta de seleccionarPorReserva en el dict de resultado."""
+    root = etree.fromstring(contenido, _PARSER)
 
-    try:
-        if not isinstance(reservaId, int) or reservaId <= 0:
-            return {"error": "Debe proporcionar un 'reservaId' válido (entero mayor que 0)."}
-
-        logger.info(f"Consultando relaciones asociadas a la reserva ID={reservaId}...")
-
-        # Envelope SOAP correcto
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <seleccionarPorReserva xmlns="http://tempuri.org/">
-              <reservaId>{reservaId}</reservaId>
-            </seleccionarPorReserva>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/seleccionarPorReserva",
-        }
+    # Los elementos RESXESP son hijos directos del nodo resultado
+    result_node = _soap.nodoResultado(root, _TEM_SELECCIONAR_POR_RESERVA_RESULT)
+    relaciones = []
+    if result_node is not None:
+        relaciones = [
+            _camposSegunEsquema(rel_node, _CAMPOS_RELACION)
+            for rel_node in result_node.iterchildren(_TEM_RESXESP)
+        ]
 
-        # Envío de la solicitud
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+    if not relaciones:
+        return {"exito": True, "relaciones": [], "mensaje": "No existen relaciones para esta reserva."}
+    return {"exito": True, "relaciones": relaciones, "mensaje": "Relaciones obtenidas correctamente."}
 
-        if response.status_code != 200:
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
-
-        # Parsear XML
-        root = ET.fromstring(response.text)
-
-        # Detectar namespace del servicio
-        ns_tempuri = "{http://tempuri.org/}"
-
-        # Buscar los elementos RESXESP dentro del resultado
-        relaciones = []
-        for rel_node in root.findall(f".//{ns_tempuri}RESXESP"):
-            relacion = {
-                "Id": int(rel_node.findtext(f"{ns_tempuri}Id", "0")),
-                "CostoCalculado": float(rel_node.findtext(f"{ns_tempuri}CostoCalculado", "0")),
-                "PuntuacionUsuario": rel_node.findtext(f"{ns_tempuri}PuntuacionUsuario"),
-                "FechaInicio": rel_node.findtext(f"{ns_tempuri}FechaInicio"),
-                "FechaFin": rel_node.findtext(f"{ns_tempuri}FechaFin"),
-                "ReservaId": int(rel_node.findtext(f"{ns_tempuri}ReservaId", "0")),
-                "EspacioId": int(rel_node.findtext(f"{ns_tempuri}EspacioId", "0")),
-                "MinutosRetencion": int(rel_node.findtext(f"{ns_tempuri}MinutosRetencion", "0")),
-                "ExpiraEn": int(rel_node.findtext(f"{ns_tempuri}ExpiraEn", "0")),
-                "EsBloqueada": rel_node.findtext(f"{ns_tempuri}EsBloqueada", "false").lower() == "true",
-                "TokenSesion": rel_node.findtext(f"{ns_tempuri}TokenSesion", ""),
-                "FechaRegistro": rel_node.findtext(f"{ns_tempuri}FechaRegistro"),
-                "UltimaFechaCambio": rel_node.findtext(f"{ns_tempuri}UltimaFechaCambio"),
-                "EsActivo": rel_node.findtext(f"{ns_tempuri}EsActivo", "false").lower() == "true",
-            }
-            relaciones.append(relacion)
 
-        if not relaciones:
-            logger.info("No se encontraron relaciones asociadas a esta reserva.")
-            return {"exito": True, "relaciones": [], "mensaje": "No existen relaciones para esta reserva."}
+def seleccionarPorReserva(reservaId: int) -> dict:
+    """
+    Obtiene todas las relaciones asociadas a una reserva específica desde WS_GestionResXEsp.asmx.
+    """
+    return _consultar("seleccionarPorReserva", reservaId)
 
-        logger.info(f"Se encontraron {len(relaciones)} relaciones para la reserva {reservaId}.")
-        return {"exito": True, "relaciones": relaciones, "mensaje": "Relaciones obtenidas correctamente."}
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarPorReserva(): {ex}")
-        return {"error": str(ex)}
 # ======================================================
 # FUNCIÓN: seleccionarPorId
 # ======================================================
+def _parsearPorId(contenido: bytes) -> dict:
+    """Convierte la respuesta de seleccionarPorId en el dict de resultado."""
+    root = etree.fromstring(contenido, _PARSER)
+    result_node = _soap.nodoResultado(root, _TEM_SELECCIONAR_POR_ID_RESULT)
+
+    if result_node is None:
+        logger.warning("No se encontró el nodo 'seleccionarPorIdResult' en la respuesta SOAP.")
+        return {"exito": False, "relacion": None, "mensaje": "No se encontró la relación solicitada."}
+
+    # ======================================================
+    # Procesar nodo principal RESXESP
+    # ======================================================
+    relacion = _camposSegunEsquema(result_node, _CAMPOS_RELACION)
+
+    # ------------------------------------------------------
+    # Procesar el nodo Espacios
+    # ------------------------------------------------------
+    espacio_node = result_node.find(_TEM_ESPACIOS)
+    if espacio_node is not None:
+        espacio = _camposSegunEsquema(espacio_node, _CAMPOS_ESPACIO_POR_ID)
+        espacio["Hotel"] = _camposSegunEsquema(espacio_node.find(_TEM_HOTEL), _CAMPOS_CATALOGO)
+        espacio["TipoServicio"] = _camposSegunEsquema(espacio_node.find(_TEM_TIPO_SERVICIO), _CAMPOS_CATALOGO)
+        espacio["TipoAlimentacion"] = _camposSegunEsquema(espacio_node.find(_TEM_TIPO_ALIMENTACION), _CAMPOS_CATALOGO)
+        relacion["Espacio"] = espacio
+
+    # ------------------------------------------------------
+    # Procesar el nodo Reservas
+    # ------------------------------------------------------
+    reserva_node = result_node.find(_TEM_RESERVAS)
+    if reserva_node is not None:
+        reserva = _camposSegunEsquema(reserva_node, _CAMPOS_RESERVA_POR_ID)
+        reserva["UsuarioInterno"] = _camposSegunEsquema(reserva_node.find(_TEM_USUARIOS), _CAMPOS_USUARIO)
+        reserva["UsuarioExterno"] = _camposSegunEsquema(reserva_node.find(_TEM_USUARIO_EXTERNO), _CAMPOS_USUARIO)
+        relacion["Reserva"] = reserva
+
+    return {"exito": True, "relacion": relacion, "mensaje": "Relación obtenida correctamente."}
+
+
 def seleccionarPorId(relacionId: int) -> dict:
     """
     Obtiene una relación específica entre reserva y espacio por su ID desde WS_GestionResXEsp.asmx.
@@ -231,142 +933,70 @@ def seleccionarPorId(relacionId: int) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        if not isinstance(relacionId, int) or relacionId <= 0:
-            return {"error": "Debe proporcionar un 'relacionId' válido (entero mayor que 0)."}
+    return _consultar("seleccionarPorId", relacionId)
 
-        logger.info(f"Consultando relación con ID={relacionId}...")
 
-        # ======================================================
-        # Construcción del envelope SOAP (SOAP 1.1)
-        # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:seleccionarPorId>
-                 <tem:id>{relacionId}</tem:id>
-              </tem:seleccionarPorId>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/seleccionarPorId",
-        }
-
-        # ======================================================
-        # Envío de la solicitud SOAP
-        # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
-
-        if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
-
-        # ======================================================
-        # Parseo de la respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:seleccionarPorIdResult", ns)
-
-        if result_node is None:
-            logger.warning("No se encontró el nodo 'seleccionarPorIdResult' en la respuesta SOAP.")
-            return {"exito": False, "relacion": None, "mensaje": "No se encontró la relación solicitada."}
-
-        # ======================================================
-        # Procesar nodo principal RESXESP
-        # ======================================================
-        relacion = {
-            "Id": int(result_node.findtext("tem:Id", default="0", namespaces=ns)),
-            "CostoCalculado": float(result_node.findtext("tem:CostoCalculado", default="0", namespaces=ns)),
-            "PuntuacionUsuario": int(result_node.findtext("tem:PuntuacionUsuario", default="0", namespaces=ns)),
-            "FechaInicio": result_node.findtext("tem:FechaInicio", default="", namespaces=ns),
-            "FechaFin": result_node.findtext("tem:FechaFin", default="", namespaces=ns),
-            "ReservaId": int(result_node.findtext("tem:ReservaId", default="0", namespaces=ns)),
-            "EspacioId": int(result_node.findtext("tem:EspacioId", default="0", namespaces=ns)),
-            "MinutosRetencion": int(result_node.findtext("tem:MinutosRetencion", default="0", namespaces=ns)),
-            "ExpiraEn": int(result_node.findtext("tem:ExpiraEn", default="0", namespaces=ns)),
-            "EsBloqueada": result_node.findtext("tem:EsBloqueada", default="false", namespaces=ns).lower() == "true",
-            "TokenSesion": result_node.findtext("tem:TokenSesion", default="", namespaces=ns),
-            "FechaRegistro": result_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-            "UltimaFechaCambio": result_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-            "EsActivo": result_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-        }
-
-        # ------------------------------------------------------
-        # Procesar el nodo Espacios
-        # ------------------------------------------------------
-        espacio_node = result_node.find("tem:Espacios", ns)
-        if espacio_node is not None:
-            relacion["Espacio"] = {
-                "Id": int(espacio_node.findtext("tem:Id", default="0", namespaces=ns)),
-                "Nombre": espacio_node.findtext("tem:Nombre", default="", namespaces=ns),
-                "Moneda": espacio_node.findtext("tem:Moneda", default="", namespaces=ns),
-                "CostoDiario": float(espacio_node.findtext("tem:CostoDiario", default="0", namespaces=ns)),
-                "CapacidadAdultos": int(espacio_node.findtext("tem:CapacidadAdultos", default="0", namespaces=ns)),
-                "CapacidadNinios": int(espacio_node.findtext("tem:CapacidadNinios", default="0", namespaces=ns)),
-                "Ubicacion": espacio_node.findtext("tem:Ubicacion", default="", namespaces=ns),
-                "DescripcionDelLugar": espacio_node.findtext("tem:DescripcionDelLugar", default="", namespaces=ns),
-                "Puntuacion": int(espacio_node.findtext("tem:Puntuacion", default="0", namespaces=ns)),
-                "Hotel": {
-                    "Id": int(espacio_node.findtext("tem:Hotel/tem:Id", default="0", namespaces=ns)),
-                    "Nombre": espacio_node.findtext("tem:Hotel/tem:Nombre", default="", namespaces=ns),
-                },
-                "TipoServicio": {
-                    "Id": int(espacio_node.findtext("tem:TipoServicio/tem:Id", default="0", namespaces=ns)),
-                    "Nombre": espacio_node.findtext("tem:TipoServicio/tem:Nombre", default="", namespaces=ns),
-                },
-                "TipoAlimentacion": {
-                    "Id": int(espacio_node.findtext("tem:TipoAlimentacion/tem:Id", default="0", namespaces=ns)),
-                    "Nombre": espacio_node.findtext("tem:TipoAlimentacion/tem:Nombre", default="", namespaces=ns),
-                },
-            }
-
-        # ------------------------------------------------------
-        # Procesar el nodo Reservas
-        # ------------------------------------------------------
-        reserva_node = result_node.find("tem:Reservas", ns)
-        if reserva_node is not None:
-            relacion["Reserva"] = {
-                "Id": int(reserva_node.findtext("tem:Id", default="0", namespaces=ns)),
-                "UsuarioId": int(reserva_node.findtext("tem:UsuarioId", default="0", namespaces=ns)),
-                "UsuarioExternoId": int(reserva_node.findtext("tem:UsuarioExternoId", default="0", namespaces=ns)),
-                "Estado": reserva_node.findtext("tem:Estado", default="", namespaces=ns),
-                "CostoFinal": float(reserva_node.findtext("tem:CostoFinal", default="0", namespaces=ns)),
-                "Comentarios": reserva_node.findtext("tem:Comentarios", default="", namespaces=ns),
-                "FechaRegistro": reserva_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                "UsuarioInterno": {
-                    "Id": int(reserva_node.findtext("tem:Usuarios/tem:Id", default="0", namespaces=ns)),
-                    "Nombre": reserva_node.findtext("tem:Usuarios/tem:Nombre", default="", namespaces=ns),
-                    "Email": reserva_node.findtext("tem:Usuarios/tem:Email", default="", namespaces=ns),
-                    "Rol": reserva_node.findtext("tem:Usuarios/tem:Rol", default="", namespaces=ns),
-                },
-                "UsuarioExterno": {
-                    "Id": int(reserva_node.findtext("tem:UsuarioExterno/tem:Id", default="0", namespaces=ns)),
-                    "Nombre": reserva_node.findtext("tem:UsuarioExterno/tem:Nombre", default="", namespaces=ns),
-                    "Email": reserva_node.findtext("tem:UsuarioExterno/tem:Email", default="", namespaces=ns),
-                    "Rol": reserva_node.findtext("tem:UsuarioExterno/tem:Rol", default="", namespaces=ns),
-                },
-            }
-
-        logger.info(f"Relación ID={relacionId} obtenida correctamente.")
-        return {"exito": True, "relacion": relacion, "mensaje": "Relación obtenida correctamente."}
+# ======================================================
+# FUNCIÓN: seleccionarPorId_json
+# ======================================================
+def seleccionarPorId_json(relacionId: int) -> bytes:
+    """
+    Igual que seleccionarPorId(), pero devuelve el resultado ya serializado como
+    JSON (bytes UTF-8), listo para HttpResponse(..., content_type="application/json").
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarPorId(): {ex}")
-        return {"error": str(ex)}
+    Mientras la relación siga en caché se devuelven los mismos bytes, sin volver
+    a serializar el dict en cada petición.
+    """
+    resultado = seleccionarPorId(relacionId)
+    if resultado.get("exito"):
+        datos = _jsonDeCache(_claveCache("seleccionarPorId", _CONSULTAS["seleccionarPorId"].envelope % relacionId))
+        if datos is not None:
+            return datos
+    return _aJson(resultado)
 
 
 # ======================================================
 # FUNCIÓN: seleccionarPorEspacio
 # ======================================================
+def _parsearRelacionesDetalladas(contenido: bytes, etiqueta_resultado: str) -> list:
+    """
+    Convierte las filas RESXESP hijas directas de `etiqueta_resultado` en dicts.
+
+    Parseo incremental: cada RESXESP se convierte en dict al cerrarse
+    y se libera de inmediato, sin mantener el árbol completo en memoria.
+    """
+    relaciones = []
+    for _, node in etree.iterparse(
+        io.BytesIO(contenido),
+        events=("end",),
+        tag=_TEM_RESXESP,
+        huge_tree=False,
+        collect_ids=False,
+        remove_blank_text=True,
+        resolve_entities=False,
+    ):
+        result_node = node.getparent()
+        if result_node is None or result_node.tag != etiqueta_resultado:
+            continue
+
+        relaciones.append(_relacionDetalladaDesdeNodo(node))
+
+        # Liberar el nodo procesado y los hermanos ya consumidos
+        node.clear()
+        while node.getprevious() is not None:
+            del result_node[0]
+    return relaciones
+
+
+def _parsearPorEspacio(contenido: bytes) -> dict:
+    """Convierte la respuesta de seleccionarPorEspacio en el dict de resultado."""
+    relaciones = _parsearRelacionesDetalladas(contenido, _TEM_SELECCIONAR_POR_ESPACIO_RESULT)
+
+    if not relaciones:
+        return {"exito": False, "relaciones": [], "mensaje": "No se encontraron relaciones para el espacio indicado."}
+    return {"exito": True, "relaciones": relaciones, "mensaje": "Relaciones obtenidas correctamente."}
+
+
 def seleccionarPorEspacio(espacioId: int) -> dict:
     """
     Obtiene todas las relaciones (RESXESP) asociadas a un espacio.
@@ -384,123 +1014,29 @@ def seleccionarPorEspacio(espacioId: int) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
+    return _consultar("seleccionarPorEspacio", espacioId)
 
-    try:
-        if not isinstance(espacioId, int) or espacioId <= 0:
-            return {"error": "Debe proporcionar un 'espacioId' válido (entero mayor que 0)."}
-
-        logger.info(f"Consultando relaciones del espacio con ID={espacioId}...")
 
-        # ======================================================
-        # Construcción del cuerpo SOAP (versión 1.1)
-        # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:seleccionarPorEspacio>
-                 <tem:espacioId>{espacioId}</tem:espacioId>
-              </tem:seleccionarPorEspacio>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/seleccionarPorEspacio",
-        }
-
-        # ======================================================
-        # Envío de la solicitud SOAP
-        # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
-
-        if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+# ======================================================
+# FUNCIÓN: obtenerRelacionesExpiradas
+# ======================================================
+def _parsearExpiradas(contenido: bytes) -> dict:
+    """Convierte la respuesta de obtenerRelacionesExpiradas en el dict de resultado."""
+    relaciones = _parsearRelacionesDetalladas(contenido, _TEM_OBTENER_RELACIONES_EXPIRADAS_RESULT)
 
-        # ======================================================
-        # Parseo del XML de respuesta
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
+    if not relaciones:
+        return {
+            "exito": False,
+            "relaciones": [],
+            "mensaje": "No se encontraron relaciones expiradas."
         }
+    return {
+        "exito": True,
+        "relaciones": relaciones,
+        "mensaje": f"{len(relaciones)} relaciones expiradas obtenidas correctamente."
+    }
 
-        root = ET.fromstring(response.text)
-        result_nodes = root.findall(".//tem:seleccionarPorEspacioResult/tem:RESXESP", ns)
-
-        if not result_nodes:
-            return {"exito": False, "relaciones": [], "mensaje": "No se encontraron relaciones para el espacio indicado."}
 
-        relaciones = []
-
-        # ======================================================
-        # Procesamiento de cada nodo RESXESP
-        # ======================================================
-        for node in result_nodes:
-            relacion = {
-                "Id": int(node.findtext("tem:Id", default="0", namespaces=ns)),
-                "CostoCalculado": float(node.findtext("tem:CostoCalculado", default="0", namespaces=ns)),
-                "PuntuacionUsuario": int(node.findtext("tem:PuntuacionUsuario", default="0", namespaces=ns)),
-                "FechaInicio": node.findtext("tem:FechaInicio", default="", namespaces=ns),
-                "FechaFin": node.findtext("tem:FechaFin", default="", namespaces=ns),
-                "ReservaId": int(node.findtext("tem:ReservaId", default="0", namespaces=ns)),
-                "EspacioId": int(node.findtext("tem:EspacioId", default="0", namespaces=ns)),
-                "MinutosRetencion": int(node.findtext("tem:MinutosRetencion", default="0", namespaces=ns)),
-                "ExpiraEn": int(node.findtext("tem:ExpiraEn", default="0", namespaces=ns)),
-                "EsBloqueada": node.findtext("tem:EsBloqueada", default="false", namespaces=ns).lower() == "true",
-                "TokenSesion": node.findtext("tem:TokenSesion", default="", namespaces=ns),
-                "FechaRegistro": node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                "UltimaFechaCambio": node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-                "EsActivo": node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-            }
-
-            # ------------------------------------------------------
-            # Espacio asociado
-            # ------------------------------------------------------
-            espacio_node = node.find("tem:Espacios", ns)
-            if espacio_node is not None:
-                relacion["Espacio"] = {
-                    "Id": int(espacio_node.findtext("tem:Id", default="0", namespaces=ns)),
-                    "Nombre": espacio_node.findtext("tem:Nombre", default="", namespaces=ns),
-                    "Moneda": espacio_node.findtext("tem:Moneda", default="", namespaces=ns),
-                    "CostoDiario": float(espacio_node.findtext("tem:CostoDiario", default="0", namespaces=ns)),
-                    "CapacidadAdultos": int(espacio_node.findtext("tem:CapacidadAdultos", default="0", namespaces=ns)),
-                    "CapacidadNinios": int(espacio_node.findtext("tem:CapacidadNinios", default="0", namespaces=ns)),
-                    "DescripcionDelLugar": espacio_node.findtext("tem:DescripcionDelLugar", default="", namespaces=ns),
-                    "Ubicacion": espacio_node.findtext("tem:Ubicacion", default="", namespaces=ns),
-                    "Puntuacion": int(espacio_node.findtext("tem:Puntuacion", default="0", namespaces=ns)),
-                    "EsActivo": espacio_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-                }
-
-            # ------------------------------------------------------
-            # Reserva asociada
-            # ------------------------------------------------------
-            reserva_node = node.find("tem:Reservas", ns)
-            if reserva_node is not None:
-                relacion["Reserva"] = {
-                    "Id": int(reserva_node.findtext("tem:Id", default="0", namespaces=ns)),
-                    "UsuarioId": int(reserva_node.findtext("tem:UsuarioId", default="0", namespaces=ns)),
-                    "Estado": reserva_node.findtext("tem:Estado", default="", namespaces=ns),
-                    "CostoFinal": float(reserva_node.findtext("tem:CostoFinal", default="0", namespaces=ns)),
-                    "Comentarios": reserva_node.findtext("tem:Comentarios", default="", namespaces=ns),
-                    "FechaRegistro": reserva_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                    "EsActivo": reserva_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-                }
-
-            relaciones.append(relacion)
-
-        logger.info(f"{len(relaciones)} relaciones encontradas para espacio {espacioId}.")
-        return {"exito": True, "relaciones": relaciones, "mensaje": "Relaciones obtenidas correctamente."}
-
-    except Exception as ex:
-        logger.error(f"Error en seleccionarPorEspacio(): {ex}")
-        return {"error": str(ex)}
-
-# ======================================================
-# FUNCIÓN: obtenerRelacionesExpiradas
-# ======================================================
 def obtenerRelacionesExpiradas() -> dict:
     """
     Obtiene todas las relaciones Reserva × Espacio que han expirado.
@@ -515,123 +1051,58 @@ def obtenerRelacionesExpiradas() -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
+    return _consultar("obtenerRelacionesExpiradas")
 
-    try:
-        logger.info("Consultando relaciones Reserva×Espacio expiradas...")
-
-        # ======================================================
-        # Cuerpo SOAP (versión 1.1)
-        # ======================================================
-        soap_body = """<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:obtenerRelacionesExpiradas/>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/obtenerRelacionesExpiradas",
-        }
-
-        # ======================================================
-        # Envío de solicitud SOAP
-        # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
-
-        if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        # ======================================================
-        # Parseo de respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_nodes = root.findall(".//tem:obtenerRelacionesExpiradasResult/tem:RESXESP", ns)
-
-        if not result_nodes:
-            return {
-                "exito": False,
-                "relaciones": [],
-                "mensaje": "No se encontraron relaciones expiradas."
-            }
-
-        relaciones = []
+# ======================================================
+# CONSULTA GENÉRICA
+# ======================================================
+# Forma de cada consulta de lectura: envelope (con hueco %d si recibe un ID),
+# nombre del parámetro para el mensaje de validación (None si no recibe),
+# parser de la respuesta y TTL de caché (0 = sin caché).
+_FormaConsulta = namedtuple("_FormaConsulta", ["envelope", "parametro", "parsear", "cache_ttl"])
+
+_CONSULTAS = {
+    "seleccionarPorReserva": _FormaConsulta(_ENV_SELECCIONAR_POR_RESERVA, "reservaId", _parsearPorReserva, 0),
+    "seleccionarPorId": _FormaConsulta(_ENV_SELECCIONAR_POR_ID, "relacionId", _parsearPorId, _CONSULTAS_CACHE_TTL),
+    "seleccionarPorEspacio": _FormaConsulta(
+        _ENV_SELECCIONAR_POR_ESPACIO, "espacioId", _parsearPorEspacio, _CONSULTAS_CACHE_TTL
+    ),
+    "obtenerRelacionesExpiradas": _FormaConsulta(_ENV_OBTENER_RELACIONES_EXPIRADAS, None, _parsearExpiradas, 0),
+}
+
+
+def _consultar(nombre: str, valor: int = None) -> dict:
+    """
+    Ejecuta una consulta de _CONSULTAS: valida el ID (si la operación recibe uno),
+    arma el envelope, la envía con _llamarSoap() y registra el resultado.
+    """
+    forma = _CONSULTAS[nombre]
+    try:
+        if forma.parametro is None:
+            cuerpo = forma.envelope
+            logger.info("Consultando %s...", nombre)
+        else:
+            if type(valor) is not int or valor <= 0:
+                return {"error": f"Debe proporcionar un '{forma.parametro}' válido (entero mayor que 0)."}
+            cuerpo = forma.envelope % valor
+            logger.info("Consultando %s con %s=%s...", nombre, forma.parametro, valor)
 
-        # ======================================================
-        # Procesamiento de cada relación RESXESP
-        # ======================================================
-        for node in result_nodes:
-            relacion = {
-                "Id": int(node.findtext("tem:Id", default="0", namespaces=ns)),
-                "CostoCalculado": float(node.findtext("tem:CostoCalculado", default="0", namespaces=ns)),
-                "PuntuacionUsuario": int(node.findtext("tem:PuntuacionUsuario", default="0", namespaces=ns)),
-                "FechaInicio": node.findtext("tem:FechaInicio", default="", namespaces=ns),
-                "FechaFin": node.findtext("tem:FechaFin", default="", namespaces=ns),
-                "ReservaId": int(node.findtext("tem:ReservaId", default="0", namespaces=ns)),
-                "EspacioId": int(node.findtext("tem:EspacioId", default="0", namespaces=ns)),
-                "MinutosRetencion": int(node.findtext("tem:MinutosRetencion", default="0", namespaces=ns)),
-                "ExpiraEn": int(node.findtext("tem:ExpiraEn", default="0", namespaces=ns)),
-                "EsBloqueada": node.findtext("tem:EsBloqueada", default="false", namespaces=ns).lower() == "true",
-                "TokenSesion": node.findtext("tem:TokenSesion", default="", namespaces=ns),
-                "FechaRegistro": node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                "UltimaFechaCambio": node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-                "EsActivo": node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-            }
+        resultado = _llamarSoap(nombre, cuerpo, forma.parsear, forma.cache_ttl)
 
-            # ------------------------------------------------------
-            # Espacio relacionado
-            # ------------------------------------------------------
-            espacio_node = node.find("tem:Espacios", ns)
-            if espacio_node is not None:
-                relacion["Espacio"] = {
-                    "Id": int(espacio_node.findtext("tem:Id", default="0", namespaces=ns)),
-                    "Nombre": espacio_node.findtext("tem:Nombre", default="", namespaces=ns),
-                    "Moneda": espacio_node.findtext("tem:Moneda", default="", namespaces=ns),
-                    "CostoDiario": float(espacio_node.findtext("tem:CostoDiario", default="0", namespaces=ns)),
-                    "CapacidadAdultos": int(espacio_node.findtext("tem:CapacidadAdultos", default="0", namespaces=ns)),
-                    "CapacidadNinios": int(espacio_node.findtext("tem:CapacidadNinios", default="0", namespaces=ns)),
-                    "DescripcionDelLugar": espacio_node.findtext("tem:DescripcionDelLugar", default="", namespaces=ns),
-                    "Ubicacion": espacio_node.findtext("tem:Ubicacion", default="", namespaces=ns),
-                    "Puntuacion": int(espacio_node.findtext("tem:Puntuacion", default="0", namespaces=ns)),
-                    "EsActivo": espacio_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-                }
-
-            # ------------------------------------------------------
-            # Reserva relacionada
-            # ------------------------------------------------------
-            reserva_node = node.find("tem:Reservas", ns)
-            if reserva_node is not None:
-                relacion["Reserva"] = {
-                    "Id": int(reserva_node.findtext("tem:Id", default="0", namespaces=ns)),
-                    "UsuarioId": int(reserva_node.findtext("tem:UsuarioId", default="0", namespaces=ns)),
-                    "Estado": reserva_node.findtext("tem:Estado", default="", namespaces=ns),
-                    "CostoFinal": float(reserva_node.findtext("tem:CostoFinal", default="0", namespaces=ns)),
-                    "Comentarios": reserva_node.findtext("tem:Comentarios", default="", namespaces=ns),
-                    "FechaRegistro": reserva_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                    "EsActivo": reserva_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-                }
-
-            relaciones.append(relacion)
-
-        logger.info(f"{len(relaciones)} relaciones expiradas encontradas.")
-        return {
-            "exito": True,
-            "relaciones": relaciones,
-            "mensaje": f"{len(relaciones)} relaciones expiradas obtenidas correctamente."
-        }
+        if resultado.get("exito"):
+            relaciones = resultado.get("relaciones")
+            if relaciones is None:
+                logger.info("%s: relación obtenida correctamente.", nombre)
+            else:
+                logger.info("%s: %d relaciones obtenidas.", nombre, len(relaciones))
+        return resultado
 
     except Exception as ex:
-        logger.error(f"Error en obtenerRelacionesExpiradas(): {ex}")
+        logger.error("Error en %s(): %s", nombre, ex)
         return {"error": str(ex)}
 
+
 # ======================================================
 # FUNCIÓN: insertarRelacion
 # ======================================================
@@ -656,76 +1127,73 @@ def insertarRelacion(nuevaRelacion: dict) -> dict:
     try:
         logger.info("Insertando nueva relación Reserva × Espacio...")
 
-        # ======================================================
-        # Conversión de campos
-        # ======================================================
-        def bool_to_str(value):
-            return "true" if value else "false"
-
-        fecha_actual = datetime.now().isoformat()
+        # La fecha actual solo se calcula si falta alguno de los campos de fecha
+        fecha_inicio = nuevaRelacion.get("FechaInicio", _FALTA)
+        fecha_fin = nuevaRelacion.get("FechaFin", _FALTA)
+        fecha_registro = nuevaRelacion.get("FechaRegistro", _FALTA)
+        ultima_fecha_cambio = nuevaRelacion.get("UltimaFechaCambio", _FALTA)
+        if _FALTA in (fecha_inicio, fecha_fin, fecha_registro, ultima_fecha_cambio):
+            fecha_actual = datetime.now().isoformat()
+            if fecha_inicio is _FALTA:
+                fecha_inicio = fecha_actual
+            if fecha_fin is _FALTA:
+                fecha_fin = fecha_actual
+            if fecha_registro is _FALTA:
+                fecha_registro = fecha_actual
+            if ultima_fecha_cambio is _FALTA:
+                ultima_fecha_cambio = fecha_actual
 
         # ======================================================
         # Construcción del XML SOAP Body
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <insertarRelacion xmlns="http://tempuri.org/">
-              <nuevaRelacion>
-                <Id>0</Id>
-                <CostoCalculado>{nuevaRelacion.get("CostoCalculado", 0)}</CostoCalculado>
-                <PuntuacionUsuario>{nuevaRelacion.get("PuntuacionUsuario", 0)}</PuntuacionUsuario>
-                <FechaInicio>{nuevaRelacion.get("FechaInicio", fecha_actual)}</FechaInicio>
-                <FechaFin>{nuevaRelacion.get("FechaFin", fecha_actual)}</FechaFin>
-                <ReservaId>{nuevaRelacion["ReservaId"]}</ReservaId>
-                <EspacioId>{nuevaRelacion["EspacioId"]}</EspacioId>
-                <MinutosRetencion>{nuevaRelacion.get("MinutosRetencion", 0)}</MinutosRetencion>
-                <ExpiraEn>{nuevaRelacion.get("ExpiraEn", 0)}</ExpiraEn>
-                <EsBloqueada>{bool_to_str(nuevaRelacion.get("EsBloqueada", False))}</EsBloqueada>
-                <TokenSesion>{nuevaRelacion.get("TokenSesion", "")}</TokenSesion>
-                <FechaRegistro>{nuevaRelacion.get("FechaRegistro", fecha_actual)}</FechaRegistro>
-                <UltimaFechaCambio>{nuevaRelacion.get("UltimaFechaCambio", fecha_actual)}</UltimaFechaCambio>
-                <EsActivo>{bool_to_str(nuevaRelacion.get("EsActivo", True))}</EsActivo>
-              </nuevaRelacion>
-            </insertarRelacion>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/insertarRelacion",
-        }
+        soap_body = _TMPL_RELACION.substitute(
+            operacion="insertarRelacion",
+            parametro="nuevaRelacion",
+            Id=0,
+            CostoCalculado=nuevaRelacion.get("CostoCalculado", 0),
+            PuntuacionUsuario=nuevaRelacion.get("PuntuacionUsuario", 0),
+            FechaInicio=fecha_inicio,
+            FechaFin=fecha_fin,
+            ReservaId=nuevaRelacion["ReservaId"],
+            EspacioId=nuevaRelacion["EspacioId"],
+            MinutosRetencion=nuevaRelacion.get("MinutosRetencion", 0),
+            ExpiraEn=nuevaRelacion.get("ExpiraEn", 0),
+            EsBloqueada=_BOOL_XML[bool(nuevaRelacion.get("EsBloqueada", False))],
+            TokenSesion=str(nuevaRelacion.get("TokenSesion", "")).translate(_XML_ESCAPE),
+            FechaRegistro=fecha_registro,
+            UltimaFechaCambio=ultima_fecha_cambio,
+            EsActivo=_BOOL_XML[bool(nuevaRelacion.get("EsActivo", True))],
+        )
 
         # ======================================================
         # Envío de solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=_H_INSERTAR_RELACION, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
-        # Parseo manual del XML de respuesta
+        # Parseo del XML de respuesta
         # ======================================================
-        if "<insertarRelacionResult>" not in response.text:
+        id_str = _soap.textoResultado(response.content, _TEM_INSERTAR_RELACION_RESULT, _PARSER)
+        if id_str is None:
             logger.warning("No se encontró el nodo <insertarRelacionResult> en la respuesta SOAP.")
             return {"exito": False, "id_relacion": None, "mensaje": "Respuesta SOAP sin resultado válido."}
 
-        # Extraer el valor de <insertarRelacionResult>
-        start_tag = "<insertarRelacionResult>"
-        end_tag = "</insertarRelacionResult>"
-        id_str = response.text.split(start_tag)[1].split(end_tag)[0].strip()
-
         try:
             id_insertado = int(id_str)
         except ValueError:
             id_insertado = None
 
         if id_insertado and id_insertado > 0:
-            logger.info(f"Relación insertada correctamente con ID: {id_insertado}")
+            logger.info("Relación insertada correctamente con ID: %s", id_insertado)
+            _invalidarCache()
+            if nuevaRelacion.get("EsActivo", True):
+                _registrarReservaLocal(
+                    id_insertado, nuevaRelacion["EspacioId"], fecha_inicio, fecha_fin,
+                    _vigenciaRetencion(nuevaRelacion),
+                )
             return {
                 "exito": True,
                 "id_relacion": id_insertado,
@@ -739,7 +1207,7 @@ def insertarRelacion(nuevaRelacion: dict) -> dict:
             }
 
     except Exception as ex:
-        logger.error(f"Error en insertarRelacion(): {ex}")
+        logger.error("Error en insertarRelacion(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -767,58 +1235,51 @@ def espacioDisponible(espacioId: int, fechaInicio: str, fechaFin: str) -> dict:
     """
 
     try:
-        logger.info(f"Verificando disponibilidad del espacio ID={espacioId} entre {fechaInicio} y {fechaFin}...")
+        logger.info("Verificando disponibilidad del espacio ID=%s entre %s y %s...", espacioId, fechaInicio, fechaFin)
 
         # ======================================================
         # Validaciones
         # ======================================================
-        if not isinstance(espacioId, int) or espacioId <= 0:
-            return {"error": "Debe proporcionar un 'espacioId' válido (entero mayor que 0)."}
+        if type(espacioId) is not int or espacioId <= 0:
+            return dict(_ERR_ESPACIO_ID)
         if not fechaInicio or not fechaFin:
-            return {"error": "Debe proporcionar 'fechaInicio' y 'fechaFin' válidas."}
+            return dict(_ERR_FECHAS)
+
+        if _hayConflictoLocal(espacioId, fechaInicio, fechaFin):
+            return {
+                "exito": True,
+                "disponible": False,
+                "mensaje": "El espacio NO está disponible en el rango de fechas especificado.",
+            }
+
+        clave = ("espacioDisponible", espacioId, fechaInicio, fechaFin)
+        cacheado = _leerVigente(clave)
+        if cacheado is not None:
+            return cacheado
 
         # ======================================================
         # Cuerpo SOAP (versión 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <espacioDisponible xmlns="http://tempuri.org/">
-              <espacioId>{espacioId}</espacioId>
-              <fechaInicio>{fechaInicio}</fechaInicio>
-              <fechaFin>{fechaFin}</fechaFin>
-            </espacioDisponible>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/espacioDisponible",
-        }
+        soap_body = _ENV_ESPACIO_DISPONIBLE % (espacioId, str(fechaInicio).encode("utf-8"), str(fechaFin).encode("utf-8"))
 
         # ======================================================
         # Envío de la solicitud
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        generacion = _generacionCache()
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_ESPACIO_DISPONIBLE, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
         # Extracción del resultado (<espacioDisponibleResult>)
         # ======================================================
-        if "<espacioDisponibleResult>" not in response.text:
+        result_str = _soap.textoResultado(response.content, _TEM_ESPACIO_DISPONIBLE_RESULT, _PARSER)
+        if result_str is None:
             logger.warning("No se encontró el nodo <espacioDisponibleResult> en la respuesta SOAP.")
             return {"exito": False, "disponible": None, "mensaje": "Respuesta inválida del servicio."}
 
-        start_tag = "<espacioDisponibleResult>"
-        end_tag = "</espacioDisponibleResult>"
-        result_str = response.text.split(start_tag)[1].split(end_tag)[0].strip().lower()
-
-        disponible = result_str == "true"
+        disponible = result_str.lower() == "true"
 
         mensaje = (
             "El espacio está disponible para las fechas indicadas."
@@ -828,10 +1289,12 @@ def espacioDisponible(espacioId: int, fechaInicio: str, fechaFin: str) -> dict:
 
         logger.info(mensaje)
 
-        return {"exito": True, "disponible": disponible, "mensaje": mensaje}
+        resultado = {"exito": True, "disponible": disponible, "mensaje": mensaje}
+        _guardarEnCache(clave, resultado, generacion, _DISPONIBILIDAD_CACHE_TTL)
+        return resultado
 
     except Exception as ex:
-        logger.error(f"Error en espacioDisponible(): {ex}")
+        logger.error("Error en espacioDisponible(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -856,54 +1319,36 @@ def eliminarRelacion(id_relacion: int) -> dict:
     """
 
     try:
-        logger.info(f"Eliminando relación Reserva×Espacio con ID={id_relacion}...")
+        logger.info("Eliminando relación Reserva×Espacio con ID=%s...", id_relacion)
 
         # ======================================================
         # Validación de entrada
         # ======================================================
-        if not isinstance(id_relacion, int) or id_relacion <= 0:
-            return {"error": "Debe proporcionar un 'id_relacion' válido (entero mayor que 0)."}
+        if type(id_relacion) is not int or id_relacion <= 0:
+            return dict(_ERR_ID_RELACION)
 
         # ======================================================
         # Cuerpo SOAP (versión 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <eliminarRelacion xmlns="http://tempuri.org/">
-              <id>{id_relacion}</id>
-            </eliminarRelacion>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/eliminarRelacion",
-        }
+        soap_body = _ENV_ELIMINAR_RELACION % id_relacion
 
         # ======================================================
         # Envío de la solicitud
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_ELIMINAR_RELACION, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
         # Extracción del resultado (<eliminarRelacionResult>)
         # ======================================================
-        if "<eliminarRelacionResult>" not in response.text:
+        result_str = _soap.textoResultado(response.content, _TEM_ELIMINAR_RELACION_RESULT, _PARSER)
+        if result_str is None:
             logger.warning("No se encontró el nodo <eliminarRelacionResult> en la respuesta SOAP.")
             return {"exito": False, "eliminado": None, "mensaje": "Respuesta inválida del servicio."}
 
-        start_tag = "<eliminarRelacionResult>"
-        end_tag = "</eliminarRelacionResult>"
-        result_str = response.text.split(start_tag)[1].split(end_tag)[0].strip().lower()
-
-        eliminado = result_str == "true"
+        eliminado = result_str.lower() == "true"
 
         mensaje = (
             f"Relación con ID {id_relacion} eliminada correctamente (Soft Delete)."
@@ -911,12 +1356,16 @@ def eliminarRelacion(id_relacion: int) -> dict:
             else f"No se pudo eliminar la relación con ID {id_relacion}."
         )
 
+        if eliminado:
+            _invalidarCache()
+            _olvidarReservaLocal(id_relacion)
+
         logger.info(mensaje)
 
         return {"exito": True, "eliminado": eliminado, "mensaje": mensaje}
 
     except Exception as ex:
-        logger.error(f"Error en eliminarRelacion(): {ex}")
+        logger.error("Error en eliminarRelacion(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -941,54 +1390,36 @@ def desbloquearRelacion(id_relacion: int) -> dict:
     """
 
     try:
-        logger.info(f"Desbloqueando relación Reserva×Espacio con ID={id_relacion}...")
+        logger.info("Desbloqueando relación Reserva×Espacio con ID=%s...", id_relacion)
 
         # ======================================================
         # Validación de entrada
         # ======================================================
-        if not isinstance(id_relacion, int) or id_relacion <= 0:
-            return {"error": "Debe proporcionar un 'id_relacion' válido (entero mayor que 0)."}
+        if type(id_relacion) is not int or id_relacion <= 0:
+            return dict(_ERR_ID_RELACION)
 
         # ======================================================
         # Cuerpo SOAP (versión 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <desbloquearRelacion xmlns="http://tempuri.org/">
-              <id>{id_relacion}</id>
-            </desbloquearRelacion>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/desbloquearRelacion",
-        }
+        soap_body = _ENV_DESBLOQUEAR_RELACION % id_relacion
 
         # ======================================================
         # Envío de la solicitud
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_DESBLOQUEAR_RELACION, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
         # Extracción del resultado (<desbloquearRelacionResult>)
         # ======================================================
-        if "<desbloquearRelacionResult>" not in response.text:
+        result_str = _soap.textoResultado(response.content, _TEM_DESBLOQUEAR_RELACION_RESULT, _PARSER)
+        if result_str is None:
             logger.warning("No se encontró el nodo <desbloquearRelacionResult> en la respuesta SOAP.")
             return {"exito": False, "desbloqueado": None, "mensaje": "Respuesta inválida del servicio."}
 
-        start_tag = "<desbloquearRelacionResult>"
-        end_tag = "</desbloquearRelacionResult>"
-        result_str = response.text.split(start_tag)[1].split(end_tag)[0].strip().lower()
-
-        desbloqueado = result_str == "true"
+        desbloqueado = result_str.lower() == "true"
 
         mensaje = (
             f"Relación con ID {id_relacion} desbloqueada correctamente (espacio liberado)."
@@ -996,12 +1427,16 @@ def desbloquearRelacion(id_relacion: int) -> dict:
             else f"No se pudo desbloquear la relación con ID {id_relacion}."
         )
 
+        if desbloqueado:
+            _invalidarCache()
+            _olvidarReservaLocal(id_relacion)
+
         logger.info(mensaje)
 
         return {"exito": True, "desbloqueado": desbloqueado, "mensaje": mensaje}
 
     except Exception as ex:
-        logger.error(f"Error en desbloquearRelacion(): {ex}")
+        logger.error("Error en desbloquearRelacion(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -1028,57 +1463,43 @@ def calcularCosto(espacioId: int, fechaInicio: str, fechaFin: str) -> dict:
     """
 
     try:
-        logger.info(f"Calculando costo del espacio ID={espacioId} entre {fechaInicio} y {fechaFin}...")
+        logger.info("Calculando costo del espacio ID=%s entre %s y %s...", espacioId, fechaInicio, fechaFin)
 
         # ======================================================
         # Validaciones básicas
         # ======================================================
-        if not isinstance(espacioId, int) or espacioId <= 0:
-            return {"error": "Debe proporcionar un 'espacioId' válido (entero mayor que 0)."}
+        if type(espacioId) is not int or espacioId <= 0:
+            return dict(_ERR_ESPACIO_ID)
         if not fechaInicio or not fechaFin:
-            return {"error": "Debe proporcionar 'fechaInicio' y 'fechaFin' válidas."}
+            return dict(_ERR_FECHAS)
+
+        clave = ("calcularCosto", espacioId, fechaInicio, fechaFin)
+        cacheado = _leerVigente(clave)
+        if cacheado is not None:
+            return cacheado
 
         # ======================================================
         # Cuerpo SOAP (versión 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <calcularCosto xmlns="http://tempuri.org/">
-              <espacioId>{espacioId}</espacioId>
-              <fechaInicio>{fechaInicio}</fechaInicio>
-              <fechaFin>{fechaFin}</fechaFin>
-            </calcularCosto>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/calcularCosto",
-        }
+        soap_body = _ENV_CALCULAR_COSTO % (espacioId, str(fechaInicio).encode("utf-8"), str(fechaFin).encode("utf-8"))
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        generacion = _generacionCache()
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_CALCULAR_COSTO, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
         # Extracción del resultado (<calcularCostoResult>)
         # ======================================================
-        if "<calcularCostoResult>" not in response.text:
+        result_str = _soap.textoResultado(response.content, _TEM_CALCULAR_COSTO_RESULT, _PARSER)
+        if result_str is None:
             logger.warning("No se encontró el nodo <calcularCostoResult> en la respuesta SOAP.")
             return {"exito": False, "costoTotal": None, "mensaje": "Respuesta inválida del servicio."}
 
-        start_tag = "<calcularCostoResult>"
-        end_tag = "</calcularCostoResult>"
-        result_str = response.text.split(start_tag)[1].split(end_tag)[0].strip()
-
         try:
             costo_total = float(result_str)
         except ValueError:
@@ -1087,13 +1508,15 @@ def calcularCosto(espacioId: int, fechaInicio: str, fechaFin: str) -> dict:
         if costo_total is not None:
             mensaje = f"Costo total calculado correctamente: ${costo_total:.2f}"
             logger.info(mensaje)
-            return {"exito": True, "costoTotal": costo_total, "mensaje": mensaje}
+            resultado = {"exito": True, "costoTotal": costo_total, "mensaje": mensaje}
+            _guardarEnCache(clave, resultado, generacion, _COSTO_CACHE_TTL)
+            return resultado
         else:
-            logger.warning(f"Valor no numérico en la respuesta: {result_str}")
+            logger.warning("Valor no numérico en la respuesta: %s", result_str)
             return {"exito": False, "costoTotal": None, "mensaje": "El valor devuelto no es numérico."}
 
     except Exception as ex:
-        logger.error(f"Error en calcularCosto(): {ex}")
+        logger.error("Error en calcularCosto(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -1135,7 +1558,7 @@ def actualizarRelacion(relacion: dict) -> dict:
     """
 
     try:
-        logger.info(f"Actualizando relación ID={relacion.get('Id')}...")
+        logger.info("Actualizando relación ID=%s...", relacion.get("Id"))
 
         # ======================================================
         # Validación de campos esenciales
@@ -1145,67 +1568,55 @@ def actualizarRelacion(relacion: dict) -> dict:
             if field not in relacion or relacion[field] is None:
                 return {"error": f"Falta el campo obligatorio: {field}"}
 
-        # ======================================================
-        # Función auxiliar para booleanos
-        # ======================================================
-        def bool_to_str(value):
-            return "true" if value else "false"
+        # Fecha UTC por defecto, calculada una sola vez y solo si hace falta
+        fecha_registro = relacion.get("FechaRegistro", _FALTA)
+        ultima_fecha_cambio = relacion.get("UltimaFechaCambio", _FALTA)
+        if fecha_registro is _FALTA or ultima_fecha_cambio is _FALTA:
+            fecha_utc = datetime.utcnow().isoformat()
+            if fecha_registro is _FALTA:
+                fecha_registro = fecha_utc
+            if ultima_fecha_cambio is _FALTA:
+                ultima_fecha_cambio = fecha_utc
 
         # ======================================================
         # Cuerpo SOAP (versión 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <actualizarRelacion xmlns="http://tempuri.org/">
-              <relacionEditada>
-                <Id>{relacion["Id"]}</Id>
-                <CostoCalculado>{relacion.get("CostoCalculado", 0)}</CostoCalculado>
-                <PuntuacionUsuario>{relacion.get("PuntuacionUsuario", 0)}</PuntuacionUsuario>
-                <FechaInicio>{relacion["FechaInicio"]}</FechaInicio>
-                <FechaFin>{relacion["FechaFin"]}</FechaFin>
-                <ReservaId>{relacion["ReservaId"]}</ReservaId>
-                <EspacioId>{relacion["EspacioId"]}</EspacioId>
-                <MinutosRetencion>{relacion.get("MinutosRetencion", 0)}</MinutosRetencion>
-                <ExpiraEn>{relacion.get("ExpiraEn", 0)}</ExpiraEn>
-                <EsBloqueada>{bool_to_str(relacion.get("EsBloqueada", False))}</EsBloqueada>
-                <TokenSesion>{relacion.get("TokenSesion", "")}</TokenSesion>
-                <FechaRegistro>{relacion.get("FechaRegistro", datetime.utcnow().isoformat())}</FechaRegistro>
-                <UltimaFechaCambio>{relacion.get("UltimaFechaCambio", datetime.utcnow().isoformat())}</UltimaFechaCambio>
-                <EsActivo>{bool_to_str(relacion.get("EsActivo", True))}</EsActivo>
-              </relacionEditada>
-            </actualizarRelacion>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/actualizarRelacion",
-        }
+        soap_body = _TMPL_RELACION.substitute(
+            operacion="actualizarRelacion",
+            parametro="relacionEditada",
+            Id=relacion["Id"],
+            CostoCalculado=relacion.get("CostoCalculado", 0),
+            PuntuacionUsuario=relacion.get("PuntuacionUsuario", 0),
+            FechaInicio=relacion["FechaInicio"],
+            FechaFin=relacion["FechaFin"],
+            ReservaId=relacion["ReservaId"],
+            EspacioId=relacion["EspacioId"],
+            MinutosRetencion=relacion.get("MinutosRetencion", 0),
+            ExpiraEn=relacion.get("ExpiraEn", 0),
+            EsBloqueada=_BOOL_XML[bool(relacion.get("EsBloqueada", False))],
+            TokenSesion=str(relacion.get("TokenSesion", "")).translate(_XML_ESCAPE),
+            FechaRegistro=fecha_registro,
+            UltimaFechaCambio=ultima_fecha_cambio,
+            EsActivo=_BOOL_XML[bool(relacion.get("EsActivo", True))],
+        )
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=_H_ACTUALIZAR_RELACION, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
         # Extracción del resultado (<actualizarRelacionResult>)
         # ======================================================
-        if "<actualizarRelacionResult>" not in response.text:
+        result_str = _soap.textoResultado(response.content, _TEM_ACTUALIZAR_RELACION_RESULT, _PARSER)
+        if result_str is None:
             logger.warning("No se encontró el nodo <actualizarRelacionResult> en la respuesta SOAP.")
             return {"exito": False, "actualizado": None, "mensaje": "Respuesta inválida del servicio."}
 
-        start_tag = "<actualizarRelacionResult>"
-        end_tag = "</actualizarRelacionResult>"
-        result_str = response.text.split(start_tag)[1].split(end_tag)[0].strip().lower()
-
-        actualizado = result_str == "true"
+        actualizado = result_str.lower() == "true"
 
         mensaje = (
             f"Relación con ID {relacion['Id']} actualizada correctamente."
@@ -1213,12 +1624,16 @@ def actualizarRelacion(relacion: dict) -> dict:
             else f"No se pudo actualizar la relación con ID {relacion['Id']}."
         )
 
+        if actualizado:
+            _invalidarCache()
+            _olvidarReservaLocal(relacion["Id"])
+
         logger.info(mensaje)
 
         return {"exito": True, "actualizado": actualizado, "mensaje": mensaje}
 
     except Exception as ex:
-        logger.error(f"Error en actualizarRelacion(): {ex}")
+        logger.error("Error en actualizarRelacion(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -1245,57 +1660,38 @@ def actualizarPuntuacion(idRelacion: int, puntuacion: int) -> dict:
     """
 
     try:
-        logger.info(f"Actualizando puntuación de la relación ID={idRelacion} a {puntuacion} estrellas...")
+        logger.info("Actualizando puntuación de la relación ID=%s a %s estrellas...", idRelacion, puntuacion)
 
         # ======================================================
         # Validaciones básicas
         # ======================================================
-        if not isinstance(idRelacion, int) or idRelacion <= 0:
-            return {"error": "Debe proporcionar un 'idRelacion' válido (entero mayor que 0)."}
-        if not isinstance(puntuacion, int) or not (0 <= puntuacion <= 5):
-            return {"error": "La 'puntuacion' debe ser un número entero entre 0 y 5."}
+        if type(idRelacion) is not int or idRelacion <= 0:
+            return dict(_ERR_ID_RELACION_PUNTUACION)
+        if type(puntuacion) is not int or not (0 <= puntuacion <= 5):
+            return dict(_ERR_PUNTUACION)
 
         # ======================================================
         # Cuerpo SOAP (versión 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <actualizarPuntuacion xmlns="http://tempuri.org/">
-              <idRelacion>{idRelacion}</idRelacion>
-              <puntuacion>{puntuacion}</puntuacion>
-            </actualizarPuntuacion>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/actualizarPuntuacion",
-        }
+        soap_body = _ENV_ACTUALIZAR_PUNTUACION % (idRelacion, puntuacion)
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_ACTUALIZAR_PUNTUACION, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            return _errorHttp(response)
 
         # ======================================================
         # Extracción del resultado (<actualizarPuntuacionResult>)
         # ======================================================
-        if "<actualizarPuntuacionResult>" not in response.text:
+        result_str = _soap.textoResultado(response.content, _TEM_ACTUALIZAR_PUNTUACION_RESULT, _PARSER)
+        if result_str is None:
             logger.warning("No se encontró el nodo <actualizarPuntuacionResult> en la respuesta SOAP.")
             return {"exito": False, "actualizado": None, "mensaje": "Respuesta inválida del servicio."}
 
-        start_tag = "<actualizarPuntuacionResult>"
-        end_tag = "</actualizarPuntuacionResult>"
-        result_str = response.text.split(start_tag)[1].split(end_tag)[0].strip().lower()
-
-        actualizado = result_str == "true"
+        actualizado = result_str.lower() == "true"
 
         mensaje = (
             f"Puntuación actualizada correctamente ({puntuacion} estrellas) para relación ID {idRelacion}."
@@ -1303,10 +1699,259 @@ def actualizarPuntuacion(idRelacion: int, puntuacion: int) -> dict:
             else f"No se pudo actualizar la puntuación para la relación ID {idRelacion}."
         )
 
+        if actualizado:
+            _invalidarCache()
+
         logger.info(mensaje)
 
         return {"exito": True, "actualizado": actualizado, "mensaje": mensaje}
 
     except Exception as ex:
-        logger.error(f"Error en actualizarPuntuacion(): {ex}")
-        return {"error": str(ex)}
\ No newline at end of file
+        logger.error("Error en actualizarPuntuacion(): %s", ex)
+        return {"error": str(ex)}
+
+
+# ======================================================
+# FUNCIÓN: seleccionarPorReservaDetallado
+# ======================================================
+def seleccionarPorReservaDetallado(reservaId: int) -> dict:
+    """
+    Obtiene las relaciones de una reserva con el detalle completo de cada una
+    (Espacio con Hotel/TipoServicio/TipoAlimentación y Reserva con usuarios).
+
+    Tras seleccionarPorReserva() se consulta seleccionarPorId() para todas las
+    relaciones en paralelo (ver seleccionarPorReservaDetallado_async), de modo
+    que la latencia total es la de la consulta más lenta y no la suma.
+
+    Parámetros:
+        reservaId (int): ID de la reserva.
+
+    Retorna:
+        dict: la misma estructura que seleccionarPorReserva(); cada relación se
+        sustituye por su detalle cuando seleccionarPorId() responde con éxito y
+        se conserva la fila básica en caso contrario. El orden se mantiene.
+    """
+    return _soap.ejecutar(seleccionarPorReservaDetallado_async(reservaId))
+
+
+# ======================================================
+# FUNCIONES EN LOTE: espacioDisponible, calcularCosto, actualizarPuntuacion
+# ======================================================
+def espacioDisponibleVarios(consultas: list) -> list:
+    """
+    Verifica la disponibilidad de varios espacios/rangos en una sola operación.
+
+    Las llamadas se lanzan en paralelo sobre el pool de _SESSION (ver
+    espacioDisponibleVarios_async), así que el tiempo total es el de la más
+    lenta y no la suma de todas.
+
+    Parámetros:
+        consultas (list[dict]): cada elemento con "espacioId", "fechaInicio" y "fechaFin".
+
+    Retorna:
+        list[dict]: un resultado de espacioDisponible() por consulta, en el mismo
+        orden de entrada. Un fallo en una consulta no afecta a las demás; su
+        posición contiene {"error": str}.
+    """
+    if not consultas:
+        return []
+    return _soap.ejecutar(espacioDisponibleVarios_async(consultas))
+
+
+def calcularCostoVarios(consultas: list) -> list:
+    """
+    Calcula el costo de varios espacios/rangos en paralelo.
+
+    Parámetros:
+        consultas (list[dict]): cada elemento con "espacioId", "fechaInicio" y "fechaFin".
+
+    Retorna:
+        list[dict]: un resultado de calcularCosto() por consulta, en el mismo orden;
+        {"error": str} en la posición de una consulta fallida.
+    """
+    if not consultas:
+        return []
+    return _soap.ejecutar(calcularCostoVarios_async(consultas))
+
+
+def actualizarPuntuacionVarios(puntuaciones: list) -> list:
+    """
+    Actualiza la puntuación de varias relaciones en paralelo.
+
+    Parámetros:
+        puntuaciones (list[dict]): cada elemento con "idRelacion" y "puntuacion".
+
+    Retorna:
+        list[dict]: un resultado de actualizarPuntuacion() por elemento, en el mismo
+        orden; {"error": str} en la posición de una actualización fallida.
+    """
+    if not puntuaciones:
+        return []
+    return _soap.ejecutar(actualizarPuntuacionVarios_async(puntuaciones))
+
+
+# ======================================================
+# VARIANTES ASÍNCRONAS
+# ======================================================
+# Cada variante ejecuta la función síncrona en un hilo del executor por defecto,
+# de modo que varias llamadas lanzadas con asyncio.gather se solapan en la red
+# reutilizando las conexiones del pool de _SESSION.
+async def seleccionarRelaciones_async(como_tuplas: bool = False) -> dict:
+    """Versión asíncrona de seleccionarRelaciones()."""
+    return await asyncio.to_thread(seleccionarRelaciones, como_tuplas)
+
+
+async def seleccionarPorReserva_async(reservaId: int) -> dict:
+    """Versión asíncrona de seleccionarPorReserva()."""
+    return await asyncio.to_thread(seleccionarPorReserva, reservaId)
+
+
+async def seleccionarPorId_async(relacionId: int) -> dict:
+    """Versión asíncrona de seleccionarPorId()."""
+    return await asyncio.to_thread(seleccionarPorId, relacionId)
+
+
+async def seleccionarPorEspacio_async(espacioId: int) -> dict:
+    """Versión asíncrona de seleccionarPorEspacio()."""
+    return await asyncio.to_thread(seleccionarPorEspacio, espacioId)
+
+
+async def obtenerRelacionesExpiradas_async() -> dict:
+    """Versión asíncrona de obtenerRelacionesExpiradas()."""
+    return await asyncio.to_thread(obtenerRelacionesExpiradas)
+
+
+async def insertarRelacion_async(nuevaRelacion: dict) -> dict:
+    """Versión asíncrona de insertarRelacion()."""
+    return await asyncio.to_thread(insertarRelacion, nuevaRelacion)
+
+
+async def espacioDisponible_async(espacioId: int, fechaInicio: str, fechaFin: str) -> dict:
+    """Versión asíncrona de espacioDisponible()."""
+    return await asyncio.to_thread(espacioDisponible, espacioId, fechaInicio, fechaFin)
+
+
+async def calcularCosto_async(espacioId: int, fechaInicio: str, fechaFin: str) -> dict:
+    """Versión asíncrona de calcularCosto()."""
+    return await asyncio.to_thread(calcularCosto, espacioId, fechaInicio, fechaFin)
+
+
+async def actualizarPuntuacion_async(idRelacion: int, puntuacion: int) -> dict:
+    """Versión asíncrona de actualizarPuntuacion()."""
+    return await asyncio.to_thread(actualizarPuntuacion, idRelacion, puntuacion)
+
+
+async def eliminarRelacion_async(id_relacion: int) -> dict:
+    """Versión asíncrona de eliminarRelacion()."""
+    return await asyncio.to_thread(eliminarRelacion, id_relacion)
+
+
+async def desbloquearRelacion_async(id_relacion: int) -> dict:
+    """Versión asíncrona de desbloquearRelacion()."""
+    return await asyncio.to_thread(desbloquearRelacion, id_relacion)
+
+
+async def actualizarRelacion_async(relacion: dict) -> dict:
+    """Versión asíncrona de actualizarRelacion()."""
+    return await asyncio.to_thread(actualizarRelacion, relacion)
+
+
+async def espacioDisponibleVarios_async(consultas: list) -> list:
+    """Versión asíncrona de espacioDisponibleVarios()."""
+    return await _soap.reunir(
+        asyncio.to_thread(lambda c=c: espacioDisponible(c["espacioId"], c["fechaInicio"], c["fechaFin"]))
+        for c in consultas
+    )
+
+
+async def calcularCostoVarios_async(consultas: list) -> list:
+    """Versión asíncrona de calcularCostoVarios()."""
+    return await _soap.reunir(
+        asyncio.to_thread(lambda c=c: calcularCosto(c["espacioId"], c["fechaInicio"], c["fechaFin"]))
+        for c in consultas
+    )
+
+
+async def actualizarPuntuacionVarios_async(puntuaciones: list) -> list:
+    """Versión asíncrona de actualizarPuntuacionVarios()."""
+    return await _soap.reunir(
+        asyncio.to_thread(lambda p=p: actualizarPuntuacion(p["idRelacion"], p["puntuacion"]))
+        for p in puntuaciones
+    )
+
+
+async def seleccionarPorReservaDetallado_async(reservaId: int) -> dict:
+    """Versión asíncrona de seleccionarPorReservaDetallado()."""
+    resultado = await seleccionarPorReserva_async(reservaId)
+    relaciones = resultado.get("relaciones")
+    if not relaciones:
+        return resultado
+
+    detalles = await _soap.reunir(seleccionarPorId_async(rel["Id"]) for rel in relaciones)
+    resultado["relaciones"] = [
+        detalle["relacion"] if isinstance(detalle, dict) and detalle.get("exito") else rel
+        for rel, detalle in zip(relaciones, detalles)
+    ]
+    return resultado
+
+
+# ======================================================
+# AGRUPACIÓN DE CONSULTAS seleccionarPorId (micro-lotes)
+# ======================================================
+# Las consultas que llegan dentro de una ventana corta se despachan juntas
+# (en paralelo y sin repetir IDs) y cada llamador recibe su propio resultado.
+_LOTE_VENTANA = 0.005  # segundos
+_LOTE_MAXIMO = 32
+_LOTES_POR_ID = weakref.WeakKeyDictionary()  # event loop -> {relacionId: [futuros]}
+_TAREAS_LOTE = set()
+
+
+async def seleccionarPorIdAgrupado_async(relacionId: int) -> dict:
+    """
+    Igual que seleccionarPorId_async(), pero agrupa las llamadas concurrentes
+    en micro-lotes de hasta _LOTE_MAXIMO IDs o _LOTE_VENTANA segundos.
+    Devuelve la misma estructura que seleccionarPorId().
+    """
+    loop = asyncio.get_running_loop()
+    lote = _LOTES_POR_ID.get(loop)
+    if lote is None:
+        lote = _LOTES_POR_ID[loop] = {}
+        loop.call_later(_LOTE_VENTANA, _despacharLote, loop)
+
+    futuro = loop.create_future()
+    lote.setdefault(relacionId, []).append(futuro)
+    if len(lote) >= _LOTE_MAXIMO:
+        _despacharLote(loop)
+    return await futuro
+
+
+def _despacharLote(loop) -> None:
+    """Cierra el lote pendiente del loop y lanza su resolución."""
+    lote = _LOTES_POR_ID.pop(loop, None)
+    if not lote:
+        return
+    tarea = loop.create_task(_resolverLote(lote))
+    _TAREAS_LOTE.add(tarea)
+    tarea.add_done_callback(_TAREAS_LOTE.discard)
+
+
+async def _resolverLote(lote: dict) -> None:
+    """Consulta cada ID una sola vez y reparte el resultado entre sus llamadores."""
+    ids = list(lote)
+    resultados = await _soap.reunir(seleccionarPorId_async(relacionId) for relacionId in ids)
+    for relacionId, resultado in zip(ids, resultados):
+        for n, futuro in enumerate(lote[relacionId]):
+            if not futuro.done():
+                futuro.set_result(resultado if n == 0 else copy.deepcopy(resultado))
+
+# ======================================================
+# PRECALENTAMIENTO DE LA CONEXIÓN
+# ======================================================
+def precalentarConexion() -> None:
+    """
+    Abre en segundo plano la conexión TLS del pool para que la primera llamada
+    real la reutilice. No se ejecuta al importar el módulo: lo invoca el punto
+    de entrada del servidor (wsgi.py/asgi.py), así manage.py, las migraciones
+    y los tests no dependen de la red.
+    """
+    _soap.precalentar(_SESSION, SOAP_URL, "wsEspXRes")
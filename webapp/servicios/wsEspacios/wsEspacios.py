@@ -1,46 +1,293 @@
+import asyncio
 import logging
-from zeep import Client, helpers
-import logging
+import threading
+import time
+from collections import namedtuple
 from datetime import datetime
-import requests
-import xml.etree.ElementTree as ET
-import logging
+from decimal import Decimal
+from lxml import etree
+from webapp.servicios import _soap
 # URL del servicio SOAP
-WSDL_URL = "https://realdecuenca-btccaacvcpgyadhb.canadacentral-01.azurewebsites.net/WS_GestionEspacios.asmx?WSDL"
 SOAP_URL = "https://realdecuenca-btccaacvcpgyadhb.canadacentral-01.azurewebsites.net/WS_GestionEspacios.asmx"
 
+# Tiempos límite (conexión, lectura): un host caído falla en segundos en
+# lugar de dejar la vista colgada 30 s.
+_TIMEOUT = (3, 15)
+
+# Sesión HTTP compartida por todas las llamadas del módulo (ver _soap.crearSesion)
+_SESSION = _soap.crearSesion()
+
+# Caché en memoria del listado de espacios (cambia cada varios minutos).
+# Se invalida tras cualquier inserción, actualización o eliminación exitosa;
+# "g" es la generación, que la invalidación incrementa para que una consulta
+# iniciada antes de la escritura no guarde su resultado ya desactualizado.
+_ESPACIOS_CACHE_TTL = 30  # segundos
+_ESPACIOS_CACHE = {"t": 0.0, "v": None, "g": 0}
+_ESPACIOS_CACHE_LOCK = threading.Lock()
+
+# Tabla de escape XML precompilada: str.translate la aplica en una sola pasada
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+# Cabecera y cierre comunes a todos los envelopes, precompilados como bytes
+_ENV_SOAP_INICIO = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+    b' xmlns:xsd="http://www.w3.org/2001/XMLSchema"'
+    b' xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+)
+_ENV_SOAP_FIN = b"</soap:Body></soap:Envelope>"
+
+
+def _armarEnvelope(cuerpo: bytes) -> bytes:
+    """Envuelve el elemento de la operación (bytes) entre la cabecera y el cierre SOAP."""
+    return b"".join((_ENV_SOAP_INICIO, cuerpo, _ENV_SOAP_FIN))
+
+
+# Envelopes precompilados como bytes: los enteros se formatean con %d y los
+# textos llegan ya escapados y codificados (%b)
+
+# Campos de un espacio después de <Id>, comunes a insertarEspacio y actualizarEspacio
+_CAMPOS_ESPACIO_XML = (
+    b"<HotelId>%d</HotelId>"
+    b"<TipoServicioId>%d</TipoServicioId>"
+    b"<TipoAlimentacionId>%d</TipoAlimentacionId>"
+    b"<Nombre>%b</Nombre>"
+    b"<Moneda>%b</Moneda>"
+    b"<CostoDiario>%b</CostoDiario>"
+    b"<CapacidadAdultos>%d</CapacidadAdultos>"
+    b"<CapacidadNinios>%d</CapacidadNinios>"
+    b"<Habitaciones>%d</Habitaciones>"
+    b"<Parqueaderos>%d</Parqueaderos>"
+    b"<DimensionesDelLugar>%d</DimensionesDelLugar>"
+    b"<DescripcionDelLugar>%b</DescripcionDelLugar>"
+    b"<Puntuacion>%d</Puntuacion>"
+    b"<Ubicacion>%b</Ubicacion>"
+    b"<MinutosRetencion>%d</MinutosRetencion>"
+    b"<ExpiraEn>%b</ExpiraEn>"
+    b"<EsBloqueada>%b</EsBloqueada>"
+    b"<FechaRegistro>%b</FechaRegistro>"
+    b"<UltimaFechaCambio>%b</UltimaFechaCambio>"
+    b"<EsActivo>%b</EsActivo>"
+)
+_ENV_ACTUALIZAR_ESPACIO = _armarEnvelope(
+    b'<actualizarEspacio xmlns="http://tempuri.org/"><espacioEditado><Id>%d</Id>'
+    + _CAMPOS_ESPACIO_XML
+    + b"</espacioEditado></actualizarEspacio>"
+)
+# insertarEspacio siempre envía Id 0: el servicio asigna el nuevo ID
+_ENV_INSERTAR_ESPACIO = _armarEnvelope(
+    b'<insertarEspacio xmlns="http://tempuri.org/"><nuevoEspacio><Id>0</Id>'
+    + _CAMPOS_ESPACIO_XML
+    + b"</nuevoEspacio></insertarEspacio>"
+)
+_ENV_ELIMINAR_ESPACIO = _armarEnvelope(b'<eliminarEspacio xmlns="http://tempuri.org/"><id>%d</id></eliminarEspacio>')
+
+# seleccionarEspacios no recibe parámetros: el envelope es constante
+_ENV_SELECCIONAR_ESPACIOS = _armarEnvelope(b'<seleccionarEspacios xmlns="http://tempuri.org/"/>')
+
+# Cabeceras SOAPAction por operación, construidas una sola vez (el
+# Content-Type ya va en las cabeceras de _SESSION). requests solo las lee.
+_H_ELIMINAR_ESPACIO = {"SOAPAction": "http://tempuri.org/eliminarEspacio"}
+_H_INSERTAR_ESPACIO = {"SOAPAction": "http://tempuri.org/insertarEspacio"}
+_H_ACTUALIZAR_ESPACIO = {"SOAPAction": "http://tempuri.org/actualizarEspacio"}
+_H_SELECCIONAR_ESPACIOS = {"SOAPAction": "http://tempuri.org/seleccionarEspacios"}
+
+# IDs de catálogo sin los que el servicio no puede registrar un espacio
+_IDS_OBLIGATORIOS_ESPACIO = ("HotelId", "TipoServicioId", "TipoAlimentacionId")
+
+
 def safe_str(value, default=""):
-    return str(value).strip() if value is not None else default
+    if value is None:
+        return default
+    # Los textos del XML ya son str: se evita la copia de str()
+    return value.strip() if type(value) is str else str(value).strip()
 
 
 def safe_int(value, default=0):
+    if type(value) is int:
+        return value
+    if value is None:
+        return default
     try:
-        if value is None or str(value).strip() == "":
-            return default
+        # int() ya ignora espacios alrededor y rechaza la cadena vacía,
+        # así que no hace falta normalizar el texto antes
         return int(value)
     except Exception:
         return default
 
 
 def safe_float(value, default=0.0):
+    if type(value) is float:
+        return value
+    if value is None:
+        return default
     try:
-        if value is None or str(value).strip() == "":
-            return default
         return float(value)
     except Exception:
         return default
 
 
+# Formas canónicas de xsd:boolean que emite el servicio: se resuelven con una
+# búsqueda en el dict, sin crear cadenas intermedias
+_BOOL_TEXTO = {"true": True, "false": False}
+
+
 def safe_bool(value):
+    if value is True or value is False:
+        return value
+    resultado = _BOOL_TEXTO.get(value) if type(value) is str else None
+    if resultado is not None:
+        return resultado
     try:
         return str(value).strip().lower() == "true"
     except Exception:
         return False
+
+
 def safe_text(value):
     return value.strip() if value else ""
+
+
+def _xml(value) -> bytes:
+    """Texto de un campo listo para el envelope: safe_str, escapado XML y UTF-8."""
+    return safe_str(value).translate(_XML_ESCAPE).encode("utf-8")
+
+
+def _boolXml(value) -> bytes:
+    """xsd:boolean con la misma regla que zeep: las cadenas "false" y "0" son falsas."""
+    return b"true" if value and value not in ("false", "0") else b"false"
+
+
+def _decimalXml(value) -> bytes:
+    """
+    xsd:decimal en notación de punto fijo (str(float) puede dar "1e-05", que
+    no es un decimal válido). Lanza ValueError si el valor no es finito.
+    """
+    valor = Decimal(repr(safe_float(value)))
+    if not valor.is_finite():
+        raise ValueError(f"Valor decimal no válido: {value!r}")
+    return format(valor, "f").encode("ascii")
+
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
+# Etiquetas del namespace tempuri ya resueltas (notación Clark): se buscan
+# como hijos directos, sin pasar por el motor de rutas ni resolver prefijos
+_TEM = "{http://tempuri.org/}"
+_TEM_ESPACIOS = _TEM + "Espacios"
+_TEM_NOMBRE = _TEM + "Nombre"
+_TEM_SELECCIONAR_ESPACIOS_RESULT = _TEM + "seleccionarEspaciosResult"
+_TEM_ELIMINAR_ESPACIO_RESULT = _TEM + "eliminarEspacioResult"
+_TEM_ACTUALIZAR_ESPACIO_RESULT = _TEM + "actualizarEspacioResult"
+_PATH_INSERTAR_ESPACIO = ".//" + _TEM + "insertarEspacioResult"
+
+# Campos planos de cada <Espacios>: (clave, etiqueta, valor si falta, conversor)
+_CAMPOS_ESPACIO = tuple(
+    (clave, _TEM + clave, defecto, conversor)
+    for clave, defecto, conversor in (
+        ("Id", "", safe_text),
+        ("HotelId", "", safe_text),
+        ("TipoServicioId", "", safe_text),
+        ("TipoAlimentacionId", "", safe_text),
+        ("Nombre", "", safe_text),
+        ("Moneda", "USD", safe_text),
+        ("CostoDiario", "0", safe_text),
+        ("CapacidadAdultos", "0", safe_text),
+        ("CapacidadNinios", "0", safe_text),
+        ("Habitaciones", "0", safe_text),
+        ("Parqueaderos", "0", safe_text),
+        ("DimensionesDelLugar", "0", safe_text),
+        ("DescripcionDelLugar", "", safe_text),
+        ("Puntuacion", "0", safe_text),
+        ("Ubicacion", "", safe_text),
+        ("MinutosRetencion", "0", safe_text),
+        ("ExpiraEn", "", safe_text),
+        ("EsBloqueada", "false", safe_bool),
+        ("FechaRegistro", "", safe_text),
+        ("UltimaFechaCambio", "", safe_text),
+        ("EsActivo", "false", safe_bool),
+    )
+)
+# Subnodos anidados de los que solo se toma <Nombre>
+_ANIDADOS_ESPACIO = tuple((clave, _TEM + clave) for clave in ("Hotel", "TipoServicio", "TipoAlimentacion"))
+# Orden de los valores en cada fila/tupla de espacio
+_CLAVES_ESPACIO = tuple(c[0] for c in _CAMPOS_ESPACIO) + tuple(c[0] for c in _ANIDADOS_ESPACIO)
+
+# Filas de seleccionarEspacios(como_tuplas=True): tuplas sin __dict__, más
+# ligeras que un dict por fila y con acceso a campos por atributo.
+# Espacio._asdict() devuelve el dict histórico.
+Espacio = namedtuple("Espacio", _CLAVES_ESPACIO)
+
+
+def _valoresEspacio(nodo) -> Espacio:
+    """Valores de un nodo <Espacios> en el orden de _CLAVES_ESPACIO (los mismos que daría findtext)."""
+    find = nodo.find
+    valores = []
+    agregar = valores.append
+    for _, etiqueta, defecto, conversor in _CAMPOS_ESPACIO:
+        hijo = find(etiqueta)
+        agregar(conversor(defecto if hijo is None else (hijo.text or "")))
+    for _, etiqueta in _ANIDADOS_ESPACIO:
+        hijo = find(etiqueta)
+        nombre = None if hijo is None else hijo.find(_TEM_NOMBRE)
+        agregar(safe_text("" if nombre is None else nombre.text))
+    return Espacio._make(valores)
+
+
+def _armarListado(mensaje: str, filas: tuple, como_columnas: bool, como_tuplas: bool = False) -> dict:
+    """
+    Arma el resultado de seleccionarEspacios() a partir de las filas Espacio:
+    lista de dicts (o, con como_tuplas, de Espacio) en "espacios" o, con
+    como_columnas, una lista por campo en "columnas".
+    """
+    if como_columnas:
+        columnas = zip(*filas) if filas else ([] for _ in _CLAVES_ESPACIO)
+        return {
+            "exito": True,
+            "mensaje": mensaje,
+            "columnas": {clave: list(valores) for clave, valores in zip(_CLAVES_ESPACIO, columnas)},
+        }
+    return {
+        "exito": True,
+        "mensaje": mensaje,
+        "espacios": list(filas) if como_tuplas else [dict(zip(_CLAVES_ESPACIO, fila)) for fila in filas],
+    }
+
+
+# ======================================================
+# CACHÉ DEL LISTADO DE ESPACIOS
+# ======================================================
+def _leerCache():
+    """
+    Devuelve ((mensaje, filas) vigentes o None, generación actual). La
+    generación se pasa a _guardarEnCache() tras consultar el servicio.
+    """
+    with _ESPACIOS_CACHE_LOCK:
+        if _ESPACIOS_CACHE["v"] is None or time.monotonic() - _ESPACIOS_CACHE["t"] >= _ESPACIOS_CACHE_TTL:
+            return None, _ESPACIOS_CACHE["g"]
+        return _ESPACIOS_CACHE["v"], _ESPACIOS_CACHE["g"]
+
+
+def _guardarEnCache(mensaje: str, filas: tuple, generacion: int) -> None:
+    """
+    Guarda un listado exitoso de seleccionarEspacios() con su marca de tiempo,
+    salvo que la caché se haya invalidado después de `generacion`.
+    Las filas son tuplas inmutables: cada lectura arma sus propios dicts/listas.
+    """
+    with _ESPACIOS_CACHE_LOCK:
+        if generacion != _ESPACIOS_CACHE["g"]:
+            return
+        _ESPACIOS_CACHE["v"] = (mensaje, filas)
+        _ESPACIOS_CACHE["t"] = time.monotonic()
+
+
+def _invalidarCache() -> None:
+    """Fuerza que la próxima llamada a seleccionarEspacios() consulte el servicio."""
+    with _ESPACIOS_CACHE_LOCK:
+        _ESPACIOS_CACHE["g"] += 1
+        _ESPACIOS_CACHE["t"] = 0.0
+        _ESPACIOS_CACHE["v"] = None
+
 
 
 def eliminarEspacio(id_espacio: int) -> dict:
@@ -55,19 +302,36 @@ def eliminarEspacio(id_espacio: int) -> dict:
               - exito (bool)
               - mensaje (str)
     """
+    if safe_int(id_espacio) <= 0:
+        return {"error": "El parámetro 'id_espacio' debe ser un entero positivo."}
+
     try:
         logger.info(f"Intentando eliminar espacio con ID {id_espacio}...")
 
-        # Crear cliente SOAP
-        client = Client(WSDL_URL)
+        # ======================================================
+        # Construcción del cuerpo SOAP
+        # ======================================================
+        soap_body = _ENV_ELIMINAR_ESPACIO % safe_int(id_espacio)
+
+        # ======================================================
+        # Envío de solicitud SOAP
+        # ======================================================
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_ELIMINAR_ESPACIO, timeout=_TIMEOUT)
+
+        if response.status_code != 200:
+            logger.error(f"HTTP {response.status_code}: {response.text}")
+            return {"exito": False, "mensaje": f"Error HTTP {response.status_code}"}
 
-        # Llamar al método remoto
-        resultado = client.service.eliminarEspacio(id=id_espacio)
+        # ======================================================
+        # Parseo de respuesta XML
+        # ======================================================
+        resultado = _soap.textoResultado(response.content, _TEM_ELIMINAR_ESPACIO_RESULT)
 
         # Validar resultado
-        if resultado is True:
+        if resultado is not None and resultado.lower() == "true":
             mensaje = f"Espacio con ID {id_espacio} eliminado (soft delete) correctamente."
             logger.info(mensaje)
+            _invalidarCache()
             return {"exito": True, "mensaje": mensaje}
 
         else:
@@ -114,49 +378,70 @@ def insertarEspacio(nuevo_espacio: dict) -> dict:
               - exito (bool)
               - mensaje (str)
               - nuevo_id (int | None)
+        o {"error": str} si falta alguno de HotelId, TipoServicioId o
+        TipoAlimentacionId (deben ser enteros positivos).
     """
+    if not isinstance(nuevo_espacio, dict):
+        return {"error": "El parámetro 'nuevo_espacio' debe ser un diccionario."}
+    for campo in _IDS_OBLIGATORIOS_ESPACIO:
+        if safe_int(nuevo_espacio.get(campo)) <= 0:
+            return {"error": f"El campo '{campo}' es obligatorio y debe ser un entero positivo."}
 
     try:
         logger.info(f"Insertando nuevo espacio: {nuevo_espacio.get('Nombre', 'Sin nombre')}")
 
-        # Crear cliente SOAP
-        client = Client(WSDL_URL)
-
-        # Definir estructura del espacio
-        espacio_data = {
-            "Id": 0,  # el servicio lo asigna
-            "HotelId": nuevo_espacio.get("HotelId"),
-            "TipoServicioId": nuevo_espacio.get("TipoServicioId"),
-            "TipoAlimentacionId": nuevo_espacio.get("TipoAlimentacionId"),
-            "Nombre": nuevo_espacio.get("Nombre"),
-            "Moneda": nuevo_espacio.get("Moneda", "USD"),
-            "CostoDiario": nuevo_espacio.get("CostoDiario", 0.0),
-            "CapacidadAdultos": nuevo_espacio.get("CapacidadAdultos", 1),
-            "CapacidadNinios": nuevo_espacio.get("CapacidadNinios", 0),
-            "Habitaciones": nuevo_espacio.get("Habitaciones", 1),
-            "Parqueaderos": nuevo_espacio.get("Parqueaderos", 0),
-            "DimensionesDelLugar": nuevo_espacio.get("DimensionesDelLugar", 0),
-            "DescripcionDelLugar": nuevo_espacio.get("DescripcionDelLugar", ""),
-            "Puntuacion": nuevo_espacio.get("Puntuacion", 0),
-            "Ubicacion": nuevo_espacio.get("Ubicacion", ""),
-            "MinutosRetencion": nuevo_espacio.get("MinutosRetencion", 60),
-            "ExpiraEn": nuevo_espacio.get("ExpiraEn", datetime.now().isoformat()),
-            "EsBloqueada": nuevo_espacio.get("EsBloqueada", False),
-            "FechaRegistro": nuevo_espacio.get("FechaRegistro", datetime.now().isoformat()),
-            "UltimaFechaCambio": nuevo_espacio.get("UltimaFechaCambio", datetime.now().isoformat()),
-            "EsActivo": nuevo_espacio.get("EsActivo", True),
-        }
+        # ======================================================
+        # Construcción del cuerpo SOAP
+        # ======================================================
+        nombre = safe_str(nuevo_espacio.get("Nombre"))
+        # Una sola marca de tiempo para todas las fechas por defecto del registro
+        ahora = datetime.now().isoformat()
+        soap_body = _ENV_INSERTAR_ESPACIO % (
+            safe_int(nuevo_espacio.get("HotelId")),
+            safe_int(nuevo_espacio.get("TipoServicioId")),
+            safe_int(nuevo_espacio.get("TipoAlimentacionId")),
+            _xml(nombre),
+            _xml(nuevo_espacio.get("Moneda", "USD")),
+            _decimalXml(nuevo_espacio.get("CostoDiario", 0.0)),
+            safe_int(nuevo_espacio.get("CapacidadAdultos", 1)),
+            safe_int(nuevo_espacio.get("CapacidadNinios", 0)),
+            safe_int(nuevo_espacio.get("Habitaciones", 1)),
+            safe_int(nuevo_espacio.get("Parqueaderos", 0)),
+            safe_int(nuevo_espacio.get("DimensionesDelLugar", 0)),
+            _xml(nuevo_espacio.get("DescripcionDelLugar", "")),
+            safe_int(nuevo_espacio.get("Puntuacion", 0)),
+            _xml(nuevo_espacio.get("Ubicacion", "")),
+            safe_int(nuevo_espacio.get("MinutosRetencion", 60)),
+            _xml(nuevo_espacio.get("ExpiraEn", ahora)),
+            _boolXml(nuevo_espacio.get("EsBloqueada", False)),
+            _xml(nuevo_espacio.get("FechaRegistro", ahora)),
+            _xml(nuevo_espacio.get("UltimaFechaCambio", ahora)),
+            _boolXml(nuevo_espacio.get("EsActivo", True)),
+        )
+
+        # ======================================================
+        # Envío de solicitud SOAP
+        # ======================================================
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_INSERTAR_ESPACIO, timeout=_TIMEOUT)
+
+        if response.status_code != 200:
+            logger.error(f"HTTP {response.status_code}: {response.text}")
+            return {"exito": False, "mensaje": f"Error HTTP {response.status_code}", "nuevo_id": None}
 
-        # Llamar al método remoto
-        resultado = client.service.insertarEspacio(nuevoEspacio=espacio_data)
+        # ======================================================
+        # Parseo de respuesta XML
+        # ======================================================
+        root = etree.fromstring(response.content)
+        resultado = safe_int(root.findtext(_PATH_INSERTAR_ESPACIO))
 
         # Validar respuesta (devuelve el ID del nuevo registro o 0 si falla)
-        if resultado and int(resultado) > 0:
-            mensaje = f"Espacio '{espacio_data['Nombre']}' insertado correctamente con ID {resultado}."
+        if resultado > 0:
+            mensaje = f"Espacio '{nombre}' insertado correctamente con ID {resultado}."
             logger.info(mensaje)
-            return {"exito": True, "mensaje": mensaje, "nuevo_id": int(resultado)}
+            _invalidarCache()
+            return {"exito": True, "mensaje": mensaje, "nuevo_id": resultado}
         else:
-            mensaje = f"No se pudo insertar el espacio '{espacio_data['Nombre']}'."
+            mensaje = f"No se pudo insertar el espacio '{nombre}'."
             logger.warning(mensaje)
             return {"exito": False, "mensaje": mensaje, "nuevo_id": None}
 
@@ -185,48 +470,36 @@ def actualizarEspacio(espacio_editado: dict) -> dict:
         # ======================================================
         # Construcción del cuerpo SOAP
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <actualizarEspacio xmlns="http://tempuri.org/">
-              <espacioEditado>
-                <Id>{safe_int(espacio_editado.get("Id"))}</Id>
-                <HotelId>{safe_int(espacio_editado.get("HotelId"))}</HotelId>
-                <TipoServicioId>{safe_int(espacio_editado.get("TipoServicioId"))}</TipoServicioId>
-                <TipoAlimentacionId>{safe_int(espacio_editado.get("TipoAlimentacionId"))}</TipoAlimentacionId>
-                <Nombre>{safe_str(espacio_editado.get("Nombre"))}</Nombre>
-                <Moneda>{safe_str(espacio_editado.get("Moneda", "USD"))}</Moneda>
-                <CostoDiario>{safe_float(espacio_editado.get("CostoDiario"))}</CostoDiario>
-                <CapacidadAdultos>{safe_int(espacio_editado.get("CapacidadAdultos"))}</CapacidadAdultos>
-                <CapacidadNinios>{safe_int(espacio_editado.get("CapacidadNinios"))}</CapacidadNinios>
-                <Habitaciones>{safe_int(espacio_editado.get("Habitaciones"))}</Habitaciones>
-                <Parqueaderos>{safe_int(espacio_editado.get("Parqueaderos"))}</Parqueaderos>
-                <DimensionesDelLugar>{safe_int(espacio_editado.get("DimensionesDelLugar"))}</DimensionesDelLugar>
-                <DescripcionDelLugar>{safe_str(espacio_editado.get("DescripcionDelLugar"))}</DescripcionDelLugar>
-                <Puntuacion>{safe_int(espacio_editado.get("Puntuacion"))}</Puntuacion>
-                <Ubicacion>{safe_str(espacio_editado.get("Ubicacion"))}</Ubicacion>
-                <MinutosRetencion>{safe_int(espacio_editado.get("MinutosRetencion"))}</MinutosRetencion>
-                <ExpiraEn>{safe_str(espacio_editado.get("ExpiraEn", datetime.now().isoformat()))}</ExpiraEn>
-                <EsBloqueada>{str(espacio_editado.get("EsBloqueada", False)).lower()}</EsBloqueada>
-                <FechaRegistro>{safe_str(espacio_editado.get("FechaRegistro", datetime.now().isoformat()))}</FechaRegistro>
-                <UltimaFechaCambio>{safe_str(espacio_editado.get("UltimaFechaCambio", datetime.now().isoformat()))}</UltimaFechaCambio>
-                <EsActivo>{str(espacio_editado.get("EsActivo", True)).lower()}</EsActivo>
-              </espacioEditado>
-            </actualizarEspacio>
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/actualizarEspacio",
-        }
+        # Una sola marca de tiempo para todas las fechas por defecto del registro
+        ahora = datetime.now().isoformat()
+        soap_body = _ENV_ACTUALIZAR_ESPACIO % (
+            safe_int(espacio_editado.get("Id")),
+            safe_int(espacio_editado.get("HotelId")),
+            safe_int(espacio_editado.get("TipoServicioId")),
+            safe_int(espacio_editado.get("TipoAlimentacionId")),
+            _xml(espacio_editado.get("Nombre")),
+            _xml(espacio_editado.get("Moneda", "USD")),
+            _decimalXml(espacio_editado.get("CostoDiario")),
+            safe_int(espacio_editado.get("CapacidadAdultos")),
+            safe_int(espacio_editado.get("CapacidadNinios")),
+            safe_int(espacio_editado.get("Habitaciones")),
+            safe_int(espacio_editado.get("Parqueaderos")),
+            safe_int(espacio_editado.get("DimensionesDelLugar")),
+            _xml(espacio_editado.get("DescripcionDelLugar")),
+            safe_int(espacio_editado.get("Puntuacion")),
+            _xml(espacio_editado.get("Ubicacion")),
+            safe_int(espacio_editado.get("MinutosRetencion")),
+            _xml(espacio_editado.get("ExpiraEn", ahora)),
+            _xml(str(espacio_editado.get("EsBloqueada", False)).lower()),
+            _xml(espacio_editado.get("FechaRegistro", ahora)),
+            _xml(espacio_editado.get("UltimaFechaCambio", ahora)),
+            _xml(str(espacio_editado.get("EsActivo", True)).lower()),
+        )
 
         # ======================================================
         # Envío de solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_ACTUALIZAR_ESPACIO, timeout=_TIMEOUT)
 
         if response.status_code != 200:
             logger.error(f"HTTP {response.status_code}: {response.text}")
@@ -235,23 +508,18 @@ def actualizarEspacio(espacio_editado: dict) -> dict:
         # ======================================================
         # Parseo de respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:actualizarEspacioResult", ns)
+        resultado = _soap.textoResultado(response.content, _TEM_ACTUALIZAR_ESPACIO_RESULT)
 
-        if result_node is None:
+        if resultado is None:
             logger.warning("No se encontró el nodo actualizarEspacioResult en la respuesta SOAP.")
             return {"exito": False, "mensaje": "No se recibió confirmación del servicio."}
 
-        exito = str(result_node.text).strip().lower() == "true"
+        exito = resultado.lower() == "true"
 
         if exito:
             mensaje = f"Espacio con ID {espacio_editado.get('Id')} actualizado correctamente."
             logger.info(mensaje)
+            _invalidarCache()
             return {"exito": True, "mensaje": mensaje}
         else:
             mensaje = f"No se pudo actualizar el espacio con ID {espacio_editado.get('Id')}."
@@ -265,113 +533,203 @@ def actualizarEspacio(espacio_editado: dict) -> dict:
 # ==========================================
 # FUNCIÓN PRINCIPAL: seleccionarEspacios
 # ==========================================
-def seleccionarEspacios() -> dict:
+def seleccionarEspacios(como_columnas: bool = False, como_tuplas: bool = False) -> dict:
     """
     Obtiene todos los espacios activos desde el servicio SOAP WS_GestionEspacios.asmx.
 
+    Parámetros:
+        como_columnas (bool): si es True, devuelve una lista por campo en
+            "columnas" ({"Id": [...], "Nombre": [...], ...}) en lugar de un
+            dict por espacio. Útil para serializar o filtrar listados grandes.
+        como_tuplas (bool): si es True, cada espacio se devuelve como namedtuple
+            Espacio (acceso por atributo, ._asdict() para el dict) en lugar de dict.
+
     Retorna:
         dict: {
             "exito": bool,
             "mensaje": str,
-            "espacios": [ {...}, {...} ]
+            "espacios": [ {...}, {...} ]      (o [Espacio, ...], o "columnas": {campo: [...]})
         }
     """
+    cacheado, generacion = _leerCache()
+    if cacheado is not None:
+        return _armarListado(*cacheado, como_columnas, como_tuplas)
+
     try:
         logger.info("Consultando todos los espacios activos en WS_GestionEspacios...")
 
         # ======================================================
         # Construcción del cuerpo SOAP
         # ======================================================
-        soap_body = """<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-                       xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-          <soap:Body>
-            <seleccionarEspacios xmlns="http://tempuri.org/" />
-          </soap:Body>
-        </soap:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/seleccionarEspacios",
-        }
+        soap_body = _ENV_SELECCIONAR_ESPACIOS
 
         # ======================================================
         # Envío de solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        # Con stream=True el parser lee el cuerpo del socket a medida que llega,
+        # sin esperar a tener la respuesta completa en memoria
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=_H_SELECCIONAR_ESPACIOS, timeout=_TIMEOUT, stream=True)
+
+        with response:
+            if response.status_code != 200:
+                logger.error(f"HTTP {response.status_code}: {response.text}")
+                return {"exito": False, "mensaje": f"Error HTTP {response.status_code}"}
+
+            # ======================================================
+            # Parseo de respuesta XML
+            # ======================================================
+            # Lectura incremental: cada <Espacios> hijo directo del resultado se
+            # convierte en una tupla de valores al cerrarse y se libera de
+            # inmediato, sin mantener el árbol completo en memoria.
+            response.raw.decode_content = True
+            filas = []
+            resultado_encontrado = False
+            for _, nodo in etree.iterparse(
+                response.raw,
+                events=("end",),
+                tag=(_TEM_ESPACIOS, _TEM_SELECCIONAR_ESPACIOS_RESULT),
+                huge_tree=False,
+                collect_ids=False,
+                remove_blank_text=True,
+                resolve_entities=False,
+            ):
+                if nodo.tag == _TEM_SELECCIONAR_ESPACIOS_RESULT:
+                    resultado_encontrado = True
+                    continue
+
+                result_node = nodo.getparent()
+                if result_node is None or result_node.tag != _TEM_SELECCIONAR_ESPACIOS_RESULT:
+                    continue
+
+                filas.append(_valoresEspacio(nodo))
+
+                # Liberar el nodo procesado y los hermanos ya consumidos
+                nodo.clear()
+                while nodo.getprevious() is not None:
+                    del result_node[0]
+
+            if not resultado_encontrado:
+                logger.warning("No se encontró el nodo seleccionarEspaciosResult en la respuesta SOAP.")
+                return {"exito": False, "mensaje": "No se encontraron espacios."}
+
+        filas = tuple(filas)
+        if not filas:
+            logger.info("No se encontraron espacios activos en la respuesta SOAP.")
+            mensaje = "No se encontraron espacios activos."
+        else:
+            logger.info(f"Se encontraron {len(filas)} espacios activos.")
+            mensaje = f"Se encontraron {len(filas)} espacio(s) activo(s)."
 
-        if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"exito": False, "mensaje": f"Error HTTP {response.status_code}"}
+        _guardarEnCache(mensaje, filas, generacion)
+        return _armarListado(mensaje, filas, como_columnas, como_tuplas)
 
-        # ======================================================
-        # Parseo de respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
+    except Exception as ex:
+        logger.error(f"Error en seleccionarEspacios(): {ex}")
+        return {"exito": False, "mensaje": f"Error al consultar los espacios: {ex}"}
 
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:seleccionarEspaciosResult", ns)
-
-        if result_node is None:
-            logger.warning("No se encontró el nodo seleccionarEspaciosResult en la respuesta SOAP.")
-            return {"exito": False, "mensaje": "No se encontraron espacios."}
-
-        # Buscar todos los nodos <Espacios>
-        espacios_nodes = result_node.findall("tem:Espacios", ns)
-        espacios = []
-
-        for nodo in espacios_nodes:
-            e = {
-                "Id": safe_text(nodo.findtext("tem:Id", "", ns)),
-                "HotelId": safe_text(nodo.findtext("tem:HotelId", "", ns)),
-                "TipoServicioId": safe_text(nodo.findtext("tem:TipoServicioId", "", ns)),
-                "TipoAlimentacionId": safe_text(nodo.findtext("tem:TipoAlimentacionId", "", ns)),
-                "Nombre": safe_text(nodo.findtext("tem:Nombre", "", ns)),
-                "Moneda": safe_text(nodo.findtext("tem:Moneda", "USD", ns)),
-                "CostoDiario": safe_text(nodo.findtext("tem:CostoDiario", "0", ns)),
-                "CapacidadAdultos": safe_text(nodo.findtext("tem:CapacidadAdultos", "0", ns)),
-                "CapacidadNinios": safe_text(nodo.findtext("tem:CapacidadNinios", "0", ns)),
-                "Habitaciones": safe_text(nodo.findtext("tem:Habitaciones", "0", ns)),
-                "Parqueaderos": safe_text(nodo.findtext("tem:Parqueaderos", "0", ns)),
-                "DimensionesDelLugar": safe_text(nodo.findtext("tem:DimensionesDelLugar", "0", ns)),
-                "DescripcionDelLugar": safe_text(nodo.findtext("tem:DescripcionDelLugar", "", ns)),
-                "Puntuacion": safe_text(nodo.findtext("tem:Puntuacion", "0", ns)),
-                "Ubicacion": safe_text(nodo.findtext("tem:Ubicacion", "", ns)),
-                "MinutosRetencion": safe_text(nodo.findtext("tem:MinutosRetencion", "0", ns)),
-                "ExpiraEn": safe_text(nodo.findtext("tem:ExpiraEn", "", ns)),
-                "EsBloqueada": safe_bool(nodo.findtext("tem:EsBloqueada", "false", ns)),
-                "FechaRegistro": safe_text(nodo.findtext("tem:FechaRegistro", "", ns)),
-                "UltimaFechaCambio": safe_text(nodo.findtext("tem:UltimaFechaCambio", "", ns)),
-                "EsActivo": safe_bool(nodo.findtext("tem:EsActivo", "false", ns)),
-
-                # Subnodos anidados
-                "Hotel": safe_text(nodo.findtext("tem:Hotel/tem:Nombre", "", ns)),
-                "TipoServicio": safe_text(nodo.findtext("tem:TipoServicio/tem:Nombre", "", ns)),
-                "TipoAlimentacion": safe_text(nodo.findtext("tem:TipoAlimentacion/tem:Nombre", "", ns)),
-            }
-            espacios.append(e)
-
-        if not espacios:
-            logger.info("No se encontraron espacios activos en la respuesta SOAP.")
-            return {"exito": True, "mensaje": "No se encontraron espacios activos.", "espacios": []}
+# ==========================================
+# FUNCIÓN: seleccionarEspaciosPorHoteles
+# ==========================================
+def seleccionarEspaciosPorHoteles(hotel_ids: list) -> dict:
+    """
+    Obtiene los espacios activos de varios hoteles con una sola llamada SOAP:
+    consulta seleccionarEspacios() una vez y agrupa el resultado por HotelId.
+
+    Parámetros:
+        hotel_ids (list[int]): IDs de los hoteles a consultar.
 
-        logger.info(f"Se encontraron {len(espacios)} espacios activos.")
+    Retorna:
+        dict: {
+            "exito": bool,
+            "mensaje": str,
+            "espaciosPorHotel": {hotel_id: [ {...}, ... ], ...}
+        }
+        Cada ID pedido aparece como clave, con lista vacía si no tiene espacios.
+    """
+    # Los HotelId de seleccionarEspacios() llegan como texto
+    por_hotel = {str(hotel_id): [] for hotel_id in hotel_ids}
+    if not por_hotel:
+        return {"exito": True, "mensaje": "No se indicaron hoteles.", "espaciosPorHotel": {}}
+
+    resultado = seleccionarEspacios()
+    if not resultado.get("exito"):
         return {
-            "exito": True,
-            "mensaje": f"Se encontraron {len(espacios)} espacio(s) activo(s).",
-            "espacios": espacios
+            "exito": False,
+            "mensaje": resultado.get("mensaje", "No se pudieron consultar los espacios."),
+            "espaciosPorHotel": {},
         }
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarEspacios(): {ex}")
-        return {"exito": False, "mensaje": f"Error al consultar los espacios: {ex}"}
+    for espacio in resultado.get("espacios", []):
+        lista = por_hotel.get(espacio["HotelId"])
+        if lista is not None:
+            lista.append(espacio)
+
+    total = sum(len(lista) for lista in por_hotel.values())
+    return {
+        "exito": True,
+        "mensaje": f"Se encontraron {total} espacio(s) en {len(por_hotel)} hotel(es).",
+        "espaciosPorHotel": {hotel_id: por_hotel[str(hotel_id)] for hotel_id in hotel_ids},
+    }
+
+
+# ======================================================
+# FUNCIONES EN LOTE: insertarEspacio
+# ======================================================
+def insertarEspacioVarios(nuevos_espacios: list) -> list:
+    """
+    Inserta varios espacios en una sola operación.
+
+    Las llamadas se lanzan en paralelo sobre el pool de _SESSION (ver
+    insertarEspacioVarios_async), así que una carga masiva tarda del orden
+    de N/_soap.POOL_MAXIMO viajes al servidor en lugar de N.
+
+    Parámetros:
+        nuevos_espacios (list[dict]): cada elemento con los campos de insertarEspacio().
+
+    Retorna:
+        list[dict]: un resultado de insertarEspacio() por elemento, en el mismo
+        orden de entrada. Un fallo en una inserción no afecta a las demás; su
+        posición contiene {"error": str}.
+    """
+    if not nuevos_espacios:
+        return []
+    return _soap.ejecutar(insertarEspacioVarios_async(nuevos_espacios))
+
+
+# ======================================================
+# VARIANTES ASÍNCRONAS
+# ======================================================
+# Ejecutan la función síncrona en un hilo del executor por defecto: varias
+# llamadas reunidas con asyncio.gather se solapan en la red y comparten el
+# pool de conexiones de _SESSION.
+async def eliminarEspacio_async(id_espacio: int) -> dict:
+    """Versión asíncrona de eliminarEspacio()."""
+    return await asyncio.to_thread(eliminarEspacio, id_espacio)
+
+
+async def insertarEspacio_async(nuevo_espacio: dict) -> dict:
+    """Versión asíncrona de insertarEspacio()."""
+    return await asyncio.to_thread(insertarEspacio, nuevo_espacio)
+
+
+async def actualizarEspacio_async(espacio_editado: dict) -> dict:
+    """Versión asíncrona de actualizarEspacio()."""
+    return await asyncio.to_thread(actualizarEspacio, espacio_editado)
+
+
+async def seleccionarEspacios_async(como_columnas: bool = False, como_tuplas: bool = False) -> dict:
+    """Versión asíncrona de seleccionarEspacios()."""
+    return await asyncio.to_thread(seleccionarEspacios, como_columnas, como_tuplas)
+
 
+async def seleccionarEspaciosPorHoteles_async(hotel_ids: list) -> dict:
+    """Versión asíncrona de seleccionarEspaciosPorHoteles()."""
+    return await asyncio.to_thread(seleccionarEspaciosPorHoteles, hotel_ids)
 
 
+async def insertarEspacioVarios_async(nuevos_espacios: list) -> list:
+    """Versión asíncrona de insertarEspacioVarios()."""
+    return await _soap.reunir(asyncio.to_thread(insertarEspacio, e) for e in nuevos_espacios)
 
 
 
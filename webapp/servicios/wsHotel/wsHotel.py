@@ -1,7 +1,16 @@
+import asyncio
+import copy
+import gzip
 import logging
+import re
+import threading
+import time
 import requests
-import xml.etree.ElementTree as ET
 from datetime import datetime
+from lxml import etree
+from urllib3.exceptions import HTTPError as Urllib3Error
+from webapp.servicios import _soap
+from webapp.servicios.wsIntegracionDetalleServicios import wsIntegracionDetalleServicios as _integracion
 
 # ======================================================
 # CONFIGURACIÓN GLOBAL
@@ -9,7 +18,396 @@ from datetime import datetime
 SOAP_URL = "https://realdecuenca-btccaacvcpgyadhb.canadacentral-01.azurewebsites.net/WS_GestionHotel.asmx"
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Tiempos límite (conexión, lectura): un host caído falla en segundos en
+# lugar de dejar la vista colgada 30 s.
+_TIMEOUT = (3, 15)
+
+# Fallos esperables de una llamada SOAP, los únicos que las funciones
+# convierten en {"error": ...}: red (requests, o urllib3 al leer response.raw
+# en streaming), XML mal formado y valores que no se pueden convertir.
+_ERRORES_SOAP = (requests.RequestException, Urllib3Error, etree.LxmlError, ValueError)
+
+# Sesión HTTP compartida por todas las llamadas del módulo (ver _soap.crearSesion)
+_SESSION = _soap.crearSesion()
+
+# Compresión gzip de envelopes de escritura grandes. Desactivada por defecto:
+# ASMX/IIS no descomprime cuerpos de petición y responde 500 (soap:Client), así
+# que sólo debe activarse si el servidor tiene habilitada la descompresión.
+_GZIP_DESDE = 1024  # bytes
+_GZIP_PETICIONES = False
+_H_GZIP = {"Content-Encoding": "gzip"}
+
+# Latencia de cada POST al servicio, acumulada en memoria por
+# (operación, resultado): [llamadas, segundos totales, segundos máximo].
+# "ok" es HTTP 200; "error" cualquier otro estado o un fallo de red.
+_METRICAS = {}
+_METRICAS_LOCK = threading.Lock()
+
+# Caché de buscarHotelPorNombre por texto buscado (en minúsculas): las
+# búsquedas repetidas de un autocompletado se sirven desde memoria. Se vacía
+# tras cualquier inserción, actualización o eliminación exitosa de hoteles.
+_BUSQUEDA_CACHE_TTL = 15  # segundos
+_BUSQUEDA_CACHE_MAX = 128
+_BUSQUEDA_CACHE = {}  # clave -> (instante, hoteles)
+_BUSQUEDA_CACHE_LOCK = threading.Lock()
+
+# Caché TTL de las consultas de solo lectura (seleccionarHoteles y
+# seleccionarHotelPorId): el catálogo de hoteles cambia muy poco. Clave:
+# (operación, parámetro). Igual que la de búsquedas, se vacía tras cualquier
+# escritura exitosa del módulo.
+_CONSULTAS_CACHE_TTL = 300  # segundos
+_CONSULTAS_CACHE_MAX = 512
+_CONSULTAS_CACHE = {}  # clave -> (expira_en, resultado)
+_CONSULTAS_CACHE_LOCK = threading.Lock()
+
+# Consultas de solo lectura en curso, compartidas entre hilos
+_EN_VUELO = _soap.ConsultasEnVuelo()
+
+# Generación de las cachés: _invalidarCache() la incrementa. Una consulta que
+# empezó antes de una escritura no guarda su resultado (ya desactualizado).
+_CACHE_GENERACION = 0
+
+# Longitud mínima de una búsqueda por nombre que justifica ir al servicio
+_BUSQUEDA_MIN_CARACTERES = 2
+
+# Caracteres de control que XML 1.0 no admite: un texto que los contenga
+# provocaría un Fault del servicio, así que se rechaza antes de enviarlo
+_CARACTERES_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Campos opcionales de un hotel que se validan antes de armar el envelope:
+# (clave, tipo exigido, es fecha ISO 8601)
+_CAMPOS_OPCIONALES_HOTEL = (
+    ("FechaRegistro", str, True),
+    ("UltimaFechaCambio", str, True),
+    ("EsActivo", bool, False),
+)
+
+# Tabla de escape XML precompilada: str.translate la aplica en una sola pasada
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+# Valor xs:boolean de EsActivo ya codificado (el campo se valida como bool)
+_BOOL_XML = {True: b"true", False: b"false"}
+
+# Formato de las fechas por defecto (xs:dateTime sin fracción de segundo)
+_FORMATO_FECHA = "%Y-%m-%dT%H:%M:%S"
+
+# Cabecera y cierre comunes a todos los envelopes, precompilados como bytes
+_ENV_SOAP_INICIO = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"'
+    b' xmlns:tem="http://tempuri.org/"><soapenv:Header/><soapenv:Body>'
+)
+_ENV_SOAP_FIN = b"</soapenv:Body></soapenv:Envelope>"
+
+
+def _armarEnvelope(cuerpo: bytes) -> bytes:
+    """Envuelve el elemento de la operación (bytes) entre la cabecera y el cierre SOAP."""
+    return b"".join((_ENV_SOAP_INICIO, cuerpo, _ENV_SOAP_FIN))
+
+
+# Envelopes precompilados como bytes: el ID se formatea con %d y los textos
+# se insertan ya escapados y codificados (%b)
+
+# Campos de un hotel, comunes a actualizarHotel e insertarHotel:
+# (Id, Nombre, FechaRegistro, UltimaFechaCambio, EsActivo)
+_CAMPOS_HOTEL_XML = (
+    b"<tem:Id>%d</tem:Id>"
+    b"<tem:Nombre>%b</tem:Nombre>"
+    b"<tem:FechaRegistro>%b</tem:FechaRegistro>"
+    b"<tem:UltimaFechaCambio>%b</tem:UltimaFechaCambio>"
+    b"<tem:EsActivo>%b</tem:EsActivo>"
+)
+_ENV_ACTUALIZAR_HOTEL = _armarEnvelope(
+    b"<tem:actualizarHotel><tem:hotelEditado>" + _CAMPOS_HOTEL_XML + b"</tem:hotelEditado></tem:actualizarHotel>"
+)
+
+_ENV_BUSCAR_HOTEL_POR_NOMBRE = _armarEnvelope(
+    b"<tem:buscarHotelPorNombre><tem:nombre>%b</tem:nombre></tem:buscarHotelPorNombre>"
+)
+_ENV_INSERTAR_HOTEL = _armarEnvelope(
+    b"<tem:insertarHotel><tem:nuevoHotel>" + _CAMPOS_HOTEL_XML + b"</tem:nuevoHotel></tem:insertarHotel>"
+)
+_ENV_ELIMINAR_HOTEL = _armarEnvelope(b"<tem:eliminarHotel><tem:id>%d</tem:id></tem:eliminarHotel>")
+_ENV_OBTENER_ESPACIOS_DEL_HOTEL = _armarEnvelope(
+    b"<tem:obtenerEspaciosDelHotel><tem:hotelId>%d</tem:hotelId></tem:obtenerEspaciosDelHotel>"
+)
+_ENV_SELECCIONAR_HOTEL_POR_ID = _armarEnvelope(
+    b"<tem:seleccionarHotelPorId><tem:id>%d</tem:id></tem:seleccionarHotelPorId>"
+)
+# seleccionarHoteles no recibe parámetros: el envelope es constante
+_ENV_SELECCIONAR_HOTELES = _armarEnvelope(b"<tem:seleccionarHoteles/>")
+
+# Cabeceras SOAPAction por operación, construidas una sola vez (el
+# Content-Type ya va en las cabeceras de _SESSION). requests solo las lee.
+_H_ACTUALIZAR_HOTEL = {"SOAPAction": "http://tempuri.org/actualizarHotel"}
+_H_BUSCAR_HOTEL_POR_NOMBRE = {"SOAPAction": "http://tempuri.org/buscarHotelPorNombre"}
+_H_INSERTAR_HOTEL = {"SOAPAction": "http://tempuri.org/insertarHotel"}
+_H_ELIMINAR_HOTEL = {"SOAPAction": "http://tempuri.org/eliminarHotel"}
+_H_OBTENER_ESPACIOS_DEL_HOTEL = {"SOAPAction": "http://tempuri.org/obtenerEspaciosDelHotel"}
+_H_SELECCIONAR_HOTEL_POR_ID = {"SOAPAction": "http://tempuri.org/seleccionarHotelPorId"}
+_H_SELECCIONAR_HOTELES = {"SOAPAction": "http://tempuri.org/seleccionarHoteles"}
+
+# Namespace tempuri en notación Clark: las etiquetas y rutas van ya resueltas,
+# así find/findtext no traducen prefijos en cada llamada
+_TEM = "{http://tempuri.org/}"
+_TEM_ID = _TEM + "Id"
+_TEM_NOMBRE = _TEM + "Nombre"
+_TEM_FECHA_REGISTRO = _TEM + "FechaRegistro"
+_TEM_ULTIMA_FECHA_CAMBIO = _TEM + "UltimaFechaCambio"
+_TEM_ES_ACTIVO = _TEM + "EsActivo"
+_TEM_HOTEL = _TEM + "Hotel"
+_TEM_ESPACIOS = _TEM + "Espacios"
+_TEM_OBTENER_ESPACIOS_DEL_HOTEL_RESULT = _TEM + "obtenerEspaciosDelHotelResult"
+_TEM_SELECCIONAR_HOTELES_RESULT = _TEM + "seleccionarHotelesResult"
+_TEM_ACTUALIZAR_HOTEL_RESULT = _TEM + "actualizarHotelResult"
+
+# Rutas de búsqueda del nodo resultado de cada operación
+_PATH_BUSCAR_HOTEL_POR_NOMBRE_RESULT = ".//" + _TEM + "buscarHotelPorNombreResult"
+_PATH_ELIMINAR_HOTEL_RESULT = ".//" + _TEM + "eliminarHotelResult"
+_PATH_INSERTAR_HOTEL_RESULT = ".//" + _TEM + "insertarHotelResult"
+_PATH_SELECCIONAR_HOTEL_POR_ID_RESULT = ".//" + _TEM + "seleccionarHotelPorIdResult"
+
+
+def _aBooleano(texto: str) -> bool:
+    return texto.lower() == "true"
+
+
+def _hotelDesdeNodo(nodo) -> dict:
+    """Arma el diccionario de un hotel a partir de su nodo XML."""
+    texto = nodo.findtext
+    return {
+        "Id": int(texto(_TEM_ID, "0")),
+        "Nombre": texto(_TEM_NOMBRE, ""),
+        "FechaRegistro": texto(_TEM_FECHA_REGISTRO, ""),
+        "UltimaFechaCambio": texto(_TEM_ULTIMA_FECHA_CAMBIO, ""),
+        "EsActivo": _aBooleano(texto(_TEM_ES_ACTIVO, "false")),
+    }
+
+
+# Campos planos de cada <Espacios> de obtenerEspaciosDelHotel:
+# (clave, texto si falta, conversor). El valor por defecto de un campo
+# ausente es el conversor aplicado a su texto por defecto.
+_CAMPOS_ESPACIO_HOTEL = (
+    ("Id", "0", int),
+    ("HotelId", "0", int),
+    ("TipoServicioId", "0", int),
+    ("TipoAlimentacionId", "0", int),
+    ("Nombre", "", str),
+    ("Moneda", "", str),
+    ("CostoDiario", "0", float),
+    ("CapacidadAdultos", "0", int),
+    ("CapacidadNinios", "0", int),
+    ("Habitaciones", "0", int),
+    ("Parqueaderos", "0", int),
+    ("DimensionesDelLugar", "0", int),
+    ("DescripcionDelLugar", "", str),
+    ("Puntuacion", "0", int),
+    ("Ubicacion", "", str),
+    ("MinutosRetencion", "0", int),
+    ("ExpiraEn", "", str),
+    ("EsBloqueada", "false", _aBooleano),
+    ("FechaRegistro", "", str),
+    ("UltimaFechaCambio", "", str),
+    ("EsActivo", "false", _aBooleano),
+)
+_CONVERSORES_ESPACIO_HOTEL = {_TEM + clave: (clave, conversor) for clave, _, conversor in _CAMPOS_ESPACIO_HOTEL}
+_DEFECTOS_ESPACIO_HOTEL = {clave: conversor(defecto) for clave, defecto, conversor in _CAMPOS_ESPACIO_HOTEL}
+# Subnodos {Id, Nombre} que se agregan (en este orden) solo si existen
+_ANIDADOS_ESPACIO_HOTEL = ("Hotel", "TipoServicio", "TipoAlimentacion")
+_TEM_ANIDADOS_ESPACIO_HOTEL = {_TEM + clave: clave for clave in _ANIDADOS_ESPACIO_HOTEL}
+
+def _validarHotel(hotel, id_obligatorio: bool):
+    """
+    Valida los datos de un hotel antes de cualquier trabajo de red.
+    Retorna el mensaje de error, o None si los datos son válidos.
+
+    Con id_obligatorio (actualización) 'Id' debe ser un entero positivo; sin él
+    (inserción) puede faltar o ser 0.
+    """
+    if not isinstance(hotel, dict):
+        return "Debe proporcionar los datos del hotel como diccionario."
+
+    hotel_id = hotel.get("Id", None if id_obligatorio else 0)
+    if type(hotel_id) is not int or hotel_id < (1 if id_obligatorio else 0):
+        return "El campo 'Id' del hotel debe ser un número entero válido."
+
+    nombre = hotel.get("Nombre")
+    if not isinstance(nombre, str) or not nombre.strip():
+        return "El campo 'Nombre' del hotel es obligatorio."
+    if _CARACTERES_NO_XML.search(nombre):
+        return "El campo 'Nombre' contiene caracteres no válidos."
+
+    for clave, tipo, es_fecha in _CAMPOS_OPCIONALES_HOTEL:
+        if clave not in hotel:
+            continue
+        valor = hotel[clave]
+        if type(valor) is not tipo:
+            return f"El campo '{clave}' del hotel debe ser de tipo {tipo.__name__}."
+        if es_fecha:
+            try:
+                datetime.fromisoformat(valor)
+            except ValueError:
+                return f"El campo '{clave}' debe ser una fecha ISO 8601 (AAAA-MM-DDTHH:MM:SS)."
+    return None
+
+
+def _xml(value) -> bytes:
+    """Texto de un campo listo para el envelope: escapado XML y codificado en UTF-8."""
+    return str(value).translate(_XML_ESCAPE).encode("utf-8")
+
+
+
+def _postSoap(soap_body: bytes, headers: dict, **kwargs):
+    """
+    POST del envelope a SOAP_URL midiendo su latencia (hasta recibir las
+    cabeceras de la respuesta). La operación se toma del SOAPAction.
+    """
+    operacion = headers["SOAPAction"].rpartition("/")[2]
+    resultado = "error"
+    inicio = time.perf_counter()
+    try:
+        response = _SESSION.post(SOAP_URL, data=soap_body, headers=headers, timeout=_TIMEOUT, **kwargs)
+        if response.status_code == 200:
+            resultado = "ok"
+        return response
+    finally:
+        duracion = time.perf_counter() - inicio
+        with _METRICAS_LOCK:
+            metrica = _METRICAS.get((operacion, resultado))
+            if metrica is None:
+                metrica = _METRICAS[(operacion, resultado)] = [0, 0.0, 0.0]
+            metrica[0] += 1
+            metrica[1] += duracion
+            metrica[2] = max(metrica[2], duracion)
+        logger.debug("SOAP %s (%s) en %.1f ms", operacion, resultado, duracion * 1000)
+
+
+def _postComprimible(soap_body: bytes, headers: dict):
+    """
+    POST de un envelope de escritura: comprimido con gzip sólo si
+    _GZIP_PETICIONES está activado y el envelope es grande; si no, tal cual.
+    """
+    if _GZIP_PETICIONES and len(soap_body) > _GZIP_DESDE:
+        response = _postSoap(gzip.compress(soap_body), {**headers, **_H_GZIP})
+        # 415: el servidor rechazó explícitamente la codificación, la escritura
+        # no se aplicó; se repite sólo esta petición sin comprimir.
+        if response.status_code != 415:
+            return response
+        logger.warning("El servicio rechazó un envelope gzip (HTTP 415); se envía sin comprimir.")
+    return _postSoap(soap_body, headers)
+
+
+def _iterarNodos(fuente, etiqueta: str, etiqueta_resultado: str, convertir, estado: dict):
+    """
+    Lee una respuesta SOAP de forma incremental y genera, uno a uno, los nodos
+    <etiqueta> hijos directos de <etiqueta_resultado> ya convertidos con
+    `convertir`. Cada nodo se libera antes de entregarse, así el árbol nunca
+    queda completo en memoria.
+
+    Un nodo que no se puede convertir se registra y se omite. Si aparece el
+    nodo resultado se marca estado["resultado"] = True.
+    """
+    nombre = etiqueta.rpartition("}")[2]
+    for _, nodo in etree.iterparse(
+        fuente,
+        events=("end",),
+        tag=(etiqueta, etiqueta_resultado),
+        huge_tree=False,
+        collect_ids=False,
+        remove_blank_text=True,
+        resolve_entities=False,
+    ):
+        if nodo.tag == etiqueta_resultado:
+            estado["resultado"] = True
+            continue
+
+        result_node = nodo.getparent()
+        if result_node is None or result_node.tag != etiqueta_resultado:
+            continue
+
+        try:
+            valor = convertir(nodo)
+        except ValueError as parse_err:
+            logger.warning("Error al procesar un nodo <%s>: %s", nombre, parse_err)
+            valor = None
+
+        # Liberar el nodo procesado y los hermanos ya consumidos
+        nodo.clear()
+        while nodo.getprevious() is not None:
+            del result_node[0]
+
+        if valor is not None:
+            yield valor
+
+# ======================================================
+# CACHÉS DE CONSULTAS Y BÚSQUEDAS
+# ======================================================
+def _leerConsulta(clave: tuple):
+    """Devuelve una copia del resultado cacheado si aún no expiró, o None."""
+    entrada = _CONSULTAS_CACHE.get(clave)
+    if entrada is None or time.monotonic() >= entrada[0]:
+        return None
+    return copy.deepcopy(entrada[1])
+
+
+def _generacionCache() -> int:
+    """Generación actual de las cachés; se lee antes de enviar la consulta."""
+    with _CONSULTAS_CACHE_LOCK:
+        return _CACHE_GENERACION
+
+
+def _guardarConsulta(clave: tuple, resultado: dict, generacion: int) -> None:
+    """
+    Guarda un resultado exitoso; al llegar al máximo descarta la entrada más
+    antigua. No guarda nada si la caché se invalidó después de `generacion`.
+    """
+    with _CONSULTAS_CACHE_LOCK:
+        if generacion != _CACHE_GENERACION:
+            return
+        if clave not in _CONSULTAS_CACHE and len(_CONSULTAS_CACHE) >= _CONSULTAS_CACHE_MAX:
+            _CONSULTAS_CACHE.pop(next(iter(_CONSULTAS_CACHE)))
+        _CONSULTAS_CACHE[clave] = (time.monotonic() + _CONSULTAS_CACHE_TTL, copy.deepcopy(resultado))
+
+
+def _leerBusqueda(clave: str):
+    """Hoteles cacheados para la búsqueda (copias de cada dict), o None si no hay o vencieron."""
+    cacheado = _BUSQUEDA_CACHE.get(clave)
+    if cacheado is None or time.monotonic() - cacheado[0] >= _BUSQUEDA_CACHE_TTL:
+        return None
+    return [dict(hotel) for hotel in cacheado[1]]
+
+
+def _guardarBusqueda(clave: str, hoteles: list, generacion: int) -> None:
+    """
+    Guarda el resultado de una búsqueda; si la caché está llena descarta la
+    entrada más antigua. Igual que _guardarConsulta, descarta resultados de
+    una generación anterior.
+    """
+    with _BUSQUEDA_CACHE_LOCK:
+        if generacion != _CACHE_GENERACION:
+            return
+        _BUSQUEDA_CACHE.pop(clave, None)
+        if len(_BUSQUEDA_CACHE) >= _BUSQUEDA_CACHE_MAX:
+            del _BUSQUEDA_CACHE[next(iter(_BUSQUEDA_CACHE))]
+        _BUSQUEDA_CACHE[clave] = (time.monotonic(), tuple(dict(hotel) for hotel in hoteles))
+
+
+def _invalidarCache() -> None:
+    """
+    Descarta consultas y búsquedas cacheadas (tras insertar, actualizar o
+    eliminar), junto con el catálogo de hoteles que cachea el servicio de
+    integración. Las consultas en vuelo dejan de compartirse: quien llegue
+    después hace su propia llamada.
+    """
+    global _CACHE_GENERACION
+    with _CONSULTAS_CACHE_LOCK:
+        _CACHE_GENERACION += 1
+        _CONSULTAS_CACHE.clear()
+    with _BUSQUEDA_CACHE_LOCK:
+        _BUSQUEDA_CACHE.clear()
+    _EN_VUELO.olvidar()
+    _integracion.invalidarCache()
 
 
 # ======================================================
@@ -38,83 +436,66 @@ def actualizarHotel(hotel: dict) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Actualizando hotel con ID={hotel.get('Id')} en WS_GestionHotel")
+    # ======================================================
+    # Validación de campos (sin llamada de red)
+    # ======================================================
+    error = _validarHotel(hotel, id_obligatorio=True)
+    if error:
+        return {"error": error}
 
-        # ======================================================
-        # Validación de campos obligatorios
-        # ======================================================
-        if "Id" not in hotel or not isinstance(hotel["Id"], int) or hotel["Id"] <= 0:
-            return {"error": "El campo 'Id' del hotel es obligatorio y debe ser un número entero válido."}
+    logger.info("Actualizando hotel con ID=%s en WS_GestionHotel", hotel['Id'])
 
-        if "Nombre" not in hotel or not hotel["Nombre"]:
-            return {"error": "El campo 'Nombre' es obligatorio para actualizar un hotel."}
+    try:
 
         # Fechas por defecto
-        fecha_registro = hotel.get("FechaRegistro", datetime.now().isoformat())
-        ultima_fecha_cambio = hotel.get("UltimaFechaCambio", datetime.now().isoformat())
-        es_activo = str(hotel.get("EsActivo", True)).lower()
+        ahora = time.strftime(_FORMATO_FECHA)
+        fecha_registro = hotel.get("FechaRegistro", ahora)
+        ultima_fecha_cambio = hotel.get("UltimaFechaCambio", ahora)
+        es_activo = _BOOL_XML[hotel.get("EsActivo", True)]
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-          <soapenv:Header/>
-          <soapenv:Body>
-            <tem:actualizarHotel>
-              <tem:hotelEditado>
-                <tem:Id>{hotel["Id"]}</tem:Id>
-                <tem:Nombre>{hotel["Nombre"]}</tem:Nombre>
-                <tem:FechaRegistro>{fecha_registro}</tem:FechaRegistro>
-                <tem:UltimaFechaCambio>{ultima_fecha_cambio}</tem:UltimaFechaCambio>
-                <tem:EsActivo>{es_activo}</tem:EsActivo>
-              </tem:hotelEditado>
-            </tem:actualizarHotel>
-          </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/actualizarHotel",
-        }
+        soap_body = _ENV_ACTUALIZAR_HOTEL % (
+            hotel["Id"],
+            _xml(hotel["Nombre"]),
+            _xml(fecha_registro),
+            _xml(ultima_fecha_cambio),
+            es_activo,
+        )
+
+        headers = _H_ACTUALIZAR_HOTEL
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _postComprimible(soap_body, headers)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parseo de la respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
+        texto = _soap.textoResultado(response.content, _TEM_ACTUALIZAR_HOTEL_RESULT)
 
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:actualizarHotelResult", ns)
-
-        if result_node is None:
+        if texto is None:
             logger.warning("No se encontró el nodo 'actualizarHotelResult' en la respuesta SOAP.")
             return {"exito": False, "mensaje": "No se pudo determinar si la actualización fue exitosa."}
 
-        resultado = result_node.text.strip().lower() == "true"
+        resultado = texto.lower() == "true"
 
         if resultado:
-            logger.info(f"Hotel con ID={hotel['Id']} actualizado correctamente.")
+            logger.info("Hotel con ID=%s actualizado correctamente.", hotel['Id'])
+            _invalidarCache()
             return {"exito": True, "mensaje": f"Hotel '{hotel['Nombre']}' actualizado exitosamente."}
         else:
-            logger.warning(f"No se logró actualizar el hotel con ID={hotel['Id']}.")
+            logger.warning("No se logró actualizar el hotel con ID=%s.", hotel['Id'])
             return {"exito": False, "mensaje": "No se pudo actualizar el hotel."}
 
-    except Exception as ex:
-        logger.error(f"Error en actualizarHotel(): {ex}")
+    except _ERRORES_SOAP as ex:
+        logger.error("Error en actualizarHotel(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -144,54 +525,62 @@ def buscarHotelPorNombre(nombre: str) -> dict:
             }
         o en caso de error:
             {"error": str, "detalle"?: str}
+
+    Las búsquedas de menos de _BUSQUEDA_MIN_CARACTERES caracteres no llegan al
+    servicio, y las repetidas (sin distinguir mayúsculas) se sirven desde
+    memoria durante _BUSQUEDA_CACHE_TTL segundos.
     """
-    try:
-        logger.info(f"Buscando hoteles con nombre que contenga: '{nombre}'")
+    # ======================================================
+    # Validación del parámetro (sin llamada de red)
+    # ======================================================
+    if not nombre or not isinstance(nombre, str):
+        return {"error": "El parámetro 'nombre' es obligatorio y debe ser una cadena de texto."}
+
+    nombre = nombre.strip()
+    if len(nombre) < _BUSQUEDA_MIN_CARACTERES:
+        return {"exito": True, "hoteles": [], "mensaje": "Consulta demasiado corta."}
+
+    if _CARACTERES_NO_XML.search(nombre):
+        return {"error": "El parámetro 'nombre' contiene caracteres no válidos."}
+
+    clave = nombre.lower()
+    hoteles = _leerBusqueda(clave)
+    if hoteles is not None:
+        if not hoteles:
+            return {"exito": True, "hoteles": [], "mensaje": "No se encontraron hoteles con ese nombre."}
+        return {"exito": True, "hoteles": hoteles, "mensaje": "Hoteles encontrados correctamente."}
 
-        # ======================================================
-        # Validación del parámetro
-        # ======================================================
-        if not nombre or not isinstance(nombre, str):
-            return {"error": "El parámetro 'nombre' es obligatorio y debe ser una cadena de texto."}
+    logger.info("Buscando hoteles con nombre que contenga: '%s'", nombre)
+
+    try:
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:buscarHotelPorNombre>
-                 <tem:nombre>{nombre}</tem:nombre>
-              </tem:buscarHotelPorNombre>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/buscarHotelPorNombre",
-        }
+        soap_body = _ENV_BUSCAR_HOTEL_POR_NOMBRE % _xml(nombre)
+
+        headers = _H_BUSCAR_HOTEL_POR_NOMBRE
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        # Con stream=True el parser lee el cuerpo del socket a medida que llega,
+        # sin esperar a tener la respuesta completa en memoria
+        generacion = _generacionCache()
+        response = _postSoap(soap_body, headers, stream=True)
 
-        if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+        with response:
+            if response.status_code != 200:
+                logger.error("HTTP %s: %s", response.status_code, response.text)
+                return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        # ======================================================
-        # Parseo de la respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
+            # ======================================================
+            # Parseo de la respuesta XML
+            # ======================================================
+            response.raw.decode_content = True
+            root = etree.parse(response.raw).getroot()
 
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:buscarHotelPorNombreResult", ns)
+        result_node = root.find(_PATH_BUSCAR_HOTEL_POR_NOMBRE_RESULT)
 
         if result_node is None:
             logger.warning("No se encontró el nodo 'buscarHotelPorNombreResult' en la respuesta SOAP.")
@@ -201,26 +590,22 @@ def buscarHotelPorNombre(nombre: str) -> dict:
         # Recorrer las etiquetas <Hotel> y construir la lista
         # ======================================================
         hoteles = []
-        for hotel_node in result_node.findall("tem:Hotel", ns):
-            hotel = {
-                "Id": int(hotel_node.findtext("tem:Id", default="0", namespaces=ns)),
-                "Nombre": hotel_node.findtext("tem:Nombre", default="", namespaces=ns),
-                "FechaRegistro": hotel_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                "UltimaFechaCambio": hotel_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-                "EsActivo": hotel_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-            }
+        for hotel_node in result_node.iterchildren(_TEM_HOTEL):
+            hotel = _hotelDesdeNodo(hotel_node)
             if hotel["Id"] > 0:
                 hoteles.append(hotel)
 
+        _guardarBusqueda(clave, hoteles, generacion)
+
         if not hoteles:
             logger.info("No se encontraron hoteles que coincidan con el nombre proporcionado.")
             return {"exito": True, "hoteles": [], "mensaje": "No se encontraron hoteles con ese nombre."}
 
-        logger.info(f"Se encontraron {len(hoteles)} hoteles coincidentes con '{nombre}'.")
+        logger.info("Se encontraron %s hoteles coincidentes con '%s'.", len(hoteles), nombre)
         return {"exito": True, "hoteles": hoteles, "mensaje": "Hoteles encontrados correctamente."}
 
-    except Exception as ex:
-        logger.error(f"Error en buscarHotelPorNombre(): {ex}")
+    except _ERRORES_SOAP as ex:
+        logger.error("Error en buscarHotelPorNombre(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -242,69 +627,53 @@ def eliminarHotel(hotel_id: int) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Solicitando eliminación (soft delete) del hotel con ID={hotel_id}")
+    # ======================================================
+    # Validación de parámetros (sin llamada de red)
+    # ======================================================
+    if not isinstance(hotel_id, int) or hotel_id <= 0:
+        return {"error": "El parámetro 'hotel_id' debe ser un número entero positivo."}
 
-        # ======================================================
-        # Validación de parámetros
-        # ======================================================
-        if not isinstance(hotel_id, int) or hotel_id <= 0:
-            return {"error": "El parámetro 'hotel_id' debe ser un número entero positivo."}
+    logger.info("Solicitando eliminación (soft delete) del hotel con ID=%s", hotel_id)
+
+    try:
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:eliminarHotel>
-                 <tem:id>{hotel_id}</tem:id>
-              </tem:eliminarHotel>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/eliminarHotel",
-        }
+        soap_body = _ENV_ELIMINAR_HOTEL % hotel_id
+        headers = _H_ELIMINAR_HOTEL
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _postSoap(soap_body, headers)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parseo de la respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:eliminarHotelResult", ns)
+        root = etree.fromstring(response.content)
+        result_node = root.find(_PATH_ELIMINAR_HOTEL_RESULT)
 
         if result_node is None:
             logger.warning("No se encontró el nodo 'eliminarHotelResult' en la respuesta SOAP.")
             return {"exito": False, "mensaje": "No se pudo determinar si la eliminación fue exitosa."}
 
-        resultado = result_node.text.strip().lower() == "true"
+        resultado = (result_node.text or "").strip().lower() == "true"
 
         if resultado:
-            logger.info(f"Hotel con ID={hotel_id} eliminado (soft delete) correctamente.")
+            logger.info("Hotel con ID=%s eliminado (soft delete) correctamente.", hotel_id)
+            _invalidarCache()
             return {"exito": True, "mensaje": f"Hotel con ID={hotel_id} eliminado correctamente."}
         else:
-            logger.warning(f"No se logró eliminar el hotel con ID={hotel_id}.")
+            logger.warning("No se logró eliminar el hotel con ID=%s.", hotel_id)
             return {"exito": False, "mensaje": "No se pudo eliminar el hotel."}
 
-    except Exception as ex:
-        logger.error(f"Error en eliminarHotel(): {ex}")
+    except _ERRORES_SOAP as ex:
+        logger.error("Error en eliminarHotel(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
@@ -334,90 +703,104 @@ def insertarHotel(hotel: dict) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
+    # ======================================================
+    # Validación de campos (sin llamada de red)
+    # ======================================================
+    error = _validarHotel(hotel, id_obligatorio=False)
+    if error:
+        return {"error": error}
 
-    try:
-        logger.info(f"Insertando nuevo hotel: {hotel.get('Nombre')}")
+    logger.info("Insertando nuevo hotel: %s", hotel['Nombre'])
 
-        # ======================================================
-        # Validación de parámetros obligatorios
-        # ======================================================
-        if not hotel.get("Nombre"):
-            return {"error": "El campo 'Nombre' del hotel es obligatorio."}
+    try:
 
         # ======================================================
         # Asignar valores por defecto
         # ======================================================
-        fecha_actual = datetime.now().isoformat()
+        fecha_actual = time.strftime(_FORMATO_FECHA)
         fecha_registro = hotel.get("FechaRegistro", fecha_actual)
         ultima_fecha_cambio = hotel.get("UltimaFechaCambio", fecha_actual)
-        es_activo = str(hotel.get("EsActivo", True)).lower()
+        es_activo = _BOOL_XML[hotel.get("EsActivo", True)]
         hotel_id = hotel.get("Id", 0)
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:insertarHotel>
-                 <tem:nuevoHotel>
-                    <tem:Id>{hotel_id}</tem:Id>
-                    <tem:Nombre>{hotel["Nombre"]}</tem:Nombre>
-                    <tem:FechaRegistro>{fecha_registro}</tem:FechaRegistro>
-                    <tem:UltimaFechaCambio>{ultima_fecha_cambio}</tem:UltimaFechaCambio>
-                    <tem:EsActivo>{es_activo}</tem:EsActivo>
-                 </tem:nuevoHotel>
-              </tem:insertarHotel>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/insertarHotel",
-        }
+        # Los textos se escapan (&, <, >, ") antes de insertarlos en el XML
+        soap_body = _ENV_INSERTAR_HOTEL % (
+            hotel_id,
+            _xml(hotel["Nombre"]),
+            _xml(fecha_registro),
+            _xml(ultima_fecha_cambio),
+            es_activo,
+        )
+        headers = _H_INSERTAR_HOTEL
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _postComprimible(soap_body, headers)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parseo de la respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:insertarHotelResult", ns)
+        root = etree.fromstring(response.content)
+        result_node = root.find(_PATH_INSERTAR_HOTEL_RESULT)
 
         if result_node is None:
             logger.warning("No se encontró el nodo 'insertarHotelResult' en la respuesta SOAP.")
             return {"exito": False, "id_hotel": None, "mensaje": "No se pudo obtener el ID del hotel insertado."}
 
-        nuevo_id = int(result_node.text.strip())
+        nuevo_id = int((result_node.text or "").strip())
 
         if nuevo_id > 0:
-            logger.info(f"Hotel insertado exitosamente con ID={nuevo_id}")
+            logger.info("Hotel insertado exitosamente con ID=%s", nuevo_id)
+            _invalidarCache()
             return {"exito": True, "id_hotel": nuevo_id, "mensaje": f"Hotel '{hotel['Nombre']}' insertado correctamente."}
         else:
             logger.warning("El servicio no devolvió un ID válido.")
             return {"exito": False, "id_hotel": None, "mensaje": "No se pudo insertar el hotel."}
 
-    except Exception as ex:
-        logger.error(f"Error en insertarHotel(): {ex}")
+    except _ERRORES_SOAP as ex:
+        logger.error("Error en insertarHotel(): %s", ex)
         return {"error": str(ex)}
 
+def _espacioDesdeNodo(espacio_node) -> dict:
+    """
+    Convierte un nodo <Espacios> en dict con una sola pasada por sus hijos.
+    Los campos ausentes toman su valor por defecto; un valor no convertible
+    lanza la excepción del conversor (el nodo se descarta).
+    """
+    espacio = dict(_DEFECTOS_ESPACIO_HOTEL)
+    anidados = {}
+    for hijo in espacio_node:
+        campo = _CONVERSORES_ESPACIO_HOTEL.get(hijo.tag)
+        if campo is not None:
+            clave, conversor = campo
+            espacio[clave] = conversor(hijo.text or "")
+            continue
+        clave = _TEM_ANIDADOS_ESPACIO_HOTEL.get(hijo.tag)
+        if clave is not None:
+            anidados[clave] = {
+                "Id": int(hijo.findtext(_TEM_ID, default="0")),
+                "Nombre": hijo.findtext(_TEM_NOMBRE, default=""),
+            }
+
+    # Agregar subnodos Hotel / TipoServicio / TipoAlimentacion (si existen)
+    for clave in _ANIDADOS_ESPACIO_HOTEL:
+        if clave in anidados:
+            espacio[clave] = anidados[clave]
+    return espacio
+
+
 # ======================================================
 # FUNCIÓN: obtenerEspaciosDelHotel
 # ======================================================
+@_EN_VUELO.compartir
 def obtenerEspaciosDelHotel(hotel_id: int) -> dict:
     """
     Obtiene los espacios asociados a un hotel específico usando WS_GestionHotel.asmx.
@@ -435,128 +818,65 @@ def obtenerEspaciosDelHotel(hotel_id: int) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Consultando espacios del hotel con ID={hotel_id}")
+    # ======================================================
+    # Validación del parámetro (sin llamada de red)
+    # ======================================================
+    if not isinstance(hotel_id, int) or hotel_id <= 0:
+        return {"error": "El parámetro 'hotel_id' debe ser un número entero positivo."}
 
-        # ======================================================
-        # Validación del parámetro
-        # ======================================================
-        if not isinstance(hotel_id, int) or hotel_id <= 0:
-            return {"error": "El parámetro 'hotel_id' debe ser un número entero positivo."}
+    logger.info("Consultando espacios del hotel con ID=%s", hotel_id)
+
+    try:
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:obtenerEspaciosDelHotel>
-                 <tem:hotelId>{hotel_id}</tem:hotelId>
-              </tem:obtenerEspaciosDelHotel>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/obtenerEspaciosDelHotel",
-        }
+        soap_body = _ENV_OBTENER_ESPACIOS_DEL_HOTEL % hotel_id
+        headers = _H_OBTENER_ESPACIOS_DEL_HOTEL
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
-
-        if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
-
-        # ======================================================
-        # Parseo de la respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:obtenerEspaciosDelHotelResult", ns)
-
-        if result_node is None:
-            logger.warning("No se encontró el nodo 'obtenerEspaciosDelHotelResult' en la respuesta SOAP.")
-            return {"exito": False, "espacios": [], "mensaje": "No se encontraron espacios."}
-
-        # ======================================================
-        # Recorrer los nodos <Espacios>
-        # ======================================================
-        espacios = []
-        for espacio_node in result_node.findall("tem:Espacios", ns):
-            try:
-                espacio = {
-                    "Id": int(espacio_node.findtext("tem:Id", default="0", namespaces=ns)),
-                    "HotelId": int(espacio_node.findtext("tem:HotelId", default="0", namespaces=ns)),
-                    "TipoServicioId": int(espacio_node.findtext("tem:TipoServicioId", default="0", namespaces=ns)),
-                    "TipoAlimentacionId": int(espacio_node.findtext("tem:TipoAlimentacionId", default="0", namespaces=ns)),
-                    "Nombre": espacio_node.findtext("tem:Nombre", default="", namespaces=ns),
-                    "Moneda": espacio_node.findtext("tem:Moneda", default="", namespaces=ns),
-                    "CostoDiario": float(espacio_node.findtext("tem:CostoDiario", default="0", namespaces=ns)),
-                    "CapacidadAdultos": int(espacio_node.findtext("tem:CapacidadAdultos", default="0", namespaces=ns)),
-                    "CapacidadNinios": int(espacio_node.findtext("tem:CapacidadNinios", default="0", namespaces=ns)),
-                    "Habitaciones": int(espacio_node.findtext("tem:Habitaciones", default="0", namespaces=ns)),
-                    "Parqueaderos": int(espacio_node.findtext("tem:Parqueaderos", default="0", namespaces=ns)),
-                    "DimensionesDelLugar": int(espacio_node.findtext("tem:DimensionesDelLugar", default="0", namespaces=ns)),
-                    "DescripcionDelLugar": espacio_node.findtext("tem:DescripcionDelLugar", default="", namespaces=ns),
-                    "Puntuacion": int(espacio_node.findtext("tem:Puntuacion", default="0", namespaces=ns)),
-                    "Ubicacion": espacio_node.findtext("tem:Ubicacion", default="", namespaces=ns),
-                    "MinutosRetencion": int(espacio_node.findtext("tem:MinutosRetencion", default="0", namespaces=ns)),
-                    "ExpiraEn": espacio_node.findtext("tem:ExpiraEn", default="", namespaces=ns),
-                    "EsBloqueada": espacio_node.findtext("tem:EsBloqueada", default="false", namespaces=ns).lower() == "true",
-                    "FechaRegistro": espacio_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                    "UltimaFechaCambio": espacio_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-                    "EsActivo": espacio_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-                }
-
-                # Agregar subnodos Hotel / TipoServicio / TipoAlimentacion (si existen)
-                hotel_sub = espacio_node.find("tem:Hotel", ns)
-                if hotel_sub is not None:
-                    espacio["Hotel"] = {
-                        "Id": int(hotel_sub.findtext("tem:Id", default="0", namespaces=ns)),
-                        "Nombre": hotel_sub.findtext("tem:Nombre", default="", namespaces=ns),
-                    }
-
-                tipo_servicio_sub = espacio_node.find("tem:TipoServicio", ns)
-                if tipo_servicio_sub is not None:
-                    espacio["TipoServicio"] = {
-                        "Id": int(tipo_servicio_sub.findtext("tem:Id", default="0", namespaces=ns)),
-                        "Nombre": tipo_servicio_sub.findtext("tem:Nombre", default="", namespaces=ns),
-                    }
-
-                tipo_alim_sub = espacio_node.find("tem:TipoAlimentacion", ns)
-                if tipo_alim_sub is not None:
-                    espacio["TipoAlimentacion"] = {
-                        "Id": int(tipo_alim_sub.findtext("tem:Id", default="0", namespaces=ns)),
-                        "Nombre": tipo_alim_sub.findtext("tem:Nombre", default="", namespaces=ns),
-                    }
-
-                espacios.append(espacio)
-            except Exception as parse_err:
-                logger.warning(f"Error al procesar un nodo <Espacios>: {parse_err}")
+        # Con stream=True el parser lee el cuerpo del socket a medida que llega,
+        # sin esperar a tener la respuesta completa en memoria
+        response = _postSoap(soap_body, headers, stream=True)
+
+        with response:
+            if response.status_code != 200:
+                logger.error("HTTP %s: %s", response.status_code, response.text)
+                return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+
+            # ======================================================
+            # Parseo de la respuesta XML
+            # ======================================================
+            # Lectura incremental: cada <Espacios> hijo directo del resultado se
+            # convierte en dict al cerrarse y se libera de inmediato, sin
+            # mantener el árbol completo en memoria.
+            response.raw.decode_content = True
+            estado = {"resultado": False}
+            espacios = list(_iterarNodos(
+                response.raw, _TEM_ESPACIOS, _TEM_OBTENER_ESPACIOS_DEL_HOTEL_RESULT, _espacioDesdeNodo, estado
+            ))
+
+            if not estado["resultado"]:
+                logger.warning("No se encontró el nodo 'obtenerEspaciosDelHotelResult' en la respuesta SOAP.")
+                return {"exito": False, "espacios": [], "mensaje": "No se encontraron espacios."}
 
         if not espacios:
-            logger.info(f"No se encontraron espacios asociados al hotel con ID={hotel_id}.")
+            logger.info("No se encontraron espacios asociados al hotel con ID=%s.", hotel_id)
             return {"exito": True, "espacios": [], "mensaje": "El hotel no tiene espacios registrados."}
 
-        logger.info(f"Se encontraron {len(espacios)} espacios para el hotel con ID={hotel_id}.")
+        logger.info("Se encontraron %s espacios para el hotel con ID=%s.", len(espacios), hotel_id)
         return {"exito": True, "espacios": espacios, "mensaje": "Espacios obtenidos correctamente."}
 
-    except Exception as ex:
-        logger.error(f"Error en obtenerEspaciosDelHotel(): {ex}")
+    except _ERRORES_SOAP as ex:
+        logger.error("Error en obtenerEspaciosDelHotel(): %s", ex)
         return {"error": str(ex)}
 
 # ======================================================
 # FUNCIÓN: seleccionarHotelPorId
 # ======================================================
+@_EN_VUELO.compartir
 def seleccionarHotelPorId(hotel_id: int) -> dict:
     """
     Obtiene un hotel específico por su ID usando WS_GestionHotel.asmx.
@@ -574,53 +894,41 @@ def seleccionarHotelPorId(hotel_id: int) -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
-    try:
-        logger.info(f"Consultando hotel con ID={hotel_id}")
+    # ======================================================
+    # Validación del parámetro (sin llamada de red)
+    # ======================================================
+    if not isinstance(hotel_id, int) or hotel_id <= 0:
+        return {"error": "El parámetro 'hotel_id' debe ser un número entero positivo."}
 
-        # ======================================================
-        # Validación del parámetro
-        # ======================================================
-        if not isinstance(hotel_id, int) or hotel_id <= 0:
-            return {"error": "El parámetro 'hotel_id' debe ser un número entero positivo."}
+    logger.info("Consultando hotel con ID=%s", hotel_id)
 
+    clave = ("seleccionarHotelPorId", hotel_id)
+    cacheado = _leerConsulta(clave)
+    if cacheado is not None:
+        return cacheado
+
+    try:
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:seleccionarHotelPorId>
-                 <tem:id>{hotel_id}</tem:id>
-              </tem:seleccionarHotelPorId>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/seleccionarHotelPorId",
-        }
+        soap_body = _ENV_SELECCIONAR_HOTEL_POR_ID % hotel_id
+        headers = _H_SELECCIONAR_HOTEL_POR_ID
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        generacion = _generacionCache()
+        response = _postSoap(soap_body, headers)
 
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
+            logger.error("HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
         # ======================================================
         # Parseo de la respuesta XML
         # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
-
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:seleccionarHotelPorIdResult", ns)
+        root = etree.fromstring(response.content)
+        result_node = root.find(_PATH_SELECCIONAR_HOTEL_POR_ID_RESULT)
 
         if result_node is None:
             logger.warning("No se encontró el nodo 'seleccionarHotelPorIdResult' en la respuesta SOAP.")
@@ -629,25 +937,22 @@ def seleccionarHotelPorId(hotel_id: int) -> dict:
         # ======================================================
         # Extraer datos del hotel
         # ======================================================
-        hotel = {
-            "Id": int(result_node.findtext("tem:Id", default="0", namespaces=ns)),
-            "Nombre": result_node.findtext("tem:Nombre", default="", namespaces=ns),
-            "FechaRegistro": result_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-            "UltimaFechaCambio": result_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-            "EsActivo": result_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-        }
+        hotel = _hotelDesdeNodo(result_node)
 
-        logger.info(f"Hotel obtenido correctamente: {hotel['Nombre']}")
-        return {"exito": True, "hotel": hotel, "mensaje": "Hotel obtenido correctamente."}
+        logger.info("Hotel obtenido correctamente: %s", hotel['Nombre'])
+        resultado = {"exito": True, "hotel": hotel, "mensaje": "Hotel obtenido correctamente."}
+        _guardarConsulta(clave, resultado, generacion)
+        return resultado
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarHotelPorId(): {ex}")
+    except _ERRORES_SOAP as ex:
+        logger.error("Error en seleccionarHotelPorId(): %s", ex)
         return {"error": str(ex)}
 
 
 # ======================================================
 # FUNCIÓN: seleccionarHoteles
 # ======================================================
+@_EN_VUELO.compartir
 def seleccionarHoteles() -> dict:
     """
     Obtiene todos los hoteles activos usando WS_GestionHotel.asmx.
@@ -662,74 +967,214 @@ def seleccionarHoteles() -> dict:
         o en caso de error:
             {"error": str, "detalle"?: str}
     """
+    cacheado = _leerConsulta(("seleccionarHoteles",))
+    if cacheado is not None:
+        return cacheado
+
+    logger.info("Consultando todos los hoteles activos...")
+
     try:
-        logger.info("Consultando todos los hoteles activos...")
 
         # ======================================================
         # Construcción del envelope SOAP (SOAP 1.1)
         # ======================================================
-        soap_body = """<?xml version="1.0" encoding="utf-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-                          xmlns:tem="http://tempuri.org/">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <tem:seleccionarHoteles/>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
-
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": "http://tempuri.org/seleccionarHoteles",
-        }
+        soap_body = _ENV_SELECCIONAR_HOTELES
+        headers = _H_SELECCIONAR_HOTELES
 
         # ======================================================
         # Envío de la solicitud SOAP
         # ======================================================
-        response = requests.post(SOAP_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        generacion = _generacionCache()
+        response = _postSoap(soap_body, headers, stream=True)
 
+        with response:
+            if response.status_code != 200:
+                logger.error("HTTP %s: %s", response.status_code, response.text)
+                return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+
+            # ======================================================
+            # Parseo de la respuesta XML (nodos <Hotel> uno a uno)
+            # ======================================================
+            response.raw.decode_content = True
+            estado = {"resultado": False}
+            hoteles = list(_iterarNodos(
+                response.raw, _TEM_HOTEL, _TEM_SELECCIONAR_HOTELES_RESULT, _hotelDesdeNodo, estado
+            ))
+
+            if not estado["resultado"]:
+                logger.warning("No se encontró el nodo 'seleccionarHotelesResult' en la respuesta SOAP.")
+                return {"exito": False, "hoteles": [], "mensaje": "No se encontraron hoteles activos."}
+
+        if not hoteles:
+            logger.info("No se encontraron hoteles activos en la respuesta.")
+            resultado = {"exito": True, "hoteles": [], "mensaje": "No hay hoteles registrados o activos."}
+        else:
+            logger.info("Se encontraron %s hoteles activos.", len(hoteles))
+            resultado = {"exito": True, "hoteles": hoteles, "mensaje": "Hoteles obtenidos correctamente."}
+
+        _guardarConsulta(("seleccionarHoteles",), resultado, generacion)
+        return resultado
+
+    except _ERRORES_SOAP as ex:
+        logger.error("Error en seleccionarHoteles(): %s", ex)
+        return {"error": str(ex)}
+
+
+# ======================================================
+# VARIANTES GENERADORAS
+# ======================================================
+# Entregan los registros a medida que llegan del socket, para quien solo los
+# recorre una vez (p. ej. un StreamingHttpResponse). Un generador no puede
+# devolver el dict de error: los fallos se lanzan como excepción.
+def obtenerEspaciosDelHotel_iter(hotel_id: int):
+    """
+    Versión generadora de obtenerEspaciosDelHotel(): produce cada espacio (dict)
+    sin construir la lista completa.
+
+    Lanza:
+        ValueError: si 'hotel_id' no es un entero positivo.
+        requests.HTTPError: si el servicio no responde HTTP 200.
+    """
+    if not isinstance(hotel_id, int) or hotel_id <= 0:
+        raise ValueError("El parámetro 'hotel_id' debe ser un número entero positivo.")
+
+    logger.info("Consultando espacios del hotel con ID=%s (generador)", hotel_id)
+    response = _postSoap(_ENV_OBTENER_ESPACIOS_DEL_HOTEL % hotel_id, _H_OBTENER_ESPACIOS_DEL_HOTEL, stream=True)
+    with response:
         if response.status_code != 200:
-            logger.error(f"HTTP {response.status_code}: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "detalle": response.text}
+            logger.error("HTTP %s: %s", response.status_code, response.text)
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
 
-        # ======================================================
-        # Parseo de la respuesta XML
-        # ======================================================
-        ns = {
-            "soap": "http://schemas.xmlsoap.org/soap/envelope/",
-            "tem": "http://tempuri.org/",
-        }
+        response.raw.decode_content = True
+        yield from _iterarNodos(
+            response.raw, _TEM_ESPACIOS, _TEM_OBTENER_ESPACIOS_DEL_HOTEL_RESULT, _espacioDesdeNodo, {}
+        )
 
-        root = ET.fromstring(response.text)
-        result_node = root.find(".//tem:seleccionarHotelesResult", ns)
 
-        if result_node is None:
-            logger.warning("No se encontró el nodo 'seleccionarHotelesResult' en la respuesta SOAP.")
-            return {"exito": False, "hoteles": [], "mensaje": "No se encontraron hoteles activos."}
+def seleccionarHoteles_iter():
+    """
+    Versión generadora de seleccionarHoteles(): produce cada hotel (dict) sin
+    construir la lista completa. Si el listado está en caché se recorre de ahí.
 
-        # ======================================================
-        # Recorrer los nodos <Hotel>
-        # ======================================================
-        hoteles = []
-        for hotel_node in result_node.findall("tem:Hotel", ns):
-            try:
-                hotel = {
-                    "Id": int(hotel_node.findtext("tem:Id", default="0", namespaces=ns)),
-                    "Nombre": hotel_node.findtext("tem:Nombre", default="", namespaces=ns),
-                    "FechaRegistro": hotel_node.findtext("tem:FechaRegistro", default="", namespaces=ns),
-                    "UltimaFechaCambio": hotel_node.findtext("tem:UltimaFechaCambio", default="", namespaces=ns),
-                    "EsActivo": hotel_node.findtext("tem:EsActivo", default="false", namespaces=ns).lower() == "true",
-                }
-                hoteles.append(hotel)
-            except Exception as parse_err:
-                logger.warning(f"Error al procesar un nodo <Hotel>: {parse_err}")
+    Lanza:
+        requests.HTTPError: si el servicio no responde HTTP 200.
+    """
+    cacheado = _leerConsulta(("seleccionarHoteles",))
+    if cacheado is not None and cacheado.get("exito"):
+        yield from cacheado["hoteles"]
+        return
+
+    logger.info("Consultando todos los hoteles activos... (generador)")
+    response = _postSoap(_ENV_SELECCIONAR_HOTELES, _H_SELECCIONAR_HOTELES, stream=True)
+    with response:
+        if response.status_code != 200:
+            logger.error("HTTP %s: %s", response.status_code, response.text)
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
 
-        if not hoteles:
-            logger.info("No se encontraron hoteles activos en la respuesta.")
-            return {"exito": True, "hoteles": [], "mensaje": "No hay hoteles registrados o activos."}
+        response.raw.decode_content = True
+        yield from _iterarNodos(
+            response.raw, _TEM_HOTEL, _TEM_SELECCIONAR_HOTELES_RESULT, _hotelDesdeNodo, {}
+        )
+
+
+# ======================================================
+# FUNCIONES EN LOTE: obtenerEspaciosDelHotel
+# ======================================================
+def obtenerEspaciosDeHoteles(hotel_ids: list) -> dict:
+    """
+    Obtiene los espacios de varios hoteles en una sola operación.
+
+    Las llamadas se lanzan en paralelo sobre el pool de _SESSION (ver
+    obtenerEspaciosDeHoteles_async), así que el tiempo total es el de la más
+    lenta y no la suma de todas.
+
+    Parámetros:
+        hotel_ids (list[int]): IDs de los hoteles a consultar (los repetidos se consultan una vez).
+
+    Retorna:
+        dict: {hotel_id: resultado de obtenerEspaciosDelHotel(hotel_id), ...}
+        en el orden de entrada. Un fallo en un hotel no afecta a los demás; su
+        valor contiene {"error": str}.
+    """
+    if not hotel_ids:
+        return {}
+    return _soap.ejecutar(obtenerEspaciosDeHoteles_async(hotel_ids))
+
+
+# ======================================================
+# VARIANTES ASÍNCRONAS
+# ======================================================
+# Ejecutan la función síncrona en un hilo del executor por defecto, de modo
+# que varias llamadas lanzadas con asyncio.gather comparten el pool de _SESSION.
+async def actualizarHotel_async(hotel: dict) -> dict:
+    """Versión asíncrona de actualizarHotel()."""
+    return await asyncio.to_thread(actualizarHotel, hotel)
 
-        logger.info(f"Se encontraron {len(hoteles)} hoteles activos.")
-        return {"exito": True, "hoteles": hoteles, "mensaje": "Hoteles obtenidos correctamente."}
 
-    except Exception as ex:
-        logger.error(f"Error en seleccionarHoteles(): {ex}")
-        return {"error": str(ex)}
\ No newline at end of file
+async def buscarHotelPorNombre_async(nombre: str) -> dict:
+    """Versión asíncrona de buscarHotelPorNombre()."""
+    return await asyncio.to_thread(buscarHotelPorNombre, nombre)
+
+
+async def eliminarHotel_async(hotel_id: int) -> dict:
+    """Versión asíncrona de eliminarHotel()."""
+    return await asyncio.to_thread(eliminarHotel, hotel_id)
+
+
+async def insertarHotel_async(hotel: dict) -> dict:
+    """Versión asíncrona de insertarHotel()."""
+    return await asyncio.to_thread(insertarHotel, hotel)
+
+
+async def obtenerEspaciosDelHotel_async(hotel_id: int) -> dict:
+    """Versión asíncrona de obtenerEspaciosDelHotel()."""
+    return await asyncio.to_thread(obtenerEspaciosDelHotel, hotel_id)
+
+
+async def seleccionarHotelPorId_async(hotel_id: int) -> dict:
+    """Versión asíncrona de seleccionarHotelPorId()."""
+    return await asyncio.to_thread(seleccionarHotelPorId, hotel_id)
+
+
+async def seleccionarHoteles_async() -> dict:
+    """Versión asíncrona de seleccionarHoteles()."""
+    return await asyncio.to_thread(seleccionarHoteles)
+
+
+async def obtenerEspaciosDeHoteles_async(hotel_ids: list) -> dict:
+    """Versión asíncrona de obtenerEspaciosDeHoteles()."""
+    ids = list(dict.fromkeys(hotel_ids))
+    resultados = await _soap.reunir(asyncio.to_thread(obtenerEspaciosDelHotel, hotel_id) for hotel_id in ids)
+    return dict(zip(ids, resultados))
+
+
+# ======================================================
+# MÉTRICAS DE LATENCIA
+# ======================================================
+def metricasSoap() -> dict:
+    """
+    Devuelve una copia de las métricas de latencia acumuladas por operación.
+    Es solo un punto de consulta: las métricas viven en la memoria de cada
+    proceso y ninguna vista ni comando las publica todavía.
+
+    Retorna:
+        dict:
+            {
+                "seleccionarHoteles": {
+                    "ok": {"llamadas": int, "segundos_total": float, "segundos_max": float},
+                    "error": {...}
+                },
+                ...
+            }
+    """
+    with _METRICAS_LOCK:
+        copia = {clave: tuple(valores) for clave, valores in _METRICAS.items()}
+
+    metricas = {}
+    for (operacion, resultado), (llamadas, total, maximo) in copia.items():
+        metricas.setdefault(operacion, {})[resultado] = {
+            "llamadas": llamadas,
+            "segundos_total": total,
+            "segundos_max": maximo,
+        }
+    return metricas
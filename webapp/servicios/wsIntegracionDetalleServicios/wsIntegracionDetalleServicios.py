@@ -8,12 +8,17 @@ Descripción:
     en Python, para ser reutilizados desde las vistas Django.
 """
 
+import copy
 import logging
+import threading
+import time
 import xml.etree.ElementTree as ET
 from zeep import Client
+from zeep.cache import InMemoryCache
 from zeep.helpers import serialize_object
+from zeep.transports import Transport
 import logging
-import requests
+from webapp.servicios import _soap
 
 # ==========================================================
 # CONFIGURACIÓN
@@ -22,12 +27,102 @@ WSDL_URL = "https://realdecuencaintegracion-abachrhfgzcrb0af.canadacentral-01.az
 SOAP_URL_seleccionarEspaciosDetalladosPorPaginas = "https://realdecuencaintegracion-abachrhfgzcrb0af.canadacentral-01.azurewebsites.net/WS_GestionIntegracionDetalleEspacio.asmx"
 SOAP_ACTION_seleccionarEspaciosDetalladosPorPaginas = "http://tempuri.org/seleccionarEspaciosDetalladosPorPaginas"
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sesión HTTP compartida por el cliente zeep y por las llamadas SOAP
+# manuales (ver _soap.crearSesion). zeep y las llamadas manuales envían su
+# propio Content-Type, que prevalece sobre el de la sesión.
+_SESSION = _soap.crearSesion()
+
+# Cliente zeep único del módulo: el WSDL se descarga y se interpreta una sola
+# vez (en la primera llamada, no al importar, para no atar el arranque de
+# Django a la red). Si la creación falla se reintenta en la llamada siguiente.
+_CLIENTE = None
+_CLIENTE_LOCK = threading.Lock()
+
+# Caché TTL de las consultas de catálogo (obtenerHoteles, obtenerUbicaciones)
+# y del detalle de cada servicio: cambian muy poco y las piden todas las
+# páginas de búsqueda. Clave: (operación, parámetro). Solo se guardan
+# respuestas exitosas.
+_CONSULTAS_CACHE_TTL = 300  # segundos
+_CONSULTAS_CACHE_MAX = 512
+_CONSULTAS_CACHE = {}  # clave -> (expira_en, resultado)
+_CONSULTAS_CACHE_LOCK = threading.Lock()
+
+# Consultas de solo lectura en curso, compartidas entre hilos
+_EN_VUELO = _soap.ConsultasEnVuelo()
+
+# Generación de la caché: invalidarCache() la incrementa. Una consulta que
+# empezó antes de la invalidación no guarda su resultado (ya desactualizado).
+_CACHE_GENERACION = 0
+
+
+# ======================================================
+# CACHÉ DE CONSULTAS
+# ======================================================
+def _leerConsulta(clave: tuple):
+    """Devuelve una copia del resultado cacheado si aún no expiró, o None."""
+    entrada = _CONSULTAS_CACHE.get(clave)
+    if entrada is None or time.monotonic() >= entrada[0]:
+        return None
+    return copy.deepcopy(entrada[1])
+
+
+def _generacionCache() -> int:
+    """Generación actual de la caché; se lee antes de llamar al servicio."""
+    with _CONSULTAS_CACHE_LOCK:
+        return _CACHE_GENERACION
+
+
+def _guardarConsulta(clave: tuple, resultado, generacion: int) -> None:
+    """
+    Guarda un resultado exitoso; al llegar al máximo descarta la entrada más
+    antigua. No guarda nada si la caché se invalidó después de `generacion`.
+    """
+    with _CONSULTAS_CACHE_LOCK:
+        if generacion != _CACHE_GENERACION:
+            return
+        if clave not in _CONSULTAS_CACHE and len(_CONSULTAS_CACHE) >= _CONSULTAS_CACHE_MAX:
+            _CONSULTAS_CACHE.pop(next(iter(_CONSULTAS_CACHE)))
+        _CONSULTAS_CACHE[clave] = (time.monotonic() + _CONSULTAS_CACHE_TTL, copy.deepcopy(resultado))
+
+
+def invalidarCache() -> None:
+    """
+    Descarta las consultas cacheadas. Lo llaman los módulos que modifican los
+    datos de origen (p. ej. wsHotel tras insertar, actualizar o eliminar un
+    hotel) para que obtenerHoteles no siga sirviendo el catálogo anterior.
+    """
+    global _CACHE_GENERACION
+    with _CONSULTAS_CACHE_LOCK:
+        _CACHE_GENERACION += 1
+        _CONSULTAS_CACHE.clear()
+    _EN_VUELO.olvidar()
+
+
+# ======================================================
+# CLIENTE SOAP (zeep)
+# ======================================================
+def _cliente() -> Client:
+    """Devuelve el cliente zeep compartido, creándolo en la primera llamada."""
+    global _CLIENTE
+    if _CLIENTE is None:
+        with _CLIENTE_LOCK:
+            if _CLIENTE is None:
+                transporte = Transport(
+                    session=_SESSION,
+                    cache=InMemoryCache(timeout=3600),
+                    timeout=30,
+                    operation_timeout=30,
+                )
+                _CLIENTE = Client(WSDL_URL, transport=transporte)
+    return _CLIENTE
+
+
 # ======================================================
 # FUNCIÓN: obtenerDetalleServicio
 # ======================================================
+@_EN_VUELO.compartir
 def obtenerDetalleServicio(id: int) -> dict:
     """
     Obtiene el detalle de un servicio (espacio) por su ID desde el servicio SOAP.
@@ -39,12 +134,18 @@ def obtenerDetalleServicio(id: int) -> dict:
         dict: Un diccionario con los datos del espacio. Si ocurre un error o no se encuentra,
               devuelve un diccionario con la clave "error".
     """
+    clave = ("obtenerDetalleServicio", id)
+    cacheado = _leerConsulta(clave)
+    if cacheado is not None:
+        return cacheado
+
     try:
-        # Crear cliente SOAP
-        client = Client(WSDL_URL)
+        # Cliente SOAP compartido (WSDL ya interpretado)
+        client = _cliente()
 
         # Llamar al método remoto
-        logger.info(f"Llamando a obtenerDetalleServicio con id={id}")
+        logger.info("Llamando a obtenerDetalleServicio con id=%s", id)
+        generacion = _generacionCache()
         response = client.service.obtenerDetalleServicio(id=id)
 
         # Convertir el resultado a diccionario Python
@@ -73,16 +174,18 @@ def obtenerDetalleServicio(id: int) -> dict:
             "EsActivo": result.get("EsActivo", False),
         }
 
+        _guardarConsulta(clave, detalle, generacion)
         return detalle
 
     except Exception as ex:
-        logger.error(f"Error en obtenerDetalleServicio({id}): {ex}")
+        logger.error("Error en obtenerDetalleServicio(%s): %s", id, ex)
         return {"error": str(ex)}
 
 
 # ======================================================
 # FUNCIÓN: obtenerHoteles
 # ======================================================
+@_EN_VUELO.compartir
 def obtenerHoteles() -> list:
     """
     Obtiene un catálogo con los nombres de hoteles activos desde el servicio SOAP.
@@ -91,13 +194,18 @@ def obtenerHoteles() -> list:
         list: Lista de strings con los nombres de los hoteles.
               Si ocurre un error, retorna una lista vacía o un diccionario con clave 'error'.
     """
+    cacheado = _leerConsulta(("obtenerHoteles",))
+    if cacheado is not None:
+        return cacheado
+
     try:
-        # Crear cliente SOAP
-        client = Client(WSDL_URL)
+        # Cliente SOAP compartido (WSDL ya interpretado)
+        client = _cliente()
 
         logger.info("Llamando a obtenerHoteles()")
 
         # Llamada al método remoto (sin parámetros)
+        generacion = _generacionCache()
         response = client.service.obtenerHoteles()
 
         # Convertir el resultado SOAP a lista de Python
@@ -110,23 +218,29 @@ def obtenerHoteles() -> list:
 
         # Normalizar (en caso de recibir un único string o lista)
         if isinstance(result, str):
-            return [result]
+            lista = [result]
+        elif isinstance(result, list):
+            lista = [str(h).strip() for h in result if h]
+        else:
+            lista = None
 
-        if isinstance(result, list):
-            return [str(h).strip() for h in result if h]
+        if lista is not None:
+            _guardarConsulta(("obtenerHoteles",), lista, generacion)
+            return lista
 
         # Caso inesperado
-        logger.warning(f"Formato inesperado en la respuesta: {result}")
+        logger.warning("Formato inesperado en la respuesta: %s", result)
         return []
 
     except Exception as ex:
-        logger.error(f"Error en obtenerHoteles(): {ex}")
+        logger.error("Error en obtenerHoteles(): %s", ex)
         return {"error": str(ex)}
 
 
 # ======================================================
 # FUNCIÓN: obtenerUbicaciones
 # ======================================================
+@_EN_VUELO.compartir
 def obtenerUbicaciones() -> list:
     """
     Obtiene un catálogo con las ubicaciones únicas de los espacios activos desde el servicio SOAP.
@@ -135,13 +249,18 @@ def obtenerUbicaciones() -> list:
         list: Lista de strings con las ubicaciones.
               Si ocurre un error, retorna una lista vacía o un diccionario con clave 'error'.
     """
+    cacheado = _leerConsulta(("obtenerUbicaciones",))
+    if cacheado is not None:
+        return cacheado
+
     try:
-        # Crear cliente SOAP
-        client = Client(WSDL_URL)
+        # Cliente SOAP compartido (WSDL ya interpretado)
+        client = _cliente()
 
         logger.info("Llamando a obtenerUbicaciones()")
 
         # Llamada al método remoto (sin parámetros)
+        generacion = _generacionCache()
         response = client.service.obtenerUbicaciones()
 
         # Convertir resultado SOAP → lista de Python
@@ -154,16 +273,21 @@ def obtenerUbicaciones() -> list:
 
         # Normalizar (si viene un string único o una lista de strings)
         if isinstance(result, str):
-            return [result]
+            lista = [result]
+        elif isinstance(result, list):
+            lista = [str(u).strip() for u in result if u]
+        else:
+            lista = None
 
-        if isinstance(result, list):
-            return [str(u).strip() for u in result if u]
+        if lista is not None:
+            _guardarConsulta(("obtenerUbicaciones",), lista, generacion)
+            return lista
 
-        logger.warning(f"Formato inesperado en la respuesta SOAP: {result}")
+        logger.warning("Formato inesperado en la respuesta SOAP: %s", result)
         return []
 
     except Exception as ex:
-        logger.error(f"Error en obtenerUbicaciones(): {ex}")
+        logger.error("Error en obtenerUbicaciones(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -176,7 +300,7 @@ def seleccionarEspaciosDetalladosPorPaginas(pagina: int = 1, tamanoPagina: int =
     Interpreta directamente la respuesta XML (sin usar Zeep).
     """
     try:
-        logger.info(f"Llamando a seleccionarEspaciosDetalladosPorPaginas(pagina={pagina}, tamanoPagina={tamanoPagina})")
+        logger.info("Llamando a seleccionarEspaciosDetalladosPorPaginas(pagina=%s, tamanoPagina=%s)", pagina, tamanoPagina)
 
         # Construir el envelope SOAP manualmente
         soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
@@ -198,12 +322,12 @@ def seleccionarEspaciosDetalladosPorPaginas(pagina: int = 1, tamanoPagina: int =
         }
 
         # Enviar la solicitud SOAP al servidor WCF
-        response = requests.post(SOAP_URL_seleccionarEspaciosDetalladosPorPaginas, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(SOAP_URL_seleccionarEspaciosDetalladosPorPaginas, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
             return {"error": f"HTTP {response.status_code}: {response.text}"}
 
-        xml_text = response.text
+        xml_bytes = response.content
 
         # Namespaces SOAP
         ns = {
@@ -212,7 +336,7 @@ def seleccionarEspaciosDetalladosPorPaginas(pagina: int = 1, tamanoPagina: int =
         }
 
         # Parsear XML con ElementTree
-        root = ET.fromstring(xml_text)
+        root = ET.fromstring(xml_bytes)
 
         result_node = root.find(".//t:seleccionarEspaciosDetalladosPorPaginasResult", ns)
         if result_node is None:
@@ -248,7 +372,7 @@ def seleccionarEspaciosDetalladosPorPaginas(pagina: int = 1, tamanoPagina: int =
                 "Imagenes": imagenes,
             })
 
-        logger.info(f"Parseados correctamente {len(datos)} registros de espacios detallados.")
+        logger.info("Parseados correctamente %s registros de espacios detallados.", len(datos))
 
         return {
             "PaginaActual": pagina_actual,
@@ -258,7 +382,7 @@ def seleccionarEspaciosDetalladosPorPaginas(pagina: int = 1, tamanoPagina: int =
         }
 
     except Exception as ex:
-        logger.error(f"Error en seleccionarEspaciosDetalladosPorPaginas(): {ex}")
+        logger.error("Error en seleccionarEspaciosDetalladosPorPaginas(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -276,7 +400,7 @@ def verificarDisponibilidad(espacioId: int, fechaInicio: str, fechaFin: str) ->
         dict con {"espacioId": id, "disponible": bool}
     """
     try:
-        logger.info(f"Verificando disponibilidad del espacio {espacioId} entre {fechaInicio} y {fechaFin}")
+        logger.info("Verificando disponibilidad del espacio %s entre %s y %s", espacioId, fechaInicio, fechaFin)
 
         soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
         <soap12:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
@@ -296,20 +420,20 @@ def verificarDisponibilidad(espacioId: int, fechaInicio: str, fechaFin: str) ->
             "SOAPAction": "http://tempuri.org/verificarDisponibilidad",
         }
 
-        response = requests.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"Error HTTP {response.status_code}: {response.text}")
+            logger.error("Error HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        xml_text = response.text
+        xml_bytes = response.content
 
         ns = {
             "soap": "http://www.w3.org/2003/05/soap-envelope",
             "t": "http://tempuri.org/",
         }
 
-        root = ET.fromstring(xml_text)
+        root = ET.fromstring(xml_bytes)
         result_node = root.find(".//t:verificarDisponibilidadResult", ns)
 
         if result_node is None:
@@ -319,7 +443,7 @@ def verificarDisponibilidad(espacioId: int, fechaInicio: str, fechaFin: str) ->
         # Convertir texto a booleano
         disponible = result_node.text.strip().lower() == "true"
 
-        logger.info(f"Disponibilidad para espacio {espacioId}: {disponible}")
+        logger.info("Disponibilidad para espacio %s: %s", espacioId, disponible)
 
         return {
             "espacioId": espacioId,
@@ -329,7 +453,7 @@ def verificarDisponibilidad(espacioId: int, fechaInicio: str, fechaFin: str) ->
         }
 
     except Exception as ex:
-        logger.error(f"Error en verificarDisponibilidad(): {ex}")
+        logger.error("Error en verificarDisponibilidad(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -352,9 +476,10 @@ def crearPreReserva(listaEspacios, usuarioId=None, usuarioExternoId=None, fechaI
     """
     try:
         logger.info(
-            f"Creando pre-reserva para espacios {listaEspacios} "
-            f"entre {fechaInicio} y {fechaFin} "
-            f"(usuarioId={usuarioId}, usuarioExternoId={usuarioExternoId})"
+            "Creando pre-reserva para espacios %s "
+            "entre %s y %s "
+            "(usuarioId=%s, usuarioExternoId=%s)",
+            listaEspacios, fechaInicio, fechaFin, usuarioId, usuarioExternoId,
         )
 
         # Validar parámetros mínimos
@@ -394,13 +519,13 @@ def crearPreReserva(listaEspacios, usuarioId=None, usuarioExternoId=None, fechaI
             "SOAPAction": "http://tempuri.org/crearPreReserva",
         }
 
-        response = requests.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"Error HTTP {response.status_code}: {response.text}")
+            logger.error("Error HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        xml_text = response.text
+        xml_bytes = response.content
 
         # Definir namespaces
         ns = {
@@ -409,7 +534,7 @@ def crearPreReserva(listaEspacios, usuarioId=None, usuarioExternoId=None, fechaI
         }
 
         # Parsear el XML de respuesta
-        root = ET.fromstring(xml_text)
+        root = ET.fromstring(xml_bytes)
         result_node = root.find(".//t:crearPreReservaResult", ns)
         if result_node is None:
             logger.error("No se encontró el nodo crearPreReservaResult en la respuesta SOAP.")
@@ -446,11 +571,11 @@ def crearPreReserva(listaEspacios, usuarioId=None, usuarioExternoId=None, fechaI
             "Mensaje": get_text("Mensaje"),
         }
 
-        logger.info(f"Pre-reserva creada exitosamente: ID {data['ReservaId']} - Estado: {data['Estado']}")
+        logger.info("Pre-reserva creada exitosamente: ID %s - Estado: %s", data['ReservaId'], data['Estado'])
         return data
 
     except Exception as ex:
-        logger.error(f"Error en crearPreReserva(): {ex}")
+        logger.error("Error en crearPreReserva(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -469,7 +594,8 @@ def cotizarReserva(espacioId: int, checkIn: str, checkOut: str, costoPorNoche: f
     """
     try:
         logger.info(
-            f"Cotizando reserva: espacioId={espacioId}, checkIn={checkIn}, checkOut={checkOut}, costoPorNoche={costoPorNoche}"
+            "Cotizando reserva: espacioId=%s, checkIn=%s, checkOut=%s, costoPorNoche=%s",
+            espacioId, checkIn, checkOut, costoPorNoche,
         )
 
         # Validaciones básicas
@@ -499,13 +625,13 @@ def cotizarReserva(espacioId: int, checkIn: str, checkOut: str, costoPorNoche: f
             "SOAPAction": "http://tempuri.org/cotizarReserva",
         }
 
-        response = requests.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"Error HTTP {response.status_code}: {response.text}")
+            logger.error("Error HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        xml_text = response.text
+        xml_bytes = response.content
 
         # Namespaces SOAP
         ns = {
@@ -514,7 +640,7 @@ def cotizarReserva(espacioId: int, checkIn: str, checkOut: str, costoPorNoche: f
         }
 
         # Parsear XML
-        root = ET.fromstring(xml_text)
+        root = ET.fromstring(xml_bytes)
         result_node = root.find(".//t:cotizarReservaResult", ns)
         if result_node is None:
             logger.error("No se encontró el nodo cotizarReservaResult en la respuesta SOAP.")
@@ -570,11 +696,13 @@ def cotizarReserva(espacioId: int, checkIn: str, checkOut: str, costoPorNoche: f
         }
 
         logger.info(
-            f"Cotización exitosa para espacio {data['EspacioId']} - Total: {data['TotalPrice']} {data['Currency']}")
+            "Cotización exitosa para espacio %s - Total: %s %s",
+            data['EspacioId'], data['TotalPrice'], data['Currency'],
+        )
         return data
 
     except Exception as ex:
-        logger.error(f"Error en cotizarReserva(): {ex}")
+        logger.error("Error en cotizarReserva(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -604,8 +732,9 @@ def buscarServicios(
     """
     try:
         logger.info(
-            f"Buscando servicios con filtros: ubicacion={ubicacion}, hotel={hotel}, "
-            f"fechas=({fechaInicio}, {fechaFin}), puntuacion={puntuacion}, pagina={pagina}, tamanoPagina={tamanoPagina}"
+            "Buscando servicios con filtros: ubicacion=%s, hotel=%s, "
+            "fechas=(%s, %s), puntuacion=%s, pagina=%s, tamanoPagina=%s",
+            ubicacion, hotel, fechaInicio, fechaFin, puntuacion, pagina, tamanoPagina,
         )
 
         # Validar que al menos un filtro tenga valor
@@ -644,13 +773,13 @@ def buscarServicios(
             "SOAPAction": "http://tempuri.org/buscarServicios",
         }
 
-        response = requests.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"Error HTTP {response.status_code}: {response.text}")
+            logger.error("Error HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        xml_text = response.text
+        xml_bytes = response.content
 
         # Namespaces SOAP
         ns = {
@@ -659,7 +788,7 @@ def buscarServicios(
         }
 
         # Parsear XML
-        root = ET.fromstring(xml_text)
+        root = ET.fromstring(xml_bytes)
         result_node = root.find(".//t:buscarServiciosResult", ns)
         if result_node is None:
             logger.error("No se encontró el nodo buscarServiciosResult en la respuesta SOAP.")
@@ -711,7 +840,7 @@ def buscarServicios(
                 "EsActivo": safe_bool(get_text(e, "EsActivo")),
             })
 
-        logger.info(f"{len(espacios)} espacios encontrados. Total registros: {total_registros}")
+        logger.info("%s espacios encontrados. Total registros: %s", len(espacios), total_registros)
 
         return {
             "PaginaActual": pagina_actual,
@@ -721,7 +850,7 @@ def buscarServicios(
         }
 
     except Exception as ex:
-        logger.error(f"Error en buscarServicios(): {ex}")
+        logger.error("Error en buscarServicios(): %s", ex)
         return {"error": str(ex)}
 
 
@@ -739,7 +868,7 @@ def confirmarReserva(reservaId: int, pagoId: int = None, datosPago: str = "", mo
         dict con la información confirmada de la reserva o el error
     """
     try:
-        logger.info(f"Confirmando reservaId={reservaId}, pagoId={pagoId}, monto={monto}")
+        logger.info("Confirmando reservaId=%s, pagoId=%s, monto=%s", reservaId, pagoId, monto)
 
         if not reservaId:
             return {"error": "Debe especificar el ID de la reserva para confirmar."}
@@ -768,13 +897,13 @@ def confirmarReserva(reservaId: int, pagoId: int = None, datosPago: str = "", mo
             "SOAPAction": "http://tempuri.org/ConfirmarReserva",
         }
 
-        response = requests.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"Error HTTP {response.status_code}: {response.text}")
+            logger.error("Error HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        xml_text = response.text
+        xml_bytes = response.content
 
         # Namespaces SOAP
         ns = {
@@ -783,7 +912,7 @@ def confirmarReserva(reservaId: int, pagoId: int = None, datosPago: str = "", mo
         }
 
         # Parsear XML
-        root = ET.fromstring(xml_text)
+        root = ET.fromstring(xml_bytes)
         result_node = root.find(".//t:ConfirmarReservaResult", ns)
         if result_node is None:
             logger.error("No se encontró el nodo ConfirmarReservaResult en la respuesta SOAP.")
@@ -822,11 +951,11 @@ def confirmarReserva(reservaId: int, pagoId: int = None, datosPago: str = "", mo
             "BookingId": get_text("BookingId"),
         }
 
-        logger.info(f"Reserva confirmada exitosamente: ID {data['ReservaId']} - Estado: {data['Estado']}")
+        logger.info("Reserva confirmada exitosamente: ID %s - Estado: %s", data['ReservaId'], data['Estado'])
         return data
 
     except Exception as ex:
-        logger.error(f"Error en confirmarReserva(): {ex}")
+        logger.error("Error en confirmarReserva(): %s", ex)
         return {"error": str(ex)}
 
 def cancelarReservaIntegracion(bookingId: int, motivo: str = "") -> dict:
@@ -841,7 +970,7 @@ def cancelarReservaIntegracion(bookingId: int, motivo: str = "") -> dict:
         dict con los datos del resultado de la cancelación o un error
     """
     try:
-        logger.info(f"Cancelando reserva (BookingId={bookingId}) con motivo: '{motivo}'")
+        logger.info("Cancelando reserva (BookingId=%s) con motivo: '%s'", bookingId, motivo)
 
         if not bookingId:
             return {"error": "Debe especificar el BookingId de la reserva para cancelarla."}
@@ -865,13 +994,13 @@ def cancelarReservaIntegracion(bookingId: int, motivo: str = "") -> dict:
         }
 
         # Enviar la solicitud SOAP
-        response = requests.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
+        response = _SESSION.post(WSDL_URL, data=soap_body.encode("utf-8"), headers=headers, timeout=30)
 
         if response.status_code != 200:
-            logger.error(f"Error HTTP {response.status_code}: {response.text}")
+            logger.error("Error HTTP %s: %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "detalle": response.text}
 
-        xml_text = response.text
+        xml_bytes = response.content
 
         # Namespaces SOAP
         ns = {
@@ -880,7 +1009,7 @@ def cancelarReservaIntegracion(bookingId: int, motivo: str = "") -> dict:
         }
 
         # Parsear respuesta XML
-        root = ET.fromstring(xml_text)
+        root = ET.fromstring(xml_bytes)
         result_node = root.find(".//t:CancelarReservaIntegracionResult", ns)
         if result_node is None:
             logger.error("No se encontró el nodo CancelarReservaIntegracionResult en la respuesta SOAP.")
@@ -907,13 +1036,13 @@ def cancelarReservaIntegracion(bookingId: int, motivo: str = "") -> dict:
         }
 
         if data["ExitoInt"] == 1:
-            logger.info(f"Reserva {data['ReservaId']} cancelada correctamente. Estado: {data['Estado']}")
+            logger.info("Reserva %s cancelada correctamente. Estado: %s", data['ReservaId'], data['Estado'])
         else:
-            logger.warning(f"Cancelación fallida para BookingId={bookingId}: {data['Mensaje']}")
+            logger.warning("Cancelación fallida para BookingId=%s: %s", bookingId, data['Mensaje'])
 
         return data
 
     except Exception as ex:
-        logger.error(f"Error en cancelarReservaIntegracion(): {ex}")
+        logger.error("Error en cancelarReservaIntegracion(): %s", ex)
         return {"error": str(ex)}
 
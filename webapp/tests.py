@@ -1,3 +1,296 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import re
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from webapp.servicios import _soap
+from webapp.servicios.wsAmenidades import wsAmenidades
+from webapp.servicios.wsEspXRes import wsEspXRes
+from webapp.servicios.wsHotel import wsHotel
+
+
+# ======================================================
+# UTILIDADES
+# ======================================================
+class RespuestaFalsa:
+    """Respuesta HTTP mínima con lo que leen los clientes SOAP."""
+
+    def __init__(self, contenido: bytes = b"", status_code: int = 200):
+        self.content = contenido
+        self.status_code = status_code
+        self.text = contenido.decode("utf-8", "replace")
+
+
+def envelope(cuerpo: str) -> bytes:
+    """Envelope SOAP 1.1 de respuesta con `cuerpo` dentro de <soap:Body>."""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+        f"<soap:Body>{cuerpo}</soap:Body></soap:Envelope>"
+    ).encode("utf-8")
+
+
+def respuestaSimple(operacion: str, valor: str) -> RespuestaFalsa:
+    """Respuesta de una operación que devuelve un único valor (<xResult>valor</xResult>)."""
+    return RespuestaFalsa(envelope(
+        f'<{operacion}Response xmlns="http://tempuri.org/">'
+        f"<{operacion}Result>{valor}</{operacion}Result>"
+        f"</{operacion}Response>"
+    ))
+
+
+AMENIDADES = RespuestaFalsa(envelope(
+    '<seleccionarAmenidadesResponse xmlns="http://tempuri.org/">'
+    "<seleccionarAmenidadesResult>"
+    "<Amenidades><Id>1</Id><Nombre>Piscina</Nombre><EsActivo>true</EsActivo></Amenidades>"
+    "<Amenidades><Id>2</Id><Nombre>Wifi</Nombre><EsActivo>true</EsActivo></Amenidades>"
+    "</seleccionarAmenidadesResult>"
+    "</seleccionarAmenidadesResponse>"
+))
+
+
+# ======================================================
+# _soap.textoResultado
+# ======================================================
+class TextoResultadoTests(SimpleTestCase):
+    ETIQUETA = "{http://tempuri.org/}insertarRelacionResult"
+
+    def test_camino_rapido(self):
+        contenido = respuestaSimple("insertarRelacion", " 42 ").content
+        with mock.patch.object(_soap.etree, "fromstring") as parsear:
+            self.assertEqual(_soap.textoResultado(contenido, self.ETIQUETA), "42")
+        parsear.assert_not_called()
+
+    def test_entidad_se_resuelve_con_lxml(self):
+        contenido = respuestaSimple("insertarRelacion", "a &amp; b").content
+        self.assertEqual(_soap.textoResultado(contenido, self.ETIQUETA), "a & b")
+
+    def test_fault_devuelve_none(self):
+        contenido = envelope(
+            "<soap:Fault><faultcode>soap:Client</faultcode>"
+            "<faultstring>insertarRelacionResult inválido</faultstring></soap:Fault>"
+        )
+        self.assertIsNone(_soap.textoResultado(contenido, self.ETIQUETA))
+
+    def test_nodo_vacio(self):
+        contenido = envelope(
+            '<insertarRelacionResponse xmlns="http://tempuri.org/">'
+            "<insertarRelacionResult/></insertarRelacionResponse>"
+        )
+        self.assertEqual(_soap.textoResultado(contenido, self.ETIQUETA), "")
+
+
+# ======================================================
+# _soap.ConsultasEnVuelo
+# ======================================================
+class ConsultasEnVueloTests(SimpleTestCase):
+    def test_llamadas_concurrentes_comparten_una_consulta(self):
+        en_vuelo = _soap.ConsultasEnVuelo()
+        liberar = threading.Event()
+        llamadas = []
+
+        @en_vuelo.compartir
+        def consultar(clave):
+            llamadas.append(clave)
+            liberar.wait(5)
+            return {"valores": [1]}
+
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(consultar(7))) for _ in range(4)]
+        hilos[0].start()
+        while not llamadas:
+            time.sleep(0.001)
+        for hilo in hilos[1:]:
+            hilo.start()
+        time.sleep(0.05)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join(5)
+
+        self.assertEqual(llamadas, [7])
+        self.assertEqual(resultados, [{"valores": [1]}] * 4)
+        # Cada llamador recibe su propio objeto
+        self.assertEqual(len({id(r) for r in resultados}), 4)
+
+    def test_olvidar_no_comparte_lo_anterior(self):
+        en_vuelo = _soap.ConsultasEnVuelo()
+        liberar = threading.Event()
+        llamadas = []
+
+        @en_vuelo.compartir
+        def consultar():
+            llamadas.append(1)
+            if len(llamadas) == 1:
+                liberar.wait(5)
+            return len(llamadas)
+
+        hilo = threading.Thread(target=consultar)
+        hilo.start()
+        while not llamadas:
+            time.sleep(0.001)
+        en_vuelo.olvidar()
+        self.assertEqual(consultar(), 2)
+        liberar.set()
+        hilo.join(5)
+
+
+# ======================================================
+# wsAmenidades: caché del listado
+# ======================================================
+class AmenidadesCacheTests(SimpleTestCase):
+    def setUp(self):
+        wsAmenidades._invalidarCache()
+        self.addCleanup(wsAmenidades._invalidarCache)
+
+    def test_segunda_consulta_sale_de_cache(self):
+        with mock.patch.object(wsAmenidades._SESSION, "post", return_value=AMENIDADES) as post:
+            primero = wsAmenidades.seleccionarAmenidades()
+            primero["amenidades"].clear()
+            segundo = wsAmenidades.seleccionarAmenidades()
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual([a["Nombre"] for a in segundo["amenidades"]], ["Piscina", "Wifi"])
+
+    def test_cache_expira(self):
+        with mock.patch.object(wsAmenidades._SESSION, "post", return_value=AMENIDADES) as post:
+            wsAmenidades.seleccionarAmenidades()
+            ahora = time.monotonic() + wsAmenidades._AMENIDADES_CACHE_TTL
+            with mock.patch.object(wsAmenidades.time, "monotonic", return_value=ahora):
+                wsAmenidades.seleccionarAmenidades()
+        self.assertEqual(post.call_count, 2)
+
+    def test_escritura_invalida_cache(self):
+        respuestas = [AMENIDADES, respuestaSimple("eliminarAmenidad", "true"), AMENIDADES]
+        with mock.patch.object(wsAmenidades._SESSION, "post", side_effect=respuestas) as post:
+            wsAmenidades.seleccionarAmenidades()
+            self.assertTrue(wsAmenidades.eliminarAmenidad(1)["exito"])
+            wsAmenidades.seleccionarAmenidades()
+        self.assertEqual(post.call_count, 3)
+
+    def test_invalidacion_durante_lectura_en_vuelo(self):
+        en_post = threading.Event()
+        liberar = threading.Event()
+
+        def postLento(*args, **kwargs):
+            en_post.set()
+            liberar.wait(5)
+            return AMENIDADES
+
+        with mock.patch.object(wsAmenidades._SESSION, "post", side_effect=postLento):
+            hilo = threading.Thread(target=wsAmenidades.seleccionarAmenidades)
+            hilo.start()
+            self.assertTrue(en_post.wait(5))
+            wsAmenidades._invalidarCache()
+            liberar.set()
+            hilo.join(5)
+
+        # La lectura empezó antes de la escritura: su resultado no se guarda
+        self.assertEqual(wsAmenidades._leerCache()[0], None)
+
+
+# ======================================================
+# wsEspXRes: registro local de relaciones insertadas
+# ======================================================
+class RegistroLocalTests(SimpleTestCase):
+    RELACION = {
+        "ReservaId": 10,
+        "EspacioId": 5,
+        "FechaInicio": "2026-01-10T12:00:00",
+        "FechaFin": "2026-01-12T12:00:00",
+    }
+
+    def setUp(self):
+        wsEspXRes._invalidarCache()
+        wsEspXRes._RESERVAS_LOCALES.clear()
+        self.addCleanup(wsEspXRes._RESERVAS_LOCALES.clear)
+        self.addCleanup(wsEspXRes._invalidarCache)
+
+    def insertar(self, **campos):
+        with mock.patch.object(
+            wsEspXRes._SESSION, "post", return_value=respuestaSimple("insertarRelacion", "99")
+        ):
+            resultado = wsEspXRes.insertarRelacion({**self.RELACION, **campos})
+        self.assertEqual(resultado["id_relacion"], 99)
+
+    def test_solapamiento_no_consulta_el_servicio(self):
+        self.insertar()
+        with mock.patch.object(wsEspXRes._SESSION, "post") as post:
+            resultado = wsEspXRes.espacioDisponible(5, "2026-01-11T00:00:00", "2026-01-13T00:00:00")
+        post.assert_not_called()
+        self.assertFalse(resultado["disponible"])
+
+    def test_rango_sin_solapamiento_consulta_el_servicio(self):
+        self.insertar()
+        with mock.patch.object(
+            wsEspXRes._SESSION, "post", return_value=respuestaSimple("espacioDisponible", "true")
+        ) as post:
+            resultado = wsEspXRes.espacioDisponible(5, "2026-01-12T12:00:00", "2026-01-14T00:00:00")
+        self.assertEqual(post.call_count, 1)
+        self.assertTrue(resultado["disponible"])
+
+    def test_retencion_vencida_se_descarta(self):
+        self.insertar(MinutosRetencion=2)
+        despues = time.monotonic() + 121
+        with mock.patch.object(wsEspXRes.time, "monotonic", return_value=despues):
+            self.assertFalse(wsEspXRes._hayConflictoLocal(5, "2026-01-11T00:00:00", "2026-01-13T00:00:00"))
+        self.assertNotIn(5, wsEspXRes._RESERVAS_LOCALES)
+
+    def test_vigencia_en_minutos(self):
+        self.assertEqual(wsEspXRes._vigenciaRetencion({"ExpiraEn": 3}), 180)
+        self.assertEqual(wsEspXRes._vigenciaRetencion({"MinutosRetencion": 10, "ExpiraEn": 3}), 180)
+        self.assertEqual(wsEspXRes._vigenciaRetencion({}), wsEspXRes._RESERVAS_LOCALES_TTL)
+
+
+# ======================================================
+# wsEspXRes: micro-lotes de seleccionarPorId
+# ======================================================
+class MicroLotesTests(SimpleTestCase):
+    def setUp(self):
+        wsEspXRes._invalidarCache()
+        self.addCleanup(wsEspXRes._invalidarCache)
+
+    def test_ids_repetidos_se_consultan_una_vez(self):
+        def responder(url, data, **kwargs):
+            relacion_id = re.search(rb">(\d+)<", data).group(1).decode()
+            return respuestaSimple("seleccionarPorId", f"<Id>{relacion_id}</Id>")
+
+        async def consultar():
+            return await asyncio.gather(*(
+                wsEspXRes.seleccionarPorIdAgrupado_async(relacion_id) for relacion_id in (1, 2, 1, 3, 2)
+            ))
+
+        with mock.patch.object(wsEspXRes._SESSION, "post", side_effect=responder) as post:
+            resultados = asyncio.run(consultar())
+
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual([r["relacion"]["Id"] for r in resultados], [1, 2, 1, 3, 2])
+        self.assertIsNot(resultados[0], resultados[2])
+
+
+# ======================================================
+# wsHotel: envelopes de escritura comprimidos
+# ======================================================
+class HotelGzipTests(SimpleTestCase):
+    ENVELOPE = b"<soap:Envelope>" + b"x" * (wsHotel._GZIP_DESDE + 1) + b"</soap:Envelope>"
+    HEADERS = {"SOAPAction": "http://tempuri.org/insertarHotel"}
+
+    def test_desactivado_envia_sin_comprimir(self):
+        with mock.patch.object(wsHotel._SESSION, "post", return_value=RespuestaFalsa()) as post:
+            wsHotel._postComprimible(self.ENVELOPE, self.HEADERS)
+        self.assertEqual(post.call_args.kwargs["data"], self.ENVELOPE)
+
+    def test_415_reenvia_sin_comprimir(self):
+        respuestas = [RespuestaFalsa(status_code=415), RespuestaFalsa()]
+        with mock.patch.object(wsHotel, "_GZIP_PETICIONES", True), \
+                mock.patch.object(wsHotel._SESSION, "post", side_effect=respuestas) as post:
+            response = wsHotel._postComprimible(self.ENVELOPE, self.HEADERS)
+
+        self.assertEqual(response.status_code, 200)
+        primera, segunda = post.call_args_list
+        self.assertEqual(primera.kwargs["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(primera.kwargs["data"]), self.ENVELOPE)
+        self.assertNotIn("Content-Encoding", segunda.kwargs["headers"])
+        self.assertEqual(segunda.kwargs["data"], self.ENVELOPE)